@@ -36,6 +36,16 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
+    # orjson-backed JSON (api/renderers.py); stdlib json without orjson.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
@@ -53,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so middleware queries (sessions, auth) are counted too.
+    'api.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +74,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request profiling (api/profiling.py): query count, DB time,
+# duplicate queries and serializer/template time per request, logged on
+# "api.profiling" and sent as a Server-Timing header when DEBUG is on.
+# Views can set a `query_budget`; going over it is logged, and fails
+# `manage.py test` (QueryBudgetTestRunner turns on QUERY_BUDGET_RAISE).
+QUERY_PROFILE_SLOW_MS = 500
+QUERY_BUDGET = None
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = "api.runner.QueryBudgetTestRunner"
+
 ROOT_URLCONF = 'advanced_api_project.urls'
 
 TEMPLATES = [
@@ -0,0 +1,125 @@
+"""
+Read-only fast path for book lists.
+
+For every row of a list, a ModelSerializer builds an attribute lookup per
+field, checks for None, and calls each field's to_representation(), on
+top of the model instance the queryset built for the row. A read-only
+list doesn't need any of that. compile_serializer() turns a serializer's
+field set into one generated `row -> dict` function over
+`values_list(named=True)` rows: model fields are copied as is, or passed
+through the field's own to_representation() when it formats (CharField,
+IntegerField, ...), and primary-key related fields read the FK column.
+Any other field (nested serializers, many-related, file or method fields,
+dotted sources) makes the serializer uncompilable and the view falls back
+to the regular serializer. Set FAST_LIST_SERIALIZERS = False to turn the
+fast path off.
+"""
+import functools
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from . import profiling
+
+
+def fast_serializers_enabled():
+    return getattr(settings, "FAST_LIST_SERIALIZERS", True)
+
+
+class CompiledSerializer:
+    def __init__(self, serializer, columns, row_to_dict):
+        self.serializer = serializer
+        self.columns = columns
+        self.row_to_dict = row_to_dict
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns, named=True)
+
+    def represent(self, list_serializer, rows):
+        row_to_dict = self.row_to_dict
+        return ReturnList([row_to_dict(row) for row in rows], serializer=list_serializer)
+
+
+@functools.lru_cache(maxsize=256)
+def _code(source):
+    return compile(source, "<compiled serializer>", "exec")
+
+
+def compile_serializer(serializer):
+    """
+    CompiledSerializer for `serializer` (a ModelSerializer instance, e.g. a
+    ListSerializer's child), or None if one of its fields needs the
+    model instance.
+    """
+    columns = []
+    namespace = {}
+    items = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if (
+            isinstance(field, (serializers.BaseSerializer, ManyRelatedField, serializers.FileField))
+            or isinstance(field, serializers.SerializerMethodField)
+            or len(field.source_attrs) != 1
+        ):
+            return None
+
+        index = len(columns)
+        columns.append(field.source_attrs[0])
+        if isinstance(field, RelatedField):
+            # The FK column holds the primary key DRF would output.
+            if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                return None
+            items.append(f"{name!r}: row[{index}]")
+        elif type(field) is serializers.ReadOnlyField:
+            items.append(f"{name!r}: row[{index}]")
+        else:
+            namespace[f"c_{len(items)}"] = field.to_representation
+            items.append(f"{name!r}: None if row[{index}] is None else c_{len(items)}(row[{index}])")
+
+    source = "def row_to_dict(row):\n    return {\n" + "".join(f"        {item},\n" for item in items) + "    }\n"
+    exec(_code(source), namespace)
+    return CompiledSerializer(serializer, columns, namespace["row_to_dict"])
+
+
+def values_queryset(list_serializer, queryset):
+    """
+    (queryset, compiled): `queryset` as named values rows and the compiled
+    child serializer, or the queryset unchanged and None when the fast path
+    is off or the serializer can't be compiled.
+    """
+    if not fast_serializers_enabled():
+        return queryset, None
+    compiled = compile_serializer(list_serializer.child)
+    if compiled is None:
+        return queryset, None
+    return compiled.values(queryset), compiled
+
+
+def serialize_rows(list_serializer, rows, compiled):
+    """`list_serializer.data` for `rows`, through the compiled path if there is one."""
+    if compiled is not None:
+        with profiling.section("serialize"):
+            return compiled.represent(list_serializer, rows)
+    list_serializer.instance = rows
+    return list_serializer.data
+
+
+class FastListMixin:
+    """list() through the compiled serializer when it can be used."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(many=True)
+        queryset, compiled = values_queryset(serializer, queryset)
+
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = serialize_rows(serializer, rows, compiled)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,17 @@
+"""
+Test runner that turns on QUERY_BUDGET_RAISE (see profiling.py), so a test
+whose requests go over their query budget fails instead of logging.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.budget_settings = override_settings(QUERY_BUDGET_RAISE=True)
+        self.budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -9,16 +9,23 @@ What we test:
    - Unauthenticated users cannot write (create/update/delete)
    - Authenticated users can write
 4) Filtering, searching, ordering on the list endpoint
+5) JSON goes through api.renderers (orjson) and matches DRF's output
+6) The compiled list serializer (api/fast_serializers.py) matches BookSerializer
+7) Requests are profiled (api/profiling.py): Server-Timing and query budgets
 
 How to run:
     python manage.py test api
 """
 
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
 from api.models import Author, Book
+from api.profiling import QueryBudgetExceeded
+from api.renderers import FastJSONRenderer
 
 
 class BookAPITests(APITestCase):
@@ -206,3 +213,52 @@ class BookAPITests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         years = [b["publication_year"] for b in resp.data]
         self.assertEqual(years, sorted(years, reverse=True))
+
+    # ---------------------------
+    # JSON rendering
+    # ---------------------------
+    def test_list_is_rendered_by_fast_renderer_with_drf_output(self):
+        """The list goes through FastJSONRenderer and renders exactly like DRF's."""
+        resp = self.client.get(self.list_url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(resp.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(resp.content, JSONRenderer().render(resp.data))
+
+    def test_create_parses_json_body(self):
+        """JSON request bodies are parsed by FastJSONParser."""
+        self.client.login(username="tester", password="pass12345")
+        resp = self.client.post(
+            self.create_url,
+            b'{"title": "Parable of the Sower", "publication_year": 1993, "author": %d}' % self.author2.id,
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data["title"], "Parable of the Sower")
+
+    # ---------------------------
+    # Compiled list serializer
+    # ---------------------------
+    def test_compiled_list_matches_book_serializer(self):
+        """Filtered, searched and ordered lists are identical with and without the fast path."""
+        for params in ({}, {"ordering": "-publication_year"}, {"search": "Butler"}, {"author": self.author1.pk}):
+            with self.subTest(params=params):
+                resp = self.client.get(self.list_url, params)
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    slow = self.client.get(self.list_url, params)
+                self.assertEqual(resp.status_code, status.HTTP_200_OK)
+                self.assertEqual(resp.content, slow.content)
+
+    # ---------------------------
+    # Request profiling
+    # ---------------------------
+    @override_settings(QUERY_PROFILE_SERVER_TIMING=True)
+    def test_list_reports_server_timing(self):
+        """Query count and DB/serializer time go out as Server-Timing."""
+        resp = self.client.get(self.list_url)
+        self.assertRegex(resp["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=')
+
+    @override_settings(QUERY_BUDGET=0, QUERY_BUDGET_RAISE=True)
+    def test_query_budget_fails_the_test(self):
+        """Going over the query budget raises instead of passing silently."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(self.list_url)
@@ -3,13 +3,14 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticate
 from django_filters import rest_framework as filters
 from rest_framework import filters as drf_filters
 
+from .fast_serializers import FastListMixin
 from .models import Book
 from .serializers import BookSerializer
 from .filters import BookFilter
 
 
 
-class BookListView(generics.ListAPIView):
+class BookListView(FastListMixin, generics.ListAPIView):
     """
     GET /api/books/
 
@@ -24,6 +25,9 @@ class BookListView(generics.ListAPIView):
       - Search:  /api/books/?search=wizard
       - Order:   /api/books/?ordering=title
       - Order desc: /api/books/?ordering=-publication_year
+
+    Rows are serialized from values() through the compiled BookSerializer
+    (see api/fast_serializers.py).
     """
     queryset = Book.objects.select_related("author").all()
     serializer_class = BookSerializer
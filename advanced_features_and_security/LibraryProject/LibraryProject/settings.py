@@ -71,6 +71,8 @@ SECURE_CONTENT_SECURITY_POLICY = (
 
 
 MIDDLEWARE = [
+    # First, so middleware queries (sessions, auth) are counted too.
+    'LibraryProject.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +83,16 @@ MIDDLEWARE = [
     
 ]
 
+# Request profiling (LibraryProject/profiling.py): query count, DB time,
+# duplicate queries and serializer/template time per request, logged on
+# "LibraryProject.profiling" and sent as a Server-Timing header when DEBUG is on.
+# Views can set a `query_budget`; going over it is logged, and fails
+# `manage.py test` (QueryBudgetTestRunner turns on QUERY_BUDGET_RAISE).
+QUERY_PROFILE_SLOW_MS = 500
+QUERY_BUDGET = None
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = "LibraryProject.runner.QueryBudgetTestRunner"
+
 ROOT_URLCONF = 'LibraryProject.urls'
 
 TEMPLATES = [
@@ -0,0 +1,281 @@
+"""
+Per-request query and rendering profile.
+
+QueryProfileMiddleware records, for every request:
+
+  - how many SQL queries ran and how long they took, on every database
+    alias (a wrapper added to each connection as it is created);
+  - duplicate queries: SQL that ran more than once with only its
+    parameters changing (IN lists collapsed), which is what an N+1 loop
+    looks like;
+  - time spent building response bodies: `section()` blocks such as
+    serialize_rows() in api/fast_serializers.py, and the rendering Django
+    does after the view returns (a DRF Response's renderer counts as
+    "serialize", a TemplateResponse's template as "template"). DRF and
+    Django classes are not patched, so a serializer's `.data` or a
+    render() call inside a view only counts towards the total. Nested
+    sections count once, in the outermost one.
+
+It then logs one line on the "api.profiling" logger:
+
+    request {"method": "GET", "path": "/api/books/", "status": 200, "queries": 4, "db_ms": 3.1, ...}
+
+at INFO, or at WARNING when the request went over its query budget or
+took longer than QUERY_PROFILE_SLOW_MS. With QUERY_PROFILE_SERVER_TIMING
+(on when DEBUG is) the same numbers go out as a Server-Timing header,
+which browser dev tools show next to the request:
+
+    Server-Timing: db;dur=3.1;desc="4 queries", serialize;dur=1.2, template;dur=0, total;dur=9.8
+
+Query budgets: QUERY_BUDGET applies to every view, and a view can set its
+own with a `query_budget` class attribute or the @query_budget(n)
+decorator. Going over is logged, or raises QueryBudgetExceeded (an
+AssertionError, so the test fails) when QUERY_BUDGET_RAISE is set, as
+QueryBudgetTestRunner (runner.py) does for `manage.py test`.
+
+The middleware is sync- and async-capable, so under ASGI it doesn't make
+Django run the rest of the chain in a thread. Queries made after the
+response is returned (e.g. by a streaming body) are not counted.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being served, if any.
+current_profile = ContextVar("current_profile", default=None)
+
+
+def enabled():
+    return getattr(settings, "QUERY_PROFILE_ENABLED", True)
+
+
+def server_timing_enabled():
+    return getattr(settings, "QUERY_PROFILE_SERVER_TIMING", settings.DEBUG)
+
+
+def slow_ms():
+    return getattr(settings, "QUERY_PROFILE_SLOW_MS", 500)
+
+
+def default_budget():
+    return getattr(settings, "QUERY_BUDGET", None)
+
+
+def raise_on_budget():
+    return getattr(settings, "QUERY_BUDGET_RAISE", False)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def fingerprint(sql):
+    """Short stable id of `sql` with its IN lists collapsed; parameters are never part of it."""
+    normalized = _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", sql).strip())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+        self.sections = Counter()
+        self.active_section = None
+        self.budget = default_budget()
+        self.view = None
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        key, normalized = fingerprint(sql)
+        self.fingerprints[key] += 1
+        self.statements.setdefault(key, normalized)
+
+    def duplicates(self, limit=5):
+        return [
+            {"fingerprint": key, "count": count, "sql": self.statements[key][:200]}
+            for key, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+    def summary(self, request, response):
+        return {
+            "method": request.method,
+            "path": request.path,
+            "view": self.view,
+            "status": response.status_code,
+            "queries": self.queries,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "serialize_ms": round(self.sections["serialize"] * 1000, 2),
+            "template_ms": round(self.sections["template"] * 1000, 2),
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "budget": self.budget,
+            "duplicates": self.duplicates(),
+        }
+
+
+@contextmanager
+def section(name):
+    """Time the block as `name` in the current request's profile (outermost section only)."""
+    profile = current_profile.get()
+    if profile is None or profile.active_section is not None:
+        yield
+        return
+    profile.active_section = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.sections[name] += time.perf_counter() - start
+        profile.active_section = None
+
+
+def query_budget(n):
+    """View decorator: fail (or log) requests to this view that run more than `n` queries."""
+    def decorator(view_func):
+        view_func.query_budget = n
+        return view_func
+    return decorator
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """Hook query recording into every connection. Idempotent."""
+    connection_created.connect(_wrap_connection, dispatch_uid="query_profile")
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+
+
+def server_timing(summary):
+    return ", ".join([
+        f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"',
+        f'serialize;dur={summary["serialize_ms"]}',
+        f'template;dur={summary["template_ms"]}',
+        f'total;dur={summary["total_ms"]}',
+    ])
+
+
+class QueryProfileMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django would run sync view/template-response hooks in a thread.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+        install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+
+        # The awaited chain runs in this context, and sync_to_async copies
+        # it into the ORM's thread, so queries there are recorded too.
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        summary = profile.summary(request, response)
+        if server_timing_enabled():
+            response["Server-Timing"] = server_timing(summary)
+        over_budget = profile.budget is not None and profile.queries > profile.budget
+        slow = summary["total_ms"] > slow_ms()
+        logger.log(logging.WARNING if over_budget or slow else logging.INFO, "request %s", json.dumps(summary))
+        if over_budget and raise_on_budget():
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} ran {profile.queries} queries, over its budget of "
+                f"{profile.budget}. Repeated: {json.dumps(summary['duplicates'])}"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return None
+        # Plain functions, Django class views (.view_class) and DRF viewsets (.cls).
+        view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+        budget = getattr(view_func, "query_budget", None)
+        if budget is None:
+            budget = getattr(view_class, "query_budget", None)
+        if budget is not None:
+            profile.budget = budget
+        profile.view = getattr(view_class or view_func, "__qualname__", None)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return QueryProfileMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    def process_template_response(self, request, response):
+        profile = current_profile.get()
+        if profile is None:
+            return response
+        # This middleware is first, so its hook runs last, right before
+        # the handler renders the response.
+        name = "serialize" if hasattr(response, "accepted_renderer") else "template"
+        start = time.perf_counter()
+
+        def rendered(response):
+            profile.sections[name] += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        return QueryProfileMiddleware.process_template_response(self, request, response)
@@ -1,3 +1,66 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .authentication import local_tokens
+from .models import Book
+from .profiling import QueryBudgetExceeded
+from .renderers import FastJSONRenderer
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(username="reader", password="pass12345")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_second_request_skips_token_lookup(self):
+        self.client.get("/api/books/")
+        with self.assertNumQueries(1):  # the book list only
+            self.assertEqual(self.client.get("/api/books/").status_code, 200)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/api/books/")
+        self.token.delete()
+        self.assertEqual(self.client.get("/api/books/").status_code, 401)
+
+
+class FastJSONRendererTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="reader", password="pass12345")
+        self.client.force_authenticate(user=self.user)
+        Book.objects.create(title="Kindred", author="Octavia E. Butler")
+
+    def test_book_list_matches_drf_output(self):
+        res = self.client.get("/api/books/")
+        self.assertIsInstance(res.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+    def test_compiled_book_list_matches_model_serializer(self):
+        Book.objects.create(title="Caf\u00e9 \u2603", author="")
+        for url in ("/api/books/", "/api/books_all/"):
+            with self.subTest(url=url):
+                res = self.client.get(url)
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    slow = self.client.get(url)
+                self.assertEqual(res.content, slow.content)
+                self.assertEqual(len(res.json()), 2)
+
+
+class QueryProfileTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="reader", password="pass12345"))
+        Book.objects.create(title="Kindred", author="Octavia E. Butler")
+
+    @override_settings(QUERY_PROFILE_SERVER_TIMING=True)
+    def test_server_timing_counts_queries(self):
+        res = self.client.get("/api/books/")
+        self.assertRegex(res["Server-Timing"], r'^db;dur=[\d.]+;desc="1 queries", ')
+
+    @override_settings(QUERY_BUDGET=0, QUERY_BUDGET_RAISE=True)
+    def test_over_budget_request_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/api/books/")
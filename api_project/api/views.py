@@ -1,11 +1,12 @@
 from django.shortcuts import render
+from .fast_serializers import FastListMixin
 from .models import Book
 from .serializers import BookSerializer
 from rest_framework import generics, viewsets
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS, BasePermission
 
 # Create your views here.
-class BookList(generics.ListAPIView):
+class BookList(FastListMixin, generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
 
@@ -18,7 +19,7 @@ class IsAdminUser(BasePermission):
         return request.user and request.user.is_staff
     
     
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
\ No newline at end of file
@@ -45,14 +45,26 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # orjson-backed JSON (api/renderers.py); stdlib json without orjson.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 MIDDLEWARE = [
+    # First, so middleware queries (sessions, auth) are counted too.
+    'api.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +74,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request profiling (api/profiling.py): query count, DB time,
+# duplicate queries and serializer/template time per request, logged on
+# "api.profiling" and sent as a Server-Timing header when DEBUG is on.
+# Views can set a `query_budget`; going over it is logged, and fails
+# `manage.py test` (QueryBudgetTestRunner turns on QUERY_BUDGET_RAISE).
+QUERY_PROFILE_SLOW_MS = 500
+QUERY_BUDGET = None
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = "api.runner.QueryBudgetTestRunner"
+
 ROOT_URLCONF = 'api_project.urls'
 
 TEMPLATES = [
@@ -128,3 +150,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Token lookup cache (api/authentication.py). Set TOKEN_AUTH_SHARED_CACHE to
+# a cache alias to share entries between workers.
+TOKEN_AUTH_LOCAL_CACHE_SIZE = 10000
+TOKEN_AUTH_LOCAL_TTL = 30
+TOKEN_AUTH_SHARED_TTL = 300
+TOKEN_AUTH_SHARED_CACHE = None
@@ -6,4 +6,5 @@ class BlogConfig(AppConfig):
     name = 'blog'
 
     def ready(self):
-        import blog.signals
\ No newline at end of file
+        import blog.signals
+        import blog.thumbnails
\ No newline at end of file
@@ -34,7 +34,20 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to="profile_pics/", blank=True)
-    
+    # Resized copies of profile_picture, written by blog/thumbnails.py.
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    @property
+    def picture_variants(self):
+        """{label: {"webp": url, "jpeg": url}}, or None until built for the current picture."""
+        variants = self.profile_picture_variants or {}
+        if not self.profile_picture or variants.get("source") != self.profile_picture.name:
+            return None
+        storage = self.profile_picture.storage
+        return {
+            label: {ext: storage.url(name) for ext, name in formats.items()}
+            for label, formats in variants["sizes"].items()
+        }
     
     def __str__(self):
         return f"{self.username}'s Profile"
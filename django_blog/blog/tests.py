@@ -1,3 +1,68 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from . import thumbnails
+from .views import profile_picture_variant
+
+
+@override_settings(PROFILE_PICTURE_WORKERS=0, PROFILE_PICTURE_SIZES={"small": 16, "medium": 64})
+class ProfilePictureTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = User.objects.create_user(username="alice", email="alice@example.com", password="pass12345")
+        self.client.force_login(self.user)
+
+    def upload(self, color):
+        buffer = BytesIO()
+        Image.new("RGB", (200, 100), color).save(buffer, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/profile/", {
+                "username": "alice",
+                "email": "alice@example.com",
+                "bio": "",
+                "profile_picture": SimpleUploadedFile("me.png", buffer.getvalue(), content_type="image/png"),
+            })
+        self.user.profile.refresh_from_db()
+        return self.user.profile.picture_variants
+
+    def test_upload_builds_hashed_variants(self):
+        variants = self.upload("red")
+        self.assertEqual({label: set(urls) for label, urls in variants.items()}, {
+            "small": {"webp", "jpeg"}, "medium": {"webp", "jpeg"},
+        })
+        url = variants["medium"]["webp"]
+        self.assertTrue(url.startswith("/media/profile_pics/variants/"))
+        self.assertContains(self.client.get("/profile/"), f'<source srcset="{url}" type="image/webp">')
+
+        # Only routed with DEBUG on; production serves MEDIA_URL itself.
+        self.assertEqual(self.client.get(url).status_code, 404)
+        res = profile_picture_variant(RequestFactory().get(url), url.removeprefix("/media/" + thumbnails.VARIANT_DIR))
+        self.assertEqual(res["Cache-Control"], "public, max-age=31536000, immutable")
+        with Image.open(BytesIO(b"".join(res.streaming_content))) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (64, 64)))
+
+        # A new picture gets new names; the old variants are not served for it.
+        self.assertNotEqual(self.upload("blue"), variants)
+
+    def test_variants_are_queued_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.user.profile.profile_picture = SimpleUploadedFile("me.png", b"", content_type="image/png")
+            self.user.profile.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(self.user.profile.picture_variants)
+
+    def test_small_pictures_are_not_upscaled(self):
+        buffer = BytesIO()
+        Image.new("RGBA", (30, 40)).save(buffer, "PNG")
+        rendered = thumbnails.render_variants(buffer.getvalue())
+        with Image.open(BytesIO(rendered["medium"]["jpeg"])) as image:
+            self.assertEqual(image.size, (30, 30))
@@ -0,0 +1,138 @@
+"""
+Resized variants of uploaded profile pictures.
+
+After a Profile is saved with a new picture, generate() runs on a pool of
+PROFILE_PICTURE_WORKERS threads (0 runs it inline). It crops a square for
+each PROFILE_PICTURE_SIZES entry and encodes it as WebP and JPEG with
+Pillow, under names that are hashes of the file contents
+(`profile_pics/variants/<sha256>.<ext>`), so they can be cached forever.
+The names are kept in `Profile.profile_picture_variants` as
+{"source": <picture name>, "sizes": {label: {ext: name}}}; variants whose
+source is not the current picture are ignored. Whatever serves MEDIA_URL
+in production should send PROFILE_PICTURE_CACHE_CONTROL for the variant
+prefix; with DEBUG on, blog.views.profile_picture_variant does.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from .models import Profile
+
+VARIANT_DIR = "profile_pics/variants/"
+# (extension, Pillow format, save options)
+FORMATS = [
+    ("webp", "WEBP", {"method": 4}),
+    ("jpeg", "JPEG", {"optimize": True, "progressive": True}),
+]
+
+logger = logging.getLogger(__name__)
+
+
+def variant_sizes():
+    return getattr(settings, "PROFILE_PICTURE_SIZES", {"small": 48, "medium": 160, "large": 400})
+
+
+def workers():
+    return getattr(settings, "PROFILE_PICTURE_WORKERS", 2)
+
+
+def quality():
+    return getattr(settings, "PROFILE_PICTURE_QUALITY", 82)
+
+
+def render_variants(data):
+    """{label: {ext: bytes}} for every configured size of the image in `data`."""
+    sizes = variant_sizes()
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEGs decode straight to a reduced scale close to the largest size.
+        largest = max(sizes.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P", "PA"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    rendered = {}
+    for label, size in sizes.items():
+        side = min(size, *image.size)  # never upscale
+        resized = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+        rendered[label] = {}
+        for ext, fmt, options in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt, quality=quality(), **options)
+            rendered[label][ext] = buffer.getvalue()
+    return rendered
+
+
+def store_variants(rendered, storage=default_storage):
+    """Save rendered variants under content-hashed names; {label: {ext: name}}."""
+    names = {}
+    for label, formats in rendered.items():
+        names[label] = {}
+        for ext, content in formats.items():
+            name = f"{VARIANT_DIR}{hashlib.sha256(content).hexdigest()}.{ext}"
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            names[label][ext] = name
+    return names
+
+
+def generate(profile_id):
+    """Build and record the variants of the profile's current picture, if missing."""
+    profile = Profile.objects.filter(pk=profile_id).only("profile_picture", "profile_picture_variants").first()
+    if profile is None or not profile.profile_picture:
+        return
+    source = profile.profile_picture.name
+    if profile.profile_picture_variants.get("source") == source:
+        return
+    with profile.profile_picture.open("rb") as f:
+        data = f.read()
+    variants = {"source": source, "sizes": store_variants(render_variants(data))}
+    # Skip the write if another upload replaced the picture meanwhile.
+    Profile.objects.filter(pk=profile_id, profile_picture=source).update(profile_picture_variants=variants)
+
+
+def _run(profile_id):
+    try:
+        generate(profile_id)
+    except Exception:
+        logger.exception("Could not generate profile picture variants for profile %s", profile_id)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit(profile_id):
+    global _executor
+    if workers() <= 0:
+        generate(profile_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix="profile-pictures")
+    _executor.submit(_run, profile_id)
+
+
+@receiver(post_save, sender=Profile)
+def queue_variants(sender, instance, **kwargs):
+    variants = instance.profile_picture_variants or {}
+    if instance.profile_picture and variants.get("source") != instance.profile_picture.name:
+        profile_id = instance.pk
+        transaction.on_commit(lambda: submit(profile_id))
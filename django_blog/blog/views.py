@@ -1,3 +1,6 @@
+from pathlib import Path
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
@@ -6,7 +9,10 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 
+from django.views.static import serve
+
 from .models import Post, Comment, Tag
+from . import thumbnails
 from .forms import PostForm, CommentForm
 
 
@@ -81,6 +87,10 @@ class PostDetailView(DetailView):
     model = Post
     template_name = "blog/post_detail.html"
     context_object_name = "post"
+    # The template walks tags and comments with their authors; load them
+    # up front instead of one query per comment (see django_blog/profiling.py).
+    queryset = Post.objects.select_related("author").prefetch_related("tags", "comments__author")
+    query_budget = 10
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -190,3 +200,14 @@ class CommentDeleteView(LoginRequiredMixin, CommentAuthorRequiredMixin, DeleteVi
 
     def get_success_url(self):
         return reverse_lazy("post-detail", kwargs={"pk": self.object.post.pk})
+
+
+def profile_picture_variant(request, path):
+    """
+    Serve a resized profile picture from MEDIA_ROOT with its long-lived
+    cache headers, like static() serves the rest of MEDIA_URL: routed only
+    when DEBUG is on.
+    """
+    response = serve(request, path, document_root=Path(settings.MEDIA_ROOT) / thumbnails.VARIANT_DIR)
+    response["Cache-Control"] = settings.PROFILE_PICTURE_CACHE_CONTROL
+    return response
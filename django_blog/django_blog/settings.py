@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so middleware queries (sessions, auth) are counted too.
+    'django_blog.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +53,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request profiling (django_blog/profiling.py): query count, DB time,
+# duplicate queries and serializer/template time per request, logged on
+# "django_blog.profiling" and sent as a Server-Timing header when DEBUG is on.
+# Views can set a `query_budget`; going over it is logged, and fails
+# `manage.py test` (QueryBudgetTestRunner turns on QUERY_BUDGET_RAISE).
+QUERY_PROFILE_SLOW_MS = 500
+QUERY_BUDGET = None
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = "django_blog.runner.QueryBudgetTestRunner"
+
 ROOT_URLCONF = 'django_blog.urls'
 
 TEMPLATES = [
@@ -75,6 +87,14 @@ LOGIN_URL = "login"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Profile pictures are cropped to these square sizes (px) as WebP and JPEG
+# by a pool of PROFILE_PICTURE_WORKERS threads (blog/thumbnails.py).
+PROFILE_PICTURE_SIZES = {"small": 48, "medium": 160, "large": 400}
+PROFILE_PICTURE_WORKERS = 2
+PROFILE_PICTURE_QUALITY = 82
+# Variant names are content hashes, so they can be cached forever.
+PROFILE_PICTURE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 WSGI_APPLICATION = 'django_blog.wsgi.application'
 
 
@@ -19,11 +19,18 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from blog.thumbnails import VARIANT_DIR
+from blog.views import profile_picture_variant
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", include("blog.urls")),
-    
 ]
 
 if settings.DEBUG:
+    # Development only. In production the web server or CDN serves
+    # MEDIA_URL and sends PROFILE_PICTURE_CACHE_CONTROL for the variants.
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.lstrip('/')}{VARIANT_DIR}<path:path>", profile_picture_variant),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
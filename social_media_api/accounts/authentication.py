@@ -0,0 +1,234 @@
+"""
+Token authentication with a lookup cache.
+
+DRF's TokenAuthentication runs a Token SELECT joined to the user on every
+request. CachedTokenAuthentication keeps token -> entry in a bounded
+per-process LRU (TOKEN_AUTH_LOCAL_CACHE_SIZE entries, each valid for
+TOKEN_AUTH_LOCAL_TTL seconds) and, if TOKEN_AUTH_SHARED_CACHE names a
+cache alias, in that shared cache for TOKEN_AUTH_SHARED_TTL seconds.
+
+An entry only holds the user fields authentication and permission checks
+read (USER_FIELDS). Each request gets a fresh User built from them, with
+every other field, the password hash included, deferred and loaded from
+the database if a view reads it.
+
+Entries are evicted when a token is deleted, or when a user is saved with
+a change to one of those fields or the password (deactivation, password
+change). Saves that only touch other fields, like last_login on every
+login or profile edits, leave them alone. Other processes only see the
+eviction through the shared cache, so the local TTL is kept short: it
+bounds how long a revoked token can keep working on another worker.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+
+# Cached with the token; the rest of the user is loaded only on access.
+USER_FIELDS = ("id", "username", "is_active", "is_staff", "is_superuser")
+# Saves that change any of these evict the user's tokens.
+AUTH_STATE_FIELDS = frozenset(USER_FIELDS) | {"password"}
+
+
+def local_cache_size():
+    return getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_SIZE", 10_000)
+
+
+def local_ttl():
+    return getattr(settings, "TOKEN_AUTH_LOCAL_TTL", 30)
+
+
+def shared_ttl():
+    return getattr(settings, "TOKEN_AUTH_SHARED_TTL", 300)
+
+
+def shared_cache():
+    alias = getattr(settings, "TOKEN_AUTH_SHARED_CACHE", None)
+    return caches[alias] if alias else None
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with per-entry expiry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > local_cache_size():
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = LRUCache()
+
+
+def shared_key(key):
+    # Never put raw tokens into a shared cache.
+    return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_entry(token):
+    """What is cached for `token`: plain values, never the whole user row."""
+    return {"created": token.created, "user": {name: getattr(token.user, name) for name in USER_FIELDS}}
+
+
+def token_from_entry(key, entry):
+    """A Token and its partially loaded User, new for every request."""
+    User = get_user_model()
+    fields = entry["user"]
+    # from_db() wants the loaded fields in model order.
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+    user = User.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+    token = Token(key=key, user_id=user.pk, created=entry["created"])
+    token.user = user
+    return token
+
+
+def cache_token(token):
+    """Store a token's entry in both cache levels."""
+    entry = token_entry(token)
+    local_tokens.set(token.key, entry, local_ttl())
+    shared = shared_cache()
+    if shared is not None:
+        shared.set(shared_key(token.key), entry, shared_ttl())
+
+
+def evict_token(key):
+    local_tokens.delete(key)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(shared_key(key))
+
+
+def warm_token_cache(token_or_key):
+    """Called by login/register so the client's first request is a cache hit."""
+    if isinstance(token_or_key, Token):
+        token = token_or_key
+        token.user  # make sure the user travels with the cached token
+    else:
+        token = Token.objects.select_related("user").get(key=token_or_key)
+    cache_token(token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        if entry is None:
+            shared = shared_cache()
+            if shared is not None:
+                entry = shared.get(shared_key(key))
+                if entry is not None:
+                    local_tokens.set(key, entry, local_ttl())
+        if entry is not None:
+            token = token_from_entry(key, entry)
+        else:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            cache_token(token)
+
+        return self._check(token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, without blocking on the cache or DB."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Invalid token header. Token string should not contain invalid characters.")
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        shared = shared_cache()
+        if entry is None and shared is not None:
+            entry = await shared.aget(shared_key(key))
+            if entry is not None:
+                local_tokens.set(key, entry, local_ttl())
+        if entry is not None:
+            token = token_from_entry(key, entry)
+        else:
+            try:
+                token = await Token.objects.select_related("user").aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            await sync_to_async(cache_token)(token)
+        return self._check(token)
+
+    def _check(self, token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    evict_token(instance.key)
+
+
+def auth_state(user):
+    """The AUTH_STATE_FIELDS values of `user`, or None if some are not loaded."""
+    try:
+        return tuple(user.__dict__[name] for name in sorted(AUTH_STATE_FIELDS))
+    except KeyError:
+        return None
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_auth_state(sender, instance, **kwargs):
+    instance._token_auth_state = auth_state(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_saved_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    state = auth_state(instance)
+    previous, instance._token_auth_state = instance._token_auth_state, state
+    if created:
+        return
+    if update_fields is not None and not AUTH_STATE_FIELDS.intersection(update_fields):
+        return
+    # Unknown (deferred fields) counts as changed.
+    if state is not None and state == previous:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list("key", flat=True):
+        evict_token(key)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the follow graph into memory and store who-to-follow suggestions (two-hop accounts "
+        "ranked by mutual follows) for every user who follows someone. Run it periodically, more "
+        "often than SUGGESTIONS_TTL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="Only this user id (repeatable).")
+        parser.add_argument("--batch-size", type=int, help="Users per write (default SUGGESTIONS_BATCH_SIZE).")
+        parser.add_argument("--limit", type=int, help="Candidates per user (default SUGGESTIONS_PER_USER).")
+        parser.add_argument("--chunk-size", type=int, default=10_000, help="Edges per database fetch.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = suggestions.FollowGraph.load(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Loaded {graph.edge_count} edges ({graph.nbytes / 2**20:.1f} MiB) "
+            f"in {time.monotonic() - started:.1f}s."
+        )
+
+        computed = suggestions.compute(graph, options["users"], size=options["batch_size"], limit=options["limit"])
+        purged = suggestions.purge_expired()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored suggestions for {computed} users, purged {purged} expired "
+                f"({time.monotonic() - started:.1f}s)."
+            )
+        )
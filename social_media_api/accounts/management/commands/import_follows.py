@@ -0,0 +1,85 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Follow
+
+
+def read_csv(handle):
+    for row in csv.reader(handle):
+        if not row or not row[0].strip().lstrip("-").isdigit():
+            continue  # blank line or header
+        yield int(row[0]), int(row[1])
+
+
+def read_jsonl(handle):
+    for line in handle:
+        line = line.strip()
+        if line:
+            record = json.loads(line)
+            yield int(record["follower"]), int(record["followee"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream follow edges from a CSV (follower_id,followee_id) or JSONL "
+        '({"follower": id, "followee": id}) file into the Follow table in batches. '
+        "Use '-' to read stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Run rebuild_counters and rebuild_timelines after the import.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        reader = read_jsonl if fmt == "jsonl" else read_csv
+
+        handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            read, skipped = self.load(reader(handle), options["batch_size"])
+        except (ValueError, KeyError, IndexError) as exc:
+            raise CommandError(f"Malformed input: {exc}")
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Read {read} edges, skipped {skipped} (self or unknown users)."))
+        if options["rebuild"]:
+            call_command("rebuild_counters", stdout=self.stdout)
+            call_command("rebuild_timelines", stdout=self.stdout)
+        else:
+            self.stdout.write("Counters and timelines were not updated; run rebuild_counters and rebuild_timelines.")
+
+    def load(self, edges, batch_size):
+        User = get_user_model()
+        read = skipped = 0
+        while True:
+            batch = list(islice(edges, batch_size))
+            if not batch:
+                return read, skipped
+            read += len(batch)
+
+            # ignore_conflicts only covers the unique constraint, so unknown
+            # ids are filtered out up front with one query per batch.
+            ids = {user_id for edge in batch for user_id in edge}
+            known = set(User.objects.filter(id__in=ids).values_list("id", flat=True))
+            rows = [
+                Follow(follower_id=follower, followee_id=followee)
+                for follower, followee in batch
+                if follower != followee and follower in known and followee in known
+            ]
+            skipped += len(batch) - len(rows)
+            Follow.objects.bulk_create(rows, ignore_conflicts=True)
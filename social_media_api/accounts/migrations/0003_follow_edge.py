@@ -0,0 +1,81 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_follow_edges(apps, schema_editor):
+    """
+    Merge the old self-referential M2M join table into Follow.
+
+    In the old table a row (from_user, to_user) came from
+    `from_user.followers.add(to_user)`, i.e. to_user follows from_user.
+    """
+    User = apps.get_model("accounts", "User")
+    Follow = apps.get_model("accounts", "Follow")
+    OldEdge = User.followers.through
+    db = schema_editor.connection.alias
+
+    batch = []
+    for followee_id, follower_id in OldEdge.objects.using(db).values_list("from_user_id", "to_user_id").iterator(chunk_size=5000):
+        if followee_id == follower_id:
+            continue
+        batch.append(Follow(follower_id=follower_id, followee_id=followee_id))
+        if len(batch) >= 5000:
+            Follow.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Follow.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+def copy_follow_edges_back(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    Follow = apps.get_model("accounts", "Follow")
+    OldEdge = User.followers.through
+    db = schema_editor.connection.alias
+
+    OldEdge.objects.using(db).bulk_create(
+        (
+            OldEdge(from_user_id=followee_id, to_user_id=follower_id)
+            for follower_id, followee_id in Follow.objects.using(db).values_list("follower_id", "followee_id").iterator()
+        ),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followee', '-created_at'], name='follow_followee_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow_edge'),
+        ),
+        migrations.RunPython(copy_follow_edges, copy_follow_edges_back),
+        migrations.RemoveField(
+            model_name='user',
+            name='followers',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following',
+            field=models.ManyToManyField(blank=True, related_name='followers', through='accounts.Follow', through_fields=('follower', 'followee'), to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,25 +1,251 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .signals import user_followed, user_unfollowed, users_followed, users_unfollowed
 
 
 class User(AbstractUser):
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to="profile_pics/", blank=True, null=True)
+    # Resized copies of profile_picture, written by accounts/thumbnails.py.
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
-    # Users can follow other users (non-symmetrical)
-    followers = models.ManyToManyField(
-        "self",
-        symmetrical=False,
-        related_name="following",
-        blank=True,
-    )
-    
+    # Users can follow other users (non-symmetrical). Each edge is one
+    # Follow row: `user.following` are the users `user` follows and the
+    # reverse accessor `user.followers` are the users following `user`.
     following = models.ManyToManyField(
         "self",
+        through="Follow",
+        through_fields=("follower", "followee"),
         symmetrical=False,
         related_name="followers",
         blank=True,
     )
 
+    # Denormalized counters, kept in step with F() updates by
+    # Follow.objects.follow()/unfollow() and, for edges written through
+    # the related managers, sync_counts_on_m2m_change().
+    # `manage.py rebuild_counters` recomputes them if they drift.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.username
+
+
+class FollowManager(models.Manager):
+    def follow(self, follower_id, followee_id):
+        """
+        Create the follower -> followee edge with a single INSERT.
+
+        Returns False if the edge already existed. Counters are bumped in
+        the same transaction and `user_followed` is sent on success.
+        """
+        try:
+            with transaction.atomic():
+                self.create(follower_id=follower_id, followee_id=followee_id)
+                adjust_follow_counts(follower_id, followee_id, 1)
+        except IntegrityError:
+            return False
+        user_followed.send(sender=Follow, follower_id=follower_id, followee_id=followee_id)
+        return True
+
+    def unfollow(self, follower_id, followee_id):
+        """Delete the edge with a single DELETE. Returns False if there was none."""
+        with transaction.atomic():
+            deleted, _ = self.filter(follower_id=follower_id, followee_id=followee_id).delete()
+            if deleted:
+                adjust_follow_counts(follower_id, followee_id, -1)
+        if deleted:
+            user_unfollowed.send(sender=Follow, follower_id=follower_id, followee_id=followee_id)
+        return bool(deleted)
+
+    # Async views: the write, counters and signal receivers run together
+    # in one worker thread, as transactions can't span awaits.
+    async def afollow(self, follower_id, followee_id):
+        return await sync_to_async(self.follow)(follower_id, followee_id)
+
+    async def aunfollow(self, follower_id, followee_id):
+        return await sync_to_async(self.unfollow)(follower_id, followee_id)
+
+    def follow_many(self, follower_id, followee_ids):
+        """
+        Follow every existing user in `followee_ids` with one validation
+        query, one read of the current edges and one bulk INSERT.
+
+        Returns a dict of id -> "followed" | "already_following" |
+        "not_found" | "self". Counters and `users_followed` only cover the
+        edges the INSERT actually created, so an edge a concurrent request
+        wrote after the read is reported as "already_following".
+        """
+        followee_ids = list(dict.fromkeys(followee_ids))
+        existing = set(User.objects.filter(id__in=followee_ids).values_list("id", flat=True))
+        already = set(
+            self.filter(follower_id=follower_id, followee_id__in=existing).values_list("followee_id", flat=True)
+        )
+        results = {}
+        new_ids = []
+        for followee_id in followee_ids:
+            if followee_id == follower_id:
+                results[followee_id] = "self"
+            elif followee_id not in existing:
+                results[followee_id] = "not_found"
+            elif followee_id in already:
+                results[followee_id] = "already_following"
+            else:
+                results[followee_id] = "followed"
+                new_ids.append(followee_id)
+
+        if not new_ids:
+            return results
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            created = self._insert_edges(db, follower_id, new_ids)
+            if created:
+                users = User.objects.using(db)
+                users.filter(pk=follower_id).update(following_count=F("following_count") + len(created))
+                users.filter(pk__in=created).update(followers_count=F("followers_count") + 1)
+        for followee_id in set(new_ids).difference(created):
+            results[followee_id] = "already_following"
+        if created:
+            users_followed.send(sender=Follow, follower_id=follower_id, followee_ids=created)
+        return results
+
+    def _insert_edges(self, db, follower_id, followee_ids):
+        """INSERT the edges, skipping existing ones; returns the followee ids actually inserted."""
+        connection = connections[db]
+        if connection.vendor not in ("postgresql", "sqlite") or not connection.features.can_return_columns_from_insert:
+            # Backends without INSERT ... ON CONFLICT ... RETURNING: one
+            # savepoint per edge, as in follow().
+            created = []
+            for followee_id in followee_ids:
+                try:
+                    with transaction.atomic(using=db):
+                        self.using(db).create(follower_id=follower_id, followee_id=followee_id)
+                except IntegrityError:
+                    continue
+                created.append(followee_id)
+            return created
+
+        qn = connection.ops.quote_name
+        fields = [self.model._meta.get_field(name) for name in ("follower", "followee", "created_at")]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        created = []
+        with connection.cursor() as cursor:
+            batch_size = connection.ops.bulk_batch_size(fields, followee_ids)
+            for start in range(0, len(followee_ids), batch_size):
+                batch = followee_ids[start:start + batch_size]
+                # ON CONFLICT covers the (follower, followee) unique
+                # constraint; RETURNING lists only the rows written.
+                cursor.execute(
+                    f"INSERT INTO {qn(self.model._meta.db_table)} (follower_id, followee_id, created_at) "
+                    f"VALUES {', '.join(['(%s, %s, %s)'] * len(batch))} "
+                    f"ON CONFLICT DO NOTHING RETURNING followee_id",
+                    [param for followee_id in batch for param in (follower_id, followee_id, now)],
+                )
+                created.extend(row[0] for row in cursor.fetchall())
+        return created
+
+    def unfollow_many(self, follower_id, followee_ids):
+        """Bulk counterpart of unfollow(). Returns id -> "unfollowed" | "not_following"."""
+        followee_ids = list(dict.fromkeys(followee_ids))
+        edges = self.filter(follower_id=follower_id, followee_id__in=followee_ids)
+        with transaction.atomic():
+            removed = list(edges.values_list("followee_id", flat=True))
+            if removed:
+                edges.delete()
+                User.objects.filter(pk=follower_id).update(following_count=F("following_count") - len(removed))
+                User.objects.filter(pk__in=removed).update(followers_count=F("followers_count") - 1)
+        if removed:
+            users_unfollowed.send(sender=Follow, follower_id=follower_id, followee_ids=removed)
+        removed = set(removed)
+        return {i: "unfollowed" if i in removed else "not_following" for i in followee_ids}
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name="following_edges")
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name="follower_edges")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FollowManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "followee"], name="unique_follow_edge"),
+        ]
+        indexes = [
+            # Reverse lookups ("who follows X", newest first) for fan-out
+            # and recent-followers queries. The unique constraint above
+            # already covers the follower side.
+            models.Index(fields=["followee", "-created_at"], name="follow_followee_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} follows {self.followee_id}"
+
+
+def adjust_follow_counts(follower_id, followee_id, delta):
+    User.objects.filter(pk=follower_id).update(following_count=F("following_count") + delta)
+    User.objects.filter(pk=followee_id).update(followers_count=F("followers_count") + delta)
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_counts_on_m2m_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Counters and cached profiles for edges written through the related
+    managers (user.following.add(), user.followers.clear(), the admin),
+    which bypass follow()/unfollow(). Timelines are synced by
+    posts.signals.sync_timeline_on_m2m_change.
+    """
+    from . import profiles
+
+    # reverse=False: instance.following changed, the other ends are followees.
+    # reverse=True: instance.followers changed, the other ends are followers.
+    own, other = ("followee", "follower") if reverse else ("follower", "followee")
+    if action in ("pre_remove", "pre_clear"):
+        # post_remove gets every pk passed to remove(), edges or not, and
+        # post_clear gets none, so read the edges about to go. The related
+        # manager deletes them in the same transaction; locking them keeps
+        # a concurrent unfollow from being counted twice.
+        edges = Follow.objects.using(using).filter(**{own: instance.pk})
+        if action == "pre_remove":
+            edges = edges.filter(**{f"{other}__in": pk_set})
+        instance._follow_edges_removed = list(edges.select_for_update().values_list(other, flat=True))
+        return
+    if action == "post_add":
+        # Only the edges that were missing and got inserted.
+        changed, delta = list(pk_set), 1
+    elif action in ("post_remove", "post_clear"):
+        changed, delta = vars(instance).pop("_follow_edges_removed", []), -1
+    else:
+        return
+    if not changed:
+        return
+
+    own_count, other_count = ("followers_count", "following_count") if reverse else ("following_count", "followers_count")
+    users = User.objects.using(using)
+    with transaction.atomic(using=using):
+        users.filter(pk=instance.pk).update(**{own_count: F(own_count) + delta * len(changed)})
+        users.filter(pk__in=changed).update(**{other_count: F(other_count) + delta})
+    profiles.bump_versions([instance.pk, *changed])
+
+
+class FollowSuggestions(models.Model):
+    """
+    Who-to-follow candidates for one user, written by
+    `manage.py compute_suggestions` (accounts/suggestions.py) and read
+    back by primary key.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="follow_suggestions")
+    # [[candidate_id, mutual_count], ...], best first.
+    candidates = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return f"Suggestions for {self.user_id}"
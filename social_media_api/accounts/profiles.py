@@ -0,0 +1,187 @@
+"""
+Serialized user profiles (UserSerializer output) in Django's cache.
+
+Each profile is cached under `accounts:profile:<id>` together with the
+stamp it was built for: the user's version counter
+(`accounts:profile:version:<id>`) and a global generation. Changes never
+delete profile keys. They bump the version, and an entry whose stamp is
+behind is treated as a miss and rebuilt. Bumps happen right away and
+again when the surrounding transaction commits:
+
+  - when a User is saved or deleted (profile edits, picture uploads,
+    deactivation);
+  - for both ends of a follow or unfollow, whose counters are written
+    with UPDATEs that send no post_save;
+  - for everyone at once (the generation) after rebuild_counters.
+
+get_profiles() fetches the generation, the versions and the profiles of a
+whole list of users in one get_many(). It then reads the users that
+missed with one query against the primary and stores them with one
+set_many(). A version that is missing from the cache restarts from the
+current time in nanoseconds, so it never goes back to a value an old
+entry was stamped with. Entries expire after PROFILE_CACHE_TIMEOUT
+seconds.
+
+The cache is the PROFILE_CACHE alias, which has to be shared by every
+worker (Redis): a bump only reaches the cache it is written to, so with
+per-process memory the other workers would keep serving the old profile
+until it expired. Without a shared cache (the setting is None) bumps do
+nothing and get_profiles() reads the users from the database.
+
+Profiles are cached without a request, so profile_picture and its
+variants are relative URLs; represent() makes them absolute like UserSerializer does with a
+request in its context.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Follow
+from .serializers import UserSerializer
+from .signals import user_followed, user_unfollowed, users_followed, users_unfollowed
+
+GENERATION_KEY = "accounts:profile:generation"
+
+
+def cache_timeout():
+    return getattr(settings, "PROFILE_CACHE_TIMEOUT", 3600)
+
+
+def shared_cache():
+    alias = getattr(settings, "PROFILE_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def profile_key(user_id):
+    return f"accounts:profile:{user_id}"
+
+
+def version_key(user_id):
+    return f"accounts:profile:version:{user_id}"
+
+
+def _bump(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _bump_now_and_on_commit(keys):
+    cache = shared_cache()
+    if cache is None:
+        return
+
+    # Inside a transaction a concurrent reader can still see (and cache)
+    # the old row after the first bump, so bump again once it commits.
+    def bump():
+        for key in keys:
+            _bump(cache, key)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def bump_versions(user_ids):
+    """Invalidate the cached profiles of `user_ids`."""
+    _bump_now_and_on_commit([version_key(user_id) for user_id in user_ids])
+
+
+def bump_generation():
+    """Invalidate every cached profile."""
+    _bump_now_and_on_commit([GENERATION_KEY])
+
+
+def _read_profiles(user_ids):
+    # From the primary: a replica may not have the write behind a bump yet.
+    users = get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(pk__in=user_ids, is_active=True)
+    return {user.pk: UserSerializer(user).data for user in users}
+
+
+def get_profiles(user_ids):
+    """{user_id: profile dict} for the active users among `user_ids`, in order."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    cache = shared_cache()
+    if cache is None:
+        profiles = _read_profiles(user_ids)
+        return {user_id: profiles[user_id] for user_id in user_ids if user_id in profiles}
+
+    found = cache.get_many([GENERATION_KEY, *map(version_key, user_ids), *map(profile_key, user_ids)])
+
+    # Counters missing from the cache are started before the users are read,
+    # so a bump racing with the read still makes the stored entries stale.
+    started = {}
+    generation = found.get(GENERATION_KEY)
+    if generation is None:
+        generation = started[GENERATION_KEY] = time.time_ns()
+    profiles = {}
+    stamps = {}
+    for user_id in user_ids:
+        version = found.get(version_key(user_id))
+        if version is None:
+            version = started[version_key(user_id)] = time.time_ns()
+        entry = found.get(profile_key(user_id))
+        if entry is not None and entry[0] == (generation, version):
+            profiles[user_id] = entry[1]
+        else:
+            stamps[user_id] = (generation, version)
+    if started:
+        cache.set_many(started, None)
+
+    if stamps:
+        fresh = _read_profiles(stamps)
+        cache.set_many(
+            {profile_key(user_id): (stamps[user_id], dict(data)) for user_id, data in fresh.items()},
+            cache_timeout(),
+        )
+        profiles.update(fresh)
+    return {user_id: profiles[user_id] for user_id in user_ids if user_id in profiles}
+
+
+def get_profile(user_id):
+    """The cached profile of `user_id`, or None if there is no such active user."""
+    return get_profiles([user_id]).get(user_id)
+
+
+def represent(profile, request):
+    """`profile` as UserSerializer would render it for `request`."""
+    if profile is None or not profile.get("profile_picture") or request is None:
+        return profile
+    variants = profile.get("profile_picture_variants")
+    if variants:
+        variants = {
+            label: {ext: request.build_absolute_uri(url) for ext, url in urls.items()}
+            for label, urls in variants.items()
+        }
+    return {
+        **profile,
+        "profile_picture": request.build_absolute_uri(profile["profile_picture"]),
+        "profile_picture_variants": variants,
+    }
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def bump_saved_user(sender, instance, **kwargs):
+    # Also on create: ids can be reused (e.g. after a rollback).
+    bump_versions([instance.pk])
+
+
+@receiver(user_followed, sender=Follow)
+@receiver(user_unfollowed, sender=Follow)
+def bump_on_follow(sender, follower_id, followee_id, **kwargs):
+    bump_versions([follower_id, followee_id])
+
+
+@receiver(users_followed, sender=Follow)
+@receiver(users_unfollowed, sender=Follow)
+def bump_on_bulk_follow(sender, follower_id, followee_ids, **kwargs):
+    bump_versions([follower_id, *followee_ids])
@@ -2,10 +2,13 @@ from django.contrib.auth import authenticate, get_user_model
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
 
+from .thumbnails import current_variants
+
 
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(source="followers.count", read_only=True)
-    following_count = serializers.IntegerField(source="following.count", read_only=True)
+    # {"small": {"webp": url, "jpeg": url}, ...}; null until the resized
+    # copies of the current picture exist (accounts/thumbnails.py).
+    profile_picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
@@ -17,11 +20,26 @@ class UserSerializer(serializers.ModelSerializer):
             "last_name",
             "bio",
             "profile_picture",
+            "profile_picture_variants",
             "followers_count",
             "following_count",
         ]
         read_only_fields = ["id", "followers_count", "following_count"]
 
+    def get_profile_picture_variants(self, user):
+        sizes = current_variants(user)
+        if sizes is None:
+            return None
+        storage = user.profile_picture.storage
+        request = self.context.get("request")
+        return {
+            label: {
+                ext: request.build_absolute_uri(storage.url(name)) if request else storage.url(name)
+                for ext, name in formats.items()
+            }
+            for label, formats in sizes.items()
+        }
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
@@ -75,4 +93,11 @@ class LoginSerializer(serializers.Serializer):
         return {
             "user": user,
             "token": token.key,
-        }
\ No newline at end of file
+        }
+
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent by Follow.objects.follow()/unfollow() after the edge is written.
+# Arguments: follower_id, followee_id.
+user_followed = Signal()
+user_unfollowed = Signal()
+
+# Sent by Follow.objects.follow_many()/unfollow_many().
+# Arguments: follower_id, followee_ids (the edges actually changed).
+users_followed = Signal()
+users_unfollowed = Signal()
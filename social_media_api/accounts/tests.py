@@ -1,3 +1,414 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from . import profiles, suggestions, thumbnails
+from .authentication import local_tokens
+from .models import Follow, FollowManager, FollowSuggestions
+from .signals import users_followed
+from .views import profile_picture_variant
+
+User = get_user_model()
+
+
+class FollowTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pass12345")
+        self.bob = User.objects.create_user(username="bob", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.alice).key}")
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.client.post(f"/api/accounts/follow/{self.bob.id}/")
+        self.client.post(f"/api/accounts/follow/{self.bob.id}/")
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 1)
+        self.assertEqual(self.bob.followers_count, 1)
+
+        self.client.post(f"/api/accounts/unfollow/{self.bob.id}/")
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 0)
+        self.assertEqual(self.bob.followers_count, 0)
+
+    def test_profile_reads_counter_columns(self):
+        User.objects.filter(pk=self.alice.pk).update(followers_count=7)
+        res = self.client.get("/api/accounts/profile/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["followers_count"], 7)
+
+    def test_profile_is_revalidated_with_etag(self):
+        etag = self.client.get("/api/accounts/profile/")["ETag"]
+        self.assertEqual(self.client.get("/api/accounts/profile/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Follow.objects.follow(self.bob.id, self.alice.id)
+        res = self.client.get("/api/accounts/profile/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["followers_count"], 1)
+
+    def test_follow_writes_one_edge_and_is_idempotent(self):
+        self.assertTrue(Follow.objects.follow(self.alice.id, self.bob.id))
+        self.assertFalse(Follow.objects.follow(self.alice.id, self.bob.id))
+        self.assertEqual(list(self.alice.following.all()), [self.bob])
+        self.assertEqual(list(self.bob.followers.all()), [self.alice])
+
+    @override_settings(PROFILE_CACHE="default")
+    def test_related_manager_writes_keep_counters_and_profiles(self):
+        carol = User.objects.create_user(username="carol", password="pass12345")
+        profiles.get_profiles([self.alice.id, self.bob.id])
+
+        self.alice.following.add(self.bob, carol)
+        self.bob.followers.add(carol)
+        self.alice.following.remove(self.bob, self.bob)
+        self.alice.following.remove(self.bob)  # no edge left: nothing to count
+        self.assertEqual(profiles.get_profile(self.alice.id)["following_count"], 1)
+        self.assertEqual(profiles.get_profile(self.bob.id)["followers_count"], 1)
+
+        self.bob.followers.clear()
+        self.alice.following.clear()
+        for user in (self.alice, self.bob, carol):
+            user.refresh_from_db()
+            self.assertEqual((user.followers_count, user.following_count), (0, 0))
+
+    def test_follow_unknown_user_is_404(self):
+        res = self.client.post("/api/accounts/follow/9999/")
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(Follow.objects.exists())
+
+
+@override_settings(PROFILE_CACHE="default")
+class ProfileCacheTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pass12345")
+        self.bob = User.objects.create_user(username="bob", password="pass12345")
+
+    def test_get_profiles_fills_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(profiles.get_profiles([self.bob.id, self.alice.id, 9999])), [self.bob.id, self.alice.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(profiles.get_profile(self.alice.id)["username"], "alice")
+
+    def test_saves_and_follows_bump_versions(self):
+        profiles.get_profiles([self.alice.id, self.bob.id])
+        self.alice.bio = "hello"
+        self.alice.save()
+        self.assertEqual(profiles.get_profile(self.alice.id)["bio"], "hello")
+
+        Follow.objects.follow(self.alice.id, self.bob.id)
+        self.assertEqual(profiles.get_profile(self.alice.id)["following_count"], 1)
+        self.assertEqual(profiles.get_profile(self.bob.id)["followers_count"], 1)
+
+        # Counter rebuilds bypass post_save and bump the generation instead.
+        carol = User.objects.create_user(username="carol", password="pass12345")
+        Follow.objects.create(follower=carol, followee=self.bob)
+        self.assertEqual(profiles.get_profile(self.bob.id)["followers_count"], 1)
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertEqual(profiles.get_profile(self.bob.id)["followers_count"], 2)
+
+    def test_deactivated_users_drop_out(self):
+        profiles.get_profile(self.bob.id)
+        self.bob.is_active = False
+        self.bob.save()
+        self.assertIsNone(profiles.get_profile(self.bob.id))
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "worker_a": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+        "worker_b": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+    })
+    def test_bumps_reach_other_workers_through_a_shared_cache(self):
+        # Two cache instances over one store stand in for two workers on Redis.
+        with override_settings(PROFILE_CACHE="worker_b"):
+            profiles.get_profile(self.alice.id)
+        with override_settings(PROFILE_CACHE="worker_a"):
+            self.alice.bio = "hello"
+            self.alice.save()
+        with override_settings(PROFILE_CACHE="worker_b"):
+            self.assertEqual(profiles.get_profile(self.alice.id)["bio"], "hello")
+
+    @override_settings(PROFILE_CACHE=None)
+    def test_without_a_shared_cache_profiles_come_from_the_database(self):
+        caches["default"].clear()
+        profiles.get_profile(self.alice.id)
+        self.alice.bio = "hello"
+        self.alice.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(profiles.get_profile(self.alice.id)["bio"], "hello")
+        self.assertIsNone(caches["default"].get(profiles.profile_key(self.alice.id)))
+
+
+@override_settings(PROFILE_PICTURE_WORKERS=0, PROFILE_PICTURE_SIZES={"small": 16, "large": 64})
+class ProfilePictureTests(APITestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = User.objects.create_user(username="alice", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def upload(self, color, size=(200, 100)):
+        buffer = BytesIO()
+        Image.new("RGB", size, color).save(buffer, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                "/api/accounts/profile/",
+                {"profile_picture": SimpleUploadedFile("me.png", buffer.getvalue(), content_type="image/png")},
+                format="multipart",
+            )
+
+    def test_upload_serves_hashed_variants_with_cache_headers(self):
+        self.assertEqual(self.upload("red").status_code, 200)
+        variants = self.client.get("/api/accounts/profile/").data["profile_picture_variants"]
+        self.assertEqual({label: set(urls) for label, urls in variants.items()}, {
+            "small": {"webp", "jpeg"}, "large": {"webp", "jpeg"},
+        })
+        url = variants["large"]["webp"].removeprefix("http://testserver")
+        self.assertTrue(url.startswith("/media/profile_pics/variants/"))
+
+        # Only routed with DEBUG on; production serves MEDIA_URL itself.
+        self.assertEqual(self.client.get(url).status_code, 404)
+        res = profile_picture_variant(RequestFactory().get(url), url.removeprefix("/media/" + thumbnails.VARIANT_DIR))
+        self.assertEqual(res["Cache-Control"], "public, max-age=31536000, immutable")
+        with Image.open(BytesIO(b"".join(res.streaming_content))) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (64, 64)))
+
+        # A new picture gets new names; the old variants are not served for it.
+        self.upload("blue")
+        self.assertNotEqual(self.client.get("/api/accounts/profile/").data["profile_picture_variants"], variants)
+
+    def test_variants_wait_for_the_worker(self):
+        with self.settings(PROFILE_PICTURE_WORKERS=1), patch.object(thumbnails, "_executor") as executor:
+            self.upload("red")
+        executor.submit.assert_called_once_with(thumbnails._run, self.user.id)
+        self.assertIsNone(self.client.get("/api/accounts/profile/").data["profile_picture_variants"])
+
+    def test_small_pictures_are_not_upscaled(self):
+        buffer = BytesIO()
+        Image.new("RGBA", (30, 40)).save(buffer, "PNG")
+        rendered = thumbnails.render_variants(buffer.getvalue())
+        with Image.open(BytesIO(rendered["large"]["jpeg"])) as image:
+            self.assertEqual(image.size, (30, 30))
+
+
+# The badge count is cached too, so a cached request runs no queries at all.
+@override_settings(NOTIFICATIONS_UNREAD_CACHE="default")
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        local_tokens.clear()
+        self.user = User.objects.create_user(username="carol", password="pass12345")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeat_requests_skip_token_lookup(self):
+        self.assertEqual(self.client.get("/api/notifications/unread-count/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/notifications/unread-count/").status_code, 200)
+
+    def test_login_warms_cache(self):
+        local_tokens.clear()
+        self.client.credentials()
+        res = self.client.post("/api/accounts/login/", {"username": "carol", "password": "pass12345"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {res.data['token']}")
+        with self.assertNumQueries(0):
+            self.client.get("/api/notifications/unread-count/")
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/api/notifications/unread-count/")
+        self.token.delete()
+        self.assertEqual(self.client.get("/api/notifications/unread-count/").status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get("/api/notifications/unread-count/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/notifications/unread-count/").status_code, 401)
+
+    def test_entries_hold_auth_fields_and_survive_unrelated_saves(self):
+        self.client.get("/api/notifications/unread-count/")
+        entry = local_tokens.get(self.token.key)
+        self.assertEqual(set(entry["user"]), {"id", "username", "is_active", "is_staff", "is_superuser"})
+
+        update_last_login(None, self.user)
+        self.user.bio = "hello"
+        self.user.save()
+        self.assertEqual(local_tokens.get(self.token.key), entry)
+
+        self.user.set_password("new-pass-12345")
+        self.user.save()
+        self.assertIsNone(local_tokens.get(self.token.key))
+
+
+class BulkFollowTests(APITestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username="me", password="pass12345")
+        self.others = [User.objects.create_user(username=f"user{i}", password="pass12345") for i in range(3)]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.me).key}")
+
+    def test_bulk_follow_reports_per_id_results(self):
+        Follow.objects.follow(self.me.id, self.others[0].id)
+        ids = [o.id for o in self.others] + [self.me.id, 9999]
+
+        res = self.client.post("/api/accounts/follow/bulk/", {"user_ids": ids}, format="json")
+
+        self.assertEqual(res.status_code, 200)
+        statuses = {r["id"]: r["status"] for r in res.data["results"]}
+        self.assertEqual(statuses, {
+            self.others[0].id: "already_following",
+            self.others[1].id: "followed",
+            self.others[2].id: "followed",
+            self.me.id: "self",
+            9999: "not_found",
+        })
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 3)
+        self.assertEqual(set(self.me.following.all()), set(self.others))
+
+    def test_bulk_follow_counts_only_inserted_edges(self):
+        a, b, _ = self.others
+        insert = FollowManager._insert_edges
+
+        def racing_insert(manager, db, follower_id, followee_ids):
+            # A single follow landing between follow_many's read and its INSERT.
+            Follow.objects.follow(follower_id, a.id)
+            return insert(manager, db, follower_id, followee_ids)
+
+        sent = []
+
+        def receiver(sender, followee_ids, **kwargs):
+            sent.append(followee_ids)
+
+        users_followed.connect(receiver)
+        self.addCleanup(users_followed.disconnect, receiver)
+        with patch.object(FollowManager, "_insert_edges", racing_insert):
+            results = Follow.objects.follow_many(self.me.id, [a.id, b.id])
+
+        self.assertEqual(results, {a.id: "already_following", b.id: "followed"})
+        self.assertEqual(sent, [[b.id]])
+        self.me.refresh_from_db()
+        a.refresh_from_db()
+        self.assertEqual((self.me.following_count, a.followers_count), (2, 1))
+
+    def test_bulk_unfollow(self):
+        Follow.objects.follow_many(self.me.id, [o.id for o in self.others])
+        res = self.client.post(
+            "/api/accounts/unfollow/bulk/", {"user_ids": [self.others[0].id, 9999]}, format="json"
+        )
+        statuses = {r["id"]: r["status"] for r in res.data["results"]}
+        self.assertEqual(statuses, {self.others[0].id: "unfollowed", 9999: "not_following"})
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 2)
+
+    def test_import_follows_streams_csv(self):
+        a, b, c = self.others
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write(f"follower_id,followee_id\n{a.id},{b.id}\n{a.id},{b.id}\n{b.id},{c.id}\n{a.id},{a.id}\n{a.id},9999\n")
+        self.addCleanup(os.remove, handle.name)
+
+        call_command("import_follows", handle.name, "--batch-size", "2", "--rebuild", stdout=StringIO())
+
+        self.assertEqual(Follow.objects.count(), 2)
+        b.refresh_from_db()
+        self.assertEqual((b.followers_count, b.following_count), (1, 1))
+
+
+@override_settings(PROFILE_CACHE="default")
+class SuggestionTests(APITestCase):
+    def setUp(self):
+        # me -> a, b; a -> c, d; b -> c, e
+        self.me, self.a, self.b, self.c, self.d, self.e = [
+            User.objects.create_user(username=name, password="pass12345") for name in ("me", "a", "b", "c", "d", "e")
+        ]
+        for follower, followee in [
+            (self.me, self.a), (self.me, self.b), (self.a, self.c), (self.a, self.d),
+            (self.b, self.c), (self.b, self.e), (self.b, self.me),
+        ]:
+            Follow.objects.create(follower=follower, followee=followee)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.me).key}")
+
+    def test_graph_arrays(self):
+        graph = suggestions.FollowGraph.load(chunk_size=2)
+        self.assertEqual(graph.edge_count, 7)
+        self.assertEqual(list(graph.followees(self.me.id)), [self.a.id, self.b.id])
+        self.assertEqual(list(graph.followees(self.c.id)), [])
+        self.assertEqual(list(graph.followees(9999)), [])
+        self.assertEqual(list(graph.followers()), [self.me.id, self.a.id, self.b.id])
+        with self.assertRaises(ValueError):
+            suggestions.FollowGraph.from_edges([(2, 1), (1, 2)], 2)
+
+    def test_two_hop_candidates_ranked_by_mutual_count(self):
+        graph = suggestions.FollowGraph.load()
+        self.assertEqual(
+            suggestions.two_hop_candidates(graph, self.me.id),
+            [(self.c.id, 2), (self.d.id, 1), (self.e.id, 1)],
+        )
+        # Users already followed, and the user themself, are never candidates.
+        self.assertEqual(suggestions.two_hop_candidates(graph, self.a.id), [])
+        self.assertEqual(suggestions.two_hop_candidates(graph, self.me.id, limit=1), [(self.c.id, 2)])
+
+    def test_endpoint_serves_stored_suggestions(self):
+        res = self.client.get("/api/accounts/suggestions/")
+        self.assertEqual(res.json(), {"results": [], "computed_at": None})
+
+        call_command("compute_suggestions", "--batch-size", "2", stdout=StringIO())
+        with self.assertNumQueries(3):  # suggestions row, follow edges, users (the token is cached)
+            res = self.client.get("/api/accounts/suggestions/?limit=2")
+        with self.assertNumQueries(2):  # the users now come from the profile cache
+            self.client.get("/api/accounts/suggestions/?limit=2")
+        self.assertEqual(
+            res.json()["results"],
+            [
+                {"id": self.c.id, "username": "c", "followers_count": 0, "mutual_count": 2},
+                {"id": self.d.id, "username": "d", "followers_count": 0, "mutual_count": 1},
+            ],
+        )
+
+        # Accounts followed after the run drop out until the next one.
+        Follow.objects.follow(self.me.id, self.c.id)
+        ids = [user["id"] for user in self.client.get("/api/accounts/suggestions/").json()["results"]]
+        self.assertEqual(ids, [self.d.id, self.e.id])
+
+    def test_expired_suggestions_are_not_served_and_get_purged(self):
+        graph = suggestions.FollowGraph.load()
+        with self.settings(SUGGESTIONS_TTL=-1):
+            self.assertEqual(suggestions.compute(graph, [self.me.id]), 1)
+        self.assertEqual(self.client.get("/api/accounts/suggestions/").json()["results"], [])
+        self.assertEqual(suggestions.purge_expired(), 1)
+        self.assertFalse(FollowSuggestions.objects.exists())
+
+
+class AsyncFollowViewTests(APITestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username="me", password="pass12345")
+        self.other = User.objects.create_user(username="other", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.me).key}")
+
+    def test_follow_and_unfollow(self):
+        res = self.client.post(f"/api/accounts/async/follow/{self.other.id}/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"detail": "You are now following other."})
+        self.assertTrue(Follow.objects.filter(follower=self.me, followee=self.other).exists())
+
+        self.client.post(f"/api/accounts/async/unfollow/{self.other.id}/")
+        self.assertFalse(Follow.objects.filter(follower=self.me, followee=self.other).exists())
+        self.assertEqual(self.client.post("/api/accounts/async/follow/9999/").status_code, 404)
+
+    def test_requires_valid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token nope")
+        res = self.client.post(f"/api/accounts/async/follow/{self.other.id}/")
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+        self.client.credentials()
+        self.assertEqual(self.client.post(f"/api/accounts/async/follow/{self.other.id}/").status_code, 401)
@@ -0,0 +1,164 @@
+"""
+Resized variants of uploaded profile pictures.
+
+The upload in `User.profile_picture` used to be the only copy, so every
+client downloaded the original, often several megabytes. After a user is
+saved with a new picture, generate() is queued on a pool of
+PROFILE_PICTURE_WORKERS threads (0 runs it inline, as the tests do). It
+decodes the upload once, crops a square for each PROFILE_PICTURE_SIZES
+entry and encodes it as WebP and JPEG with Pillow. Each file is named
+after a hash of its bytes (`profile_pics/variants/<sha256>.<ext>`), so a
+name never changes content and can be cached forever. The names are
+recorded in `User.profile_picture_variants`:
+
+    {"source": "profile_pics/me.png",
+     "sizes": {"small": {"webp": "profile_pics/variants/3f...webp", "jpeg": ...}, ...}}
+
+UserSerializer only returns variants whose "source" is the current
+picture; until the worker has run for a new upload it returns null and
+clients fall back to `profile_picture`. Variant URLs come from the
+storage, so in production they point at whatever serves MEDIA_URL (the
+web server, a CDN or an object store), which should send
+PROFILE_PICTURE_CACHE_CONTROL for the `profile_pics/variants/` prefix.
+With DEBUG on, accounts.views.profile_picture_variant serves them from
+MEDIA_ROOT with that header.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+VARIANT_DIR = "profile_pics/variants/"
+# (extension, Pillow format, save options)
+FORMATS = [
+    ("webp", "WEBP", {"method": 4}),
+    ("jpeg", "JPEG", {"optimize": True, "progressive": True}),
+]
+
+logger = logging.getLogger(__name__)
+
+
+def variant_sizes():
+    return getattr(settings, "PROFILE_PICTURE_SIZES", {"small": 48, "medium": 160, "large": 400})
+
+
+def workers():
+    return getattr(settings, "PROFILE_PICTURE_WORKERS", 2)
+
+
+def quality():
+    return getattr(settings, "PROFILE_PICTURE_QUALITY", 82)
+
+
+def render_variants(data):
+    """{label: {ext: bytes}} for every configured size of the image in `data`."""
+    sizes = variant_sizes()
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEGs decode straight to a reduced scale close to the largest size.
+        largest = max(sizes.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P", "PA"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    rendered = {}
+    for label, size in sizes.items():
+        # Never upscale a small original.
+        side = min(size, *image.size)
+        resized = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+        rendered[label] = {}
+        for ext, fmt, options in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt, quality=quality(), **options)
+            rendered[label][ext] = buffer.getvalue()
+    return rendered
+
+
+def store_variants(rendered, storage=default_storage):
+    """Save rendered variants under content-hashed names; {label: {ext: name}}."""
+    names = {}
+    for label, formats in rendered.items():
+        names[label] = {}
+        for ext, content in formats.items():
+            name = f"{VARIANT_DIR}{hashlib.sha256(content).hexdigest()}.{ext}"
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            names[label][ext] = name
+    return names
+
+
+def generate(user_id):
+    """Build and record the variants of `user_id`'s current picture, if missing."""
+    from . import profiles
+
+    User = get_user_model()
+    user = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).only(
+        "profile_picture", "profile_picture_variants"
+    ).first()
+    if user is None or not user.profile_picture:
+        return
+    source = user.profile_picture.name
+    if user.profile_picture_variants.get("source") == source:
+        return
+    with user.profile_picture.open("rb") as f:
+        data = f.read()
+    variants = {"source": source, "sizes": store_variants(render_variants(data))}
+    # Skip the write if another upload replaced the picture meanwhile.
+    if User.objects.filter(pk=user_id, profile_picture=source).update(profile_picture_variants=variants):
+        profiles.bump_versions([user_id])
+
+
+def _run(user_id):
+    try:
+        generate(user_id)
+    except Exception:
+        logger.exception("Could not generate profile picture variants for user %s", user_id)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit(user_id):
+    global _executor
+    if workers() <= 0:
+        generate(user_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix="profile-pictures")
+    _executor.submit(_run, user_id)
+
+
+def current_variants(user):
+    """`user`'s variant names, or None if they are not built for the current picture."""
+    variants = user.profile_picture_variants or {}
+    if not user.profile_picture or variants.get("source") != user.profile_picture.name:
+        return None
+    return variants["sizes"]
+
+
+@receiver(post_save, sender=get_user_model())
+def queue_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "profile_picture" not in update_fields:
+        return  # e.g. last_login on every login
+    if instance.profile_picture and current_variants(instance) is None:
+        user_id = instance.pk
+        transaction.on_commit(lambda: submit(user_id))
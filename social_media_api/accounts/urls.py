@@ -1,5 +1,16 @@
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView,
+    LoginView,
+    ProfileView,
+    FollowUserView,
+    UnfollowUserView,
+    BulkFollowView,
+    BulkUnfollowView,
+    SuggestionsView,
+    AsyncFollowUserView,
+    AsyncUnfollowUserView,
+)
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
@@ -7,4 +18,10 @@ urlpatterns = [
     path("profile/", ProfileView.as_view(), name="profile"),
     path("follow/<int:user_id>/", FollowUserView.as_view(), name="follow-user"),
     path("unfollow/<int:user_id>/", UnfollowUserView.as_view(), name="unfollow-user"),
+    path("follow/bulk/", BulkFollowView.as_view(), name="follow-bulk"),
+    path("unfollow/bulk/", BulkUnfollowView.as_view(), name="unfollow-bulk"),
+    path("suggestions/", SuggestionsView.as_view(), name="follow-suggestions"),
+    # Async variants for ASGI deployments (see social_media_api/async_views.py).
+    path("async/follow/<int:user_id>/", AsyncFollowUserView.as_view(), name="async-follow-user"),
+    path("async/unfollow/<int:user_id>/", AsyncUnfollowUserView.as_view(), name="async-unfollow-user"),
 ]
@@ -1,11 +1,20 @@
+from pathlib import Path
+
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.views.static import serve
 from rest_framework import generics, permissions, status
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import User as CustomUser
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
+from social_media_api.async_views import AsyncAPIView
+from social_media_api.conditional import conditional_response
+from . import profiles, suggestions, thumbnails
+from .authentication import warm_token_cache
+from .models import Follow, User as CustomUser
+from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, BulkFollowSerializer
 
 
 # 👇 EXACT string autograder wants
@@ -22,6 +31,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
 
         token, _ = Token.objects.get_or_create(user=user)
+        warm_token_cache(token)
         return Response(
             {"token": token.key, "user": UserSerializer(user, context={"request": request}).data},
             status=status.HTTP_201_CREATED,
@@ -37,6 +47,7 @@ class LoginView(APIView):
 
         user = serializer.validated_data["user"]
         token = serializer.validated_data["token"]
+        warm_token_cache(token)
 
         return Response(
             {"token": token, "user": UserSerializer(user, context={"request": request}).data},
@@ -49,7 +60,17 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user may come from the token cache; read the row itself so
+        # counters and edits are current.
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        # From the versioned profile cache (accounts/profiles.py), which
+        # edits and follows invalidate; the ETag covers the representation.
+        profile = profiles.represent(profiles.get_profile(request.user.pk), request)
+        if profile is None:
+            raise NotFound()
+        return conditional_response(request, [profile], None, lambda: Response(profile))
 
 
 class FollowUserView(generics.GenericAPIView):
@@ -64,14 +85,14 @@ class FollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            target = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
+        # Only the username is needed for the message; no full row fetch.
+        username = CustomUser.objects.filter(id=user_id).values_list("username", flat=True).first()
+        if username is None:
             return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        request.user.following.add(target)
+        Follow.objects.follow(request.user.id, user_id)
         return Response(
-            {"detail": f"You are now following {target.username}."},
+            {"detail": f"You are now following {username}."},
             status=status.HTTP_200_OK,
         )
 
@@ -87,13 +108,106 @@ class UnfollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            target = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
+        username = CustomUser.objects.filter(id=user_id).values_list("username", flat=True).first()
+        if username is None:
             return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        request.user.following.remove(target)
+        Follow.objects.unfollow(request.user.id, user_id)
+        return Response(
+            {"detail": f"You unfollowed {username}."},
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkFollowView(APIView):
+    """Follow up to 1000 users at once: {"user_ids": [...]} -> per-id results."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = Follow.objects.follow_many(request.user.id, serializer.validated_data["user_ids"])
+        return Response(
+            {"results": [{"id": user_id, "status": result} for user_id, result in results.items()]},
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkUnfollowView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = Follow.objects.unfollow_many(request.user.id, serializer.validated_data["user_ids"])
         return Response(
-            {"detail": f"You unfollowed {target.username}."},
+            {"results": [{"id": user_id, "status": result} for user_id, result in results.items()]},
             status=status.HTTP_200_OK,
-        )
\ No newline at end of file
+        )
+
+
+class SuggestionsView(APIView):
+    """
+    Who to follow, from the precomputed candidates (accounts/suggestions.py):
+    {"results": [{id, username, followers_count, mutual_count}], "computed_at"}.
+    Empty until compute_suggestions has run for the user. `?limit=` caps
+    the list.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = max(int(request.query_params.get("limit", 20)), 1)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, computed_at = suggestions.suggestions_for(request.user.id, limit)
+        return conditional_response(
+            request,
+            [computed_at, results],
+            computed_at,
+            lambda: Response({"results": results, "computed_at": computed_at}),
+        )
+
+
+class AsyncFollowUserView(AsyncAPIView):
+    """FollowUserView for ASGI deployments."""
+
+    async def post(self, request, user_id):
+        if request.user.id == user_id:
+            return Response({"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
+
+        username = await CustomUser.objects.filter(id=user_id).values_list("username", flat=True).afirst()
+        if username is None:
+            return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        await Follow.objects.afollow(request.user.id, user_id)
+        return Response({"detail": f"You are now following {username}."}, status=status.HTTP_200_OK)
+
+
+class AsyncUnfollowUserView(AsyncAPIView):
+    """UnfollowUserView for ASGI deployments."""
+
+    async def post(self, request, user_id):
+        if request.user.id == user_id:
+            return Response({"detail": "You cannot unfollow yourself."}, status=status.HTTP_400_BAD_REQUEST)
+
+        username = await CustomUser.objects.filter(id=user_id).values_list("username", flat=True).afirst()
+        if username is None:
+            return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        await Follow.objects.aunfollow(request.user.id, user_id)
+        return Response({"detail": f"You unfollowed {username}."}, status=status.HTTP_200_OK)
+
+
+def profile_picture_variant(request, path):
+    """
+    Serve a resized profile picture from MEDIA_ROOT with its long-lived
+    cache headers, like static() serves the rest of MEDIA_URL: routed only
+    when DEBUG is on.
+    """
+    response = serve(request, path, document_root=Path(settings.MEDIA_ROOT) / thumbnails.VARIANT_DIR)
+    response["Cache-Control"] = settings.PROFILE_PICTURE_CACHE_CONTROL
+    return response
@@ -0,0 +1,168 @@
+"""
+Concurrent-client throughput: sync views under gunicorn (wsgi.py) vs the
+async variants under uvicorn (asgi.py).
+
+    pip install gunicorn uvicorn httpx
+    python -m benchmarks.asgi [--clients 64] [--seconds 10] [--threads 8]
+    DATABASE_URL=postgres://... python -m benchmarks.asgi
+
+Unlike the other benchmarks this needs a database the servers can share,
+so it seeds a temporary SQLite file (or the database DATABASE_URL points
+at; its tables are created with migrate and rows are added to them). Each
+server runs one worker process: gunicorn with --threads request threads,
+uvicorn with one event loop. `--clients` concurrent clients then hammer
+the feed and notification list for `--seconds` each.
+
+The async ORM still runs queries in worker threads, so the gain comes from
+not pinning a thread per waiting request; it grows with database latency
+and is small against a local SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import PROJECT_ROOT, print_table, setup_django
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def load(url, token, clients, seconds):
+    import httpx
+
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+
+    async def client(http):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await http.get(url, headers={"Authorization": f"Token {token}"})
+            except httpx.TransportError:
+                # e.g. gunicorn closing an idle keep-alive connection
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+
+    latencies.sort()
+    return (
+        len(latencies) / seconds,
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.95) - 1],
+        errors,
+    )
+
+
+def seed():
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from accounts.models import Follow
+    from notifications.models import Notification
+    from posts.models import Post
+
+    call_command("migrate", verbosity=0)
+    User = get_user_model()
+    reader, _ = User.objects.get_or_create(username="bench_reader")
+    authors = [User.objects.get_or_create(username=f"bench_author{i}")[0] for i in range(20)]
+    for author in authors:
+        Follow.objects.follow(reader.id, author.id)
+    Post.objects.bulk_create(
+        Post(author=authors[i % len(authors)], title=f"post {i}", content="benchmark") for i in range(2_000)
+    )
+    Notification.objects.bulk_create(
+        Notification(recipient=reader, actor=authors[i % len(authors)], verb="liked your post") for i in range(500)
+    )
+    call_command("rebuild_timelines", "--user", str(reader.id), stdout=open(os.devnull, "w"))
+    return Token.objects.get_or_create(user=reader)[0].key
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn request threads.")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(
+        os.environ,
+        SECURE_SSL_REDIRECT="False",
+        ALLOWED_HOSTS="127.0.0.1",
+    )
+    env.setdefault("DATABASE_URL", f"sqlite:///{tmp.name}/bench.sqlite3")
+    os.environ.update(env)
+
+    setup_django()
+    token = seed()
+
+    wsgi_port, asgi_port = free_port(), free_port()
+    servers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "social_media_api.wsgi", "-b", f"127.0.0.1:{wsgi_port}",
+             "-w", "1", "--threads", str(args.threads), "--log-level", "warning"],
+            cwd=PROJECT_ROOT, env=env,
+        ),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "social_media_api.asgi:application", "--port", str(asgi_port),
+             "--workers", "1", "--log-level", "warning", "--no-access-log"],
+            cwd=PROJECT_ROOT, env=env,
+        ),
+    ]
+    try:
+        wait_for(wsgi_port)
+        wait_for(asgi_port)
+
+        cases = [
+            ("feed", "WSGI sync", f"http://127.0.0.1:{wsgi_port}/api/feed/"),
+            ("feed", "ASGI sync", f"http://127.0.0.1:{asgi_port}/api/feed/"),
+            ("feed", "ASGI async", f"http://127.0.0.1:{asgi_port}/api/async/feed/"),
+            ("notifications", "WSGI sync", f"http://127.0.0.1:{wsgi_port}/api/notifications/"),
+            ("notifications", "ASGI sync", f"http://127.0.0.1:{asgi_port}/api/notifications/"),
+            ("notifications", "ASGI async", f"http://127.0.0.1:{asgi_port}/api/async/notifications/"),
+        ]
+        rows = []
+        for endpoint, server, url in cases:
+            rps, p50, p95, errors = asyncio.run(load(url, token, args.clients, args.seconds))
+            rows.append((endpoint, server, f"{rps:.0f}", f"{p50:.1f}", f"{p95:.1f}", errors))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+
+    print(f"{args.clients} concurrent clients, {args.seconds:g}s per case, gunicorn --threads {args.threads}")
+    print_table(("endpoint", "server", "req/s", "p50 ms", "p95 ms", "errors"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Like / unlike throughput: the old read-then-write path vs Like.objects.like().
+
+    python -m benchmarks.likes [--users 2000] [--posts 50]
+    DATABASE_URL=postgres://... python -m benchmarks.likes
+
+The old path fetched the post, ran get_or_create (SELECT + INSERT), loaded
+post.author for the self-like check and then bumped the counter. The fast
+path is INSERT ... ON CONFLICT DO NOTHING RETURNING plus one counter
+UPDATE ... RETURNING author_id. Both enqueue the same notification; the
+buffer is flushed inside the timed region so its writes are counted too.
+
+Runs single-threaded against whatever database DATABASE_URL selects
+(SQLite by default), so the numbers are per-worker throughput.
+"""
+import argparse
+import time
+
+from .common import print_table, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--posts", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.db.models import F
+    from django.shortcuts import get_object_or_404
+
+    from notifications.buffer import notification_buffer
+    from notifications.utils import create_notification
+    from posts.models import Like, Post
+
+    def old_like(user, post_id):
+        post = get_object_or_404(Post, pk=post_id)
+        with transaction.atomic():
+            _, created = Like.objects.get_or_create(user=user, post=post)
+            if created:
+                Post.objects.filter(pk=post.pk).update(likes_count=F("likes_count") + 1)
+        if created and post.author != user:
+            create_notification(recipient=post.author, actor=user, verb="liked your post", target=post)
+
+    def old_unlike(user, post_id):
+        post = get_object_or_404(Post, pk=post_id)
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(user=user, post=post).delete()
+            if deleted:
+                Post.objects.filter(pk=post.pk).update(likes_count=F("likes_count") - deleted)
+
+    def new_like(user, post_id):
+        author_id = Like.objects.like(user.id, post_id)
+        if author_id is not None and author_id != user.id:
+            create_notification(
+                recipient=author_id, actor=user, verb="liked your post", target=Post(pk=post_id, author_id=author_id)
+            )
+
+    def new_unlike(user, post_id):
+        Like.objects.unlike(user.id, post_id)
+
+    def throughput(fn, users, post_ids):
+        start = time.perf_counter()
+        for i, user in enumerate(users):
+            fn(user, post_ids[i % len(post_ids)])
+        notification_buffer.flush()
+        return len(users) / (time.perf_counter() - start)
+
+    with test_database():
+        User = get_user_model()
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(args.users + 1))
+        users = list(User.objects.order_by("id"))
+        author, users = users[0], users[1:]
+        Post.objects.bulk_create(Post(author=author, title=f"post {i}", content="benchmark") for i in range(args.posts))
+        post_ids = list(Post.objects.values_list("id", flat=True))
+
+        rows = []
+        for label, like, unlike in (("old", old_like, old_unlike), ("new", new_like, new_unlike)):
+            rows.append((
+                label,
+                f"{throughput(like, users, post_ids):.0f}",
+                # Every like here is a repeat: the "Already liked." path.
+                f"{throughput(like, users, post_ids):.0f}",
+                f"{throughput(unlike, users, post_ids):.0f}",
+            ))
+
+    print(f"{connection.vendor}: {args.users} users over {args.posts} posts, operations per second")
+    print_table(("path", "like", "repeat like", "unlike"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Page-number vs keyset pagination latency by page depth.
+
+    python -m benchmarks.pagination [--posts 100010] [--page-size 10]
+
+Page-number pagination pays a COUNT(*) plus an OFFSET scan that grows with
+depth; keyset pagination seeks straight to the cursor so page 10,000
+costs the same as page 1.
+"""
+import argparse
+
+from .common import print_table, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100_010)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.pagination import PageNumberPagination
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from posts.models import Post
+    from social_media_api.pagination import KeysetPagination
+
+    factory = APIRequestFactory()
+
+    class PageNumbers(PageNumberPagination):
+        page_size = args.page_size
+
+    class Keyset(KeysetPagination):
+        page_size = args.page_size
+
+    with test_database():
+        author = get_user_model().objects.create_user(username="bench", password="x")
+        Post.objects.bulk_create(
+            (Post(author=author, title=f"post {i}", content="benchmark") for i in range(args.posts)),
+            batch_size=5_000,
+        )
+        queryset = Post.objects.all()
+        ordered = queryset.order_by("-created_at", "-id")
+
+        rows = []
+        for page in (1, 10, 100, 1_000, 10_000):
+            offset = (page - 1) * args.page_size
+            if offset >= args.posts:
+                break
+
+            offset_request = Request(factory.get("/api/posts/", {"page": page}))
+
+            def by_offset():
+                list(PageNumbers().paginate_queryset(queryset, offset_request))
+
+            # Build the cursor a client would be holding after page-1 pages.
+            cursor_request = Request(factory.get("/api/posts/"))
+            if offset:
+                last = ordered.values_list("created_at", "id")[offset - 1]
+                paginator = Keyset()
+                paginator.request = cursor_request
+                url = paginator.encode_cursor(list(last), reverse=False)
+                cursor_request = Request(factory.get(url))
+
+            def by_keyset():
+                list(Keyset().paginate_queryset(queryset, cursor_request))
+
+            rows.append((page, f"{timed(by_offset):.2f}", f"{timed(by_keyset):.2f}"))
+
+    print(f"{args.posts} posts, page size {args.page_size}, median ms per page")
+    print_table(("page", "page-number", "keyset"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Bytes served per profile view: the original upload vs its resized
+variants (accounts/thumbnails.py).
+
+    python -m benchmarks.profile_pictures [--width 3000] [--height 2000]
+
+Uploads a synthetic photo-sized picture (noise over a gradient, so it
+compresses about like a photo) through PATCH /api/accounts/profile/,
+builds the variants inline and prints, for each image a client could
+fetch, the profile JSON plus that image. Also prints how long building
+the variants took, which is now spent in the worker pool instead of the
+request.
+"""
+import argparse
+import io
+import tempfile
+import time
+
+from .common import print_table, setup_django, test_database
+
+
+def photo(width, height):
+    from PIL import Image
+
+    noise = Image.effect_noise((width, height), 48)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    buffer = io.BytesIO()
+    Image.merge("RGB", [noise, gradient, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)]).save(
+        buffer, "JPEG", quality=95
+    )
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.files.storage import default_storage
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from accounts import thumbnails
+
+    original = photo(args.width, args.height)
+    with test_database(), tempfile.TemporaryDirectory() as media, override_settings(
+        MEDIA_ROOT=media, PROFILE_PICTURE_WORKERS=0
+    ):
+        user = get_user_model().objects.create_user(username="bench", password="x")
+        client = APIClient()
+        client.force_authenticate(user)
+        client.patch(
+            "/api/accounts/profile/",
+            {"profile_picture": SimpleUploadedFile("photo.jpg", original, content_type="image/jpeg")},
+            format="multipart",
+        )
+        profile_bytes = len(client.get("/api/accounts/profile/").content)
+
+        start = time.perf_counter()
+        sizes = thumbnails.store_variants(thumbnails.render_variants(original))
+        render_ms = (time.perf_counter() - start) * 1000
+
+        rows = [("original", "jpeg", len(original), profile_bytes + len(original), "1.0x")]
+        for label, formats in sizes.items():
+            for ext, name in formats.items():
+                image_bytes = default_storage.size(name)
+                per_view = profile_bytes + image_bytes
+                rows.append((label, ext, image_bytes, per_view, f"{(profile_bytes + len(original)) / per_view:.1f}x"))
+
+    print(f"{args.width}x{args.height} upload; profile JSON is {profile_bytes} bytes")
+    print_table(("image", "format", "image bytes", "bytes per view", "saving"), rows)
+    print(f"variants built in {render_ms:.0f} ms (in the worker pool, not the request)")
+
+
+if __name__ == "__main__":
+    main()
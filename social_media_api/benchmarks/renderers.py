@@ -0,0 +1,75 @@
+"""
+JSON rendering and parsing: DRF's JSONRenderer/JSONParser vs the orjson
+backed FastJSONRenderer/FastJSONParser (social_media_api/renderers.py).
+
+    pip install orjson
+    python -m benchmarks.renderers [--rows 1000]
+
+Serializes one page of `--rows` posts with PostSerializer, then times
+rendering that page (and parsing it back) with each pair. The serializer
+time is shown for scale: it is the part of a list response the renderer
+doesn't touch.
+"""
+import argparse
+import io
+
+from .common import print_table, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from posts.models import Post
+    from posts.serializers import PostSerializer
+    from social_media_api import renderers
+    from social_media_api.renderers import FastJSONParser, FastJSONRenderer
+
+    with test_database():
+        author = get_user_model().objects.create_user(username="bench", password="x")
+        Post.objects.bulk_create(
+            Post(author=author, title=f"Post number {i}", content="Lorem ipsum dolor sit amet, é ü ß. " * 8)
+            for i in range(args.rows)
+        )
+        posts = list(Post.objects.select_related("author")[: args.rows])
+
+        data = None
+
+        def serialize():
+            nonlocal data
+            data = {"next": None, "previous": None, "results": PostSerializer(posts, many=True).data}
+
+        serialize_ms = timed(serialize, repeat=5)
+
+    body = JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data) == body
+
+    timings = {}
+    for label, renderer, json_parser in (
+        ("DRF (json)", JSONRenderer(), JSONParser()),
+        ("orjson" if renderers.orjson else "orjson (not installed)", FastJSONRenderer(), FastJSONParser()),
+    ):
+        timings[label] = (
+            timed(lambda: renderer.render(data), repeat=50),
+            timed(lambda: json_parser.parse(io.BytesIO(body)), repeat=50),
+        )
+
+    base_render, base_parse = timings["DRF (json)"]
+    rows = [("serializer", "", f"{serialize_ms:.2f}", "")]
+    for label, (render_ms, parse_ms) in timings.items():
+        rows.append(("render", label, f"{render_ms:.2f}", f"{base_render / render_ms:.1f}x"))
+        rows.append(("parse", label, f"{parse_ms:.2f}", f"{base_parse / parse_ms:.1f}x"))
+
+    print(f"{args.rows} posts per page, {len(body) / 1024:.0f} KiB of JSON, median ms")
+    print_table(("step", "library", "ms", "speed-up"), rows)
+
+
+if __name__ == "__main__":
+    main()
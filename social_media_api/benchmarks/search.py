@@ -0,0 +1,90 @@
+"""
+Post search latency: SearchFilter (LIKE) vs the full-text index.
+
+    python -m benchmarks.search [--posts 1000000] [--words 20000]
+    DATABASE_URL=postgres://... python -m benchmarks.search
+
+Builds a synthetic corpus whose word frequencies follow a Zipf-like
+curve, indexes it with reindex_posts and times the first page of
+`?search=` for a common, a mid-frequency and a rare term, plus a
+two-term query. LIKE results come back newest first, full-text results
+by rank.
+
+LIKE stops as soon as it has a page of matches, so it is quick for terms
+that are in most posts and slow for rare ones; ranking has to score every
+match, so the full-text index is the other way round.
+"""
+import argparse
+import io
+import random
+
+from .common import print_table, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=20_000, help="Vocabulary size.")
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import override_settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from posts.models import Post
+    from posts.search import FullTextSearchFilter
+
+    rng = random.Random(42)
+    vocabulary = [f"w{i}x" for i in range(args.words)]
+    weights = [1 / (rank + 1) for rank in range(args.words)]
+
+    def text(length):
+        return " ".join(rng.choices(vocabulary, weights, k=length))
+
+    class View:
+        search_fields = ["title", "content"]
+
+    factory = APIRequestFactory()
+
+    with test_database():
+        author = get_user_model().objects.create_user(username="bench", password="x")
+        batch = 10_000
+        for start in range(0, args.posts, batch):
+            Post.objects.bulk_create(
+                Post(author=author, title=text(6), content=text(40)) for _ in range(min(batch, args.posts - start))
+            )
+        call_command("reindex_posts", stdout=io.StringIO())
+
+        queries = {
+            "common": vocabulary[0],
+            "mid": vocabulary[100],
+            "rare": vocabulary[args.words - 1],
+            "two terms": f"{vocabulary[10]} {vocabulary[200]}",
+        }
+        rows = []
+        for label, query in queries.items():
+            request = Request(factory.get("/api/posts/", {"search": query}))
+
+            def like():
+                with override_settings(POSTS_SEARCH_BACKEND="like"):
+                    queryset = FullTextSearchFilter().filter_queryset(request, Post.objects.all(), View())
+                    list(queryset.order_by("-created_at", "-id")[: args.page_size])
+
+            def full_text():
+                queryset = FullTextSearchFilter().filter_queryset(request, Post.objects.all(), View())
+                list(queryset.order_by("-search_rank", "-id")[: args.page_size])
+
+            rows.append((label, query, f"{timed(like, repeat=5):.1f}", f"{timed(full_text, repeat=5):.1f}"))
+
+    print(f"{connection.vendor}: {args.posts} posts, median ms for the first page")
+    print_table(("query", "terms", "LIKE", "full-text"), rows)
+
+
+if __name__ == "__main__":
+    main()
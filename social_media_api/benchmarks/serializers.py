@@ -0,0 +1,72 @@
+"""
+List serialization: ModelSerializer over model instances vs the compiled
+read path over values() rows (social_media_api/fast_serializers.py).
+
+    python -m benchmarks.serializers [--rows 50]
+
+Times fetching and serializing one page of posts (PostSerializer, with
+has_liked) and of notifications (NotificationSerializer), query included.
+"""
+import argparse
+
+from .common import print_table, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIRequestFactory
+
+    from notifications.models import Notification
+    from notifications.serializers import NotificationSerializer
+    from posts.models import Post
+    from posts.serializers import PostSerializer
+    from social_media_api.fast_serializers import serialize_rows, values_queryset
+
+    with test_database():
+        User = get_user_model()
+        reader = User.objects.create_user(username="reader", password="x")
+        author = User.objects.create_user(username="author", password="x")
+        Post.objects.bulk_create(
+            Post(author=author, title=f"Post {i}", content="Lorem ipsum dolor sit amet. " * 10) for i in range(args.rows)
+        )
+        Notification.objects.bulk_create(
+            Notification(recipient=reader, actor=author, verb="liked your post") for _ in range(args.rows)
+        )
+        request = APIRequestFactory().get("/")
+        request.user = reader
+
+        cases = [
+            ("posts", PostSerializer, Post.objects.select_related("author").order_by("-created_at", "-id")),
+            (
+                "notifications",
+                NotificationSerializer,
+                Notification.objects.select_related("actor", "recipient").order_by("-timestamp", "-id"),
+            ),
+        ]
+        rows = []
+        for label, serializer_class, queryset in cases:
+
+            def model_serializer():
+                serializer_class(list(queryset[: args.rows]), many=True, context={"request": request}).data
+
+            def compiled():
+                serializer = serializer_class(many=True, context={"request": request})
+                values, fast = values_queryset(serializer, queryset)
+                assert fast is not None
+                serialize_rows(serializer, list(values[: args.rows]), fast)
+
+            slow_ms, fast_ms = timed(model_serializer), timed(compiled)
+            rows.append((label, f"{slow_ms:.2f}", f"{fast_ms:.2f}", f"{slow_ms / fast_ms:.1f}x"))
+
+    print(f"{args.rows} rows per page, median ms including the query")
+    print_table(("list", "ModelSerializer", "compiled", "speed-up"), rows)
+
+
+if __name__ == "__main__":
+    main()
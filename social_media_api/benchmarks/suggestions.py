@@ -0,0 +1,123 @@
+"""
+Who-to-follow (accounts/suggestions.py): the in-memory two-hop scorer on a
+synthetic follow graph, and serving from stored rows vs a friends-of-friends
+join in SQL.
+
+    python -m benchmarks.suggestions [--edges 1000000] [--sample 2000] [--db-edges 200000]
+    python -m benchmarks.suggestions --edges 10000000
+
+Part one builds a FollowGraph from `--edges` generated edges, with
+following-list sizes skewed so that a few accounts follow thousands. It
+reports load time, array size, peak RSS and the time to score a sample of
+users, extrapolated to a full run. Part two seeds a test database with
+`--db-edges` edges and times one user's suggestions both ways.
+"""
+import argparse
+import io
+import random
+import resource
+import time
+
+from .common import print_table, setup_django, test_database, timed
+
+
+def synthetic_edges(users, edges, seed=0):
+    """About `edges` (follower, followee) pairs over ids 1..users, sorted by follower."""
+    rng = random.Random(seed)
+    mean = edges / users
+    for follower in range(1, users + 1):
+        count = min(int(rng.paretovariate(1.5) * mean / 3), users - 1)
+        # Popular accounts (low ids) get followed more often.
+        followees = {int(users * rng.random() ** 2) + 1 for _ in range(count)}
+        followees.discard(follower)
+        for followee in sorted(followees):
+            yield follower, followee
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, help="Default: edges / 20.")
+    parser.add_argument("--sample", type=int, default=2_000, help="Users to score.")
+    parser.add_argument("--db-edges", type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+
+    from accounts import suggestions
+    from accounts.models import Follow
+
+    users = args.users or max(args.edges // 20, 10)
+    rss_before = peak_rss_mib()
+    started = time.perf_counter()
+    graph = suggestions.FollowGraph.from_edges(synthetic_edges(users, args.edges), users)
+    build_s = time.perf_counter() - started
+
+    sample = random.Random(1).sample(range(1, users + 1), min(args.sample, users))
+    started = time.perf_counter()
+    found = sum(1 for user_id in sample if suggestions.two_hop_candidates(graph, user_id))
+    per_user_ms = (time.perf_counter() - started) * 1000 / len(sample)
+
+    print(f"{graph.edge_count} edges over {users} users")
+    print_table(
+        ("step", "value"),
+        [
+            ("build (generate + load)", f"{build_s:.1f} s"),
+            ("graph arrays", f"{graph.nbytes / 2**20:.1f} MiB"),
+            ("peak RSS growth", f"{peak_rss_mib() - rss_before:.0f} MiB"),
+            ("score one user", f"{per_user_ms:.2f} ms"),
+            ("users with candidates", f"{found}/{len(sample)}"),
+            ("full run, extrapolated", f"{per_user_ms * users / 1000 / 60:.1f} min"),
+        ],
+    )
+    del graph
+
+    User = get_user_model()
+    with test_database():
+        db_users = max(args.db_edges // 20, 10)
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(db_users))
+        offset = User.objects.order_by("id").values_list("id", flat=True).first() - 1
+        Follow.objects.bulk_create(
+            (Follow(follower_id=a + offset, followee_id=b + offset) for a, b in synthetic_edges(db_users, args.db_edges)),
+            batch_size=5_000,
+        )
+        call_command("rebuild_counters", stdout=io.StringIO())
+        suggestions.compute(suggestions.FollowGraph.load())
+        by_following = list(User.objects.filter(following_count__gt=0).order_by("following_count").values_list("id", flat=True))
+
+        follow = connection.ops.quote_name(Follow._meta.db_table)
+        sql = f"""
+            SELECT second.followee_id, COUNT(*) AS mutual
+            FROM {follow} first JOIN {follow} second ON second.follower_id = first.followee_id
+            WHERE first.follower_id = %s AND second.followee_id <> %s
+              AND second.followee_id NOT IN (SELECT followee_id FROM {follow} WHERE follower_id = %s)
+            GROUP BY second.followee_id ORDER BY mutual DESC, second.followee_id LIMIT 20
+        """
+
+        def friends_of_friends(user_id):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [user_id, user_id, user_id])
+                ids = [row[0] for row in cursor.fetchall()]
+            list(User.objects.filter(pk__in=ids).values("id", "username", "followers_count"))
+
+        rows = []
+        for label, user_id in (("median user", by_following[len(by_following) // 2]), ("heaviest user", by_following[-1])):
+            join_ms = timed(lambda: friends_of_friends(user_id))
+            stored_ms = timed(lambda: suggestions.suggestions_for(user_id, 20))
+            rows.append((label, f"{join_ms:.2f}", f"{stored_ms:.2f}", f"{join_ms / stored_ms:.1f}x"))
+
+    print()
+    print(f"one user's suggestions, {args.db_edges} edges in {connection.vendor}, median ms")
+    print_table(("reader", "SQL friends-of-friends", "stored row", "speed-up"), rows)
+
+
+if __name__ == "__main__":
+    main()
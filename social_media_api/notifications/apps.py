@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
 
 
 class NotificationsConfig(AppConfig):
     name = 'notifications'
+
+    def ready(self):
+        from .buffer import notification_buffer
+
+        # Time-based flush without a background thread: check after every request.
+        request_finished.connect(
+            lambda sender, **kwargs: notification_buffer.flush_if_due(),
+            weak=False,
+            dispatch_uid="notifications_flush_buffer",
+        )
@@ -0,0 +1,180 @@
+"""
+In-process buffered notification writer.
+
+create_notification() used to INSERT one row per event inside the
+request, so a viral post meant thousands of single-row INSERTs and as
+many near-identical "X liked your post" rows. Events now go into a
+per-process buffer keyed by (recipient, verb, target) and are written in
+one transaction with bulk_create when either
+
+  - NOTIFICATIONS_BUFFER_SIZE distinct keys are pending, or
+  - the oldest pending event is NOTIFICATIONS_FLUSH_INTERVAL seconds old
+    (checked when events arrive and when each request finishes).
+
+Repeats of the same key are coalesced: into one pending entry while
+buffered, and into an existing unread notification if one was written
+within NOTIFICATIONS_COALESCE_WINDOW seconds. The aggregated row keeps
+the latest actor and the number of distinct actors in `actor_count`;
+each actor is a NotificationActor row, so like -> unlike -> like by one
+user counts once even when the events land in different flushes.
+
+NOTIFICATIONS_FLUSH_INTERVAL = 0 writes each event as it arrives (still
+coalescing), which is what the tests use.
+"""
+import atexit
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationActor
+from .pubsub import publish_notifications
+from .unread import increment_unread
+
+
+def buffer_size():
+    return getattr(settings, "NOTIFICATIONS_BUFFER_SIZE", 500)
+
+
+def flush_interval():
+    return getattr(settings, "NOTIFICATIONS_FLUSH_INTERVAL", 2.0)
+
+
+def coalesce_window():
+    return getattr(settings, "NOTIFICATIONS_COALESCE_WINDOW", 3600)
+
+
+@dataclass
+class PendingNotification:
+    recipient_id: int
+    verb: str
+    target_content_type_id: int | None
+    target_object_id: int | None
+    actor_id: int
+    actor_ids: set = field(default_factory=set)
+
+    @property
+    def key(self):
+        return (self.recipient_id, self.verb, self.target_content_type_id, self.target_object_id)
+
+
+class NotificationBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._oldest = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, recipient_id, actor_id, verb, target_content_type_id=None, target_object_id=None):
+        key = (recipient_id, verb, target_content_type_id, target_object_id)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = PendingNotification(
+                    recipient_id, verb, target_content_type_id, target_object_id, actor_id
+                )
+            entry.actor_id = actor_id
+            entry.actor_ids.add(actor_id)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        with self._lock:
+            due = bool(self._pending) and (
+                len(self._pending) >= buffer_size()
+                or time.monotonic() - self._oldest >= flush_interval()
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending = {}
+            self._oldest = None
+        if batch:
+            write_batch(batch)
+        return len(batch)
+
+
+def write_batch(batch):
+    """
+    Write pending notifications: coalesce into recent unread rows where
+    possible, bulk_create the rest.
+    """
+    now = timezone.now()
+    since = now - timedelta(seconds=coalesce_window())
+
+    with transaction.atomic():
+        # Locked so concurrent flushes merge into the same row one at a
+        # time and see each other's actors.
+        recent = Notification.objects.select_for_update().filter(
+            recipient_id__in={p.recipient_id for p in batch},
+            verb__in={p.verb for p in batch},
+            is_read=False,
+            timestamp__gte=since,
+        ).values_list("id", "actor_count", "recipient_id", "verb", "target_content_type_id", "target_object_id")
+        existing = {}
+        for pk, actor_count, *key in recent.order_by("timestamp"):
+            existing[tuple(key)] = (pk, actor_count)
+
+        created = []
+        merges = []
+        for pending in batch:
+            row = existing.get(pending.key)
+            if row is None:
+                created.append((pending, Notification(
+                    recipient_id=pending.recipient_id,
+                    actor_id=pending.actor_id,
+                    verb=pending.verb,
+                    target_content_type_id=pending.target_content_type_id,
+                    target_object_id=pending.target_object_id,
+                    actor_count=len(pending.actor_ids),
+                    timestamp=now,
+                )))
+            else:
+                merges.append((row, pending))
+
+        actors = []
+        if merges:
+            # Only the batch's actors are looked up, not every actor the
+            # rows already have.
+            seen = set(
+                NotificationActor.objects.filter(
+                    notification_id__in=[pk for (pk, _), _ in merges],
+                    actor_id__in={actor_id for _, pending in merges for actor_id in pending.actor_ids},
+                ).values_list("notification_id", "actor_id")
+            )
+            for (pk, actor_count), pending in merges:
+                added = [actor_id for actor_id in pending.actor_ids if (pk, actor_id) not in seen]
+                actors.extend(NotificationActor(notification_id=pk, actor_id=actor_id) for actor_id in added)
+                Notification.objects.filter(pk=pk).update(
+                    actor_id=pending.actor_id,
+                    actor_count=actor_count + len(added),
+                    timestamp=now,
+                )
+        Notification.objects.bulk_create([row for _, row in created], batch_size=buffer_size())
+        for pending, row in created:
+            actors.extend(NotificationActor(notification_id=row.pk, actor_id=actor_id) for actor_id in pending.actor_ids)
+        NotificationActor.objects.bulk_create(actors, batch_size=buffer_size(), ignore_conflicts=True)
+
+    # Coalesced updates hit rows that were already unread, so only new
+    # rows move the badge.
+    counts = {}
+    for _, row in created:
+        counts[row.recipient_id] = counts.get(row.recipient_id, 0) + 1
+    increment_unread(counts)
+
+    # Wake any live streams (notifications/stream.py) of these recipients.
+    publish_notifications({pending.recipient_id for pending in batch})
+
+
+notification_buffer = NotificationBuffer()
+atexit.register(notification_buffer.flush)
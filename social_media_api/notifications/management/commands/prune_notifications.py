@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from notifications import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Move read notifications older than the retention age into the archive (or delete them), "
+        "in checkpointed chunks. Safe to stop and re-run; it resumes from the last chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Retention age in days (default NOTIFICATIONS_RETENTION_DAYS).")
+        parser.add_argument("--policy", choices=retention.POLICIES, help="Default NOTIFICATIONS_RETENTION_POLICY.")
+        parser.add_argument("--chunk-size", type=int, help="Rows per transaction.")
+        parser.add_argument("--max-chunks", type=int, help="Stop after this many chunks (resume next run).")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks.")
+        parser.add_argument("--restart", action="store_true", help="Discard an unfinished run and start over.")
+        parser.add_argument("--purge-archive-days", type=int, help="Also drop archived rows older than this.")
+
+    def handle(self, *args, **options):
+        checkpoint = retention.run(
+            days=options["days"],
+            policy=options["policy"],
+            size=options["chunk_size"],
+            max_chunks=options["max_chunks"],
+            pause=options["pause"],
+            restart=options["restart"],
+        )
+        state = "complete" if checkpoint.completed else f"paused at id {checkpoint.last_id}"
+        self.stdout.write(self.style.SUCCESS(f"Processed {checkpoint.processed} notifications ({state})."))
+
+        if options["purge_archive_days"] is not None:
+            purged = retention.purge_archive(options["purge_archive_days"], size=options["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(f"Purged {purged} archived notifications."))
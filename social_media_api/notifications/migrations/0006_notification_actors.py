@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_actor_ids(apps, schema_editor):
+    # Only unread rows are ever merged into, so only theirs are kept.
+    db = schema_editor.connection.alias
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationActor = apps.get_model("notifications", "NotificationActor")
+    batch = []
+    rows = Notification.objects.using(db).filter(is_read=False).values_list("id", "actor_id", "actor_ids")
+    for pk, actor_id, actor_ids in rows.iterator(chunk_size=1000):
+        batch.extend(NotificationActor(notification_id=pk, actor_id=a) for a in set(actor_ids or [actor_id]))
+        if len(batch) >= 1000:
+            NotificationActor.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    NotificationActor.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_actor_ids'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='notifications.notification')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('notification', 'actor'), name='unique_notification_actor')],
+            },
+        ),
+        migrations.RunPython(copy_actor_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='actor_ids',
+        ),
+    ]
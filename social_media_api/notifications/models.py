@@ -2,6 +2,7 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import Q
 
 
 class Notification(models.Model):
@@ -16,6 +17,9 @@ class Notification(models.Model):
         related_name="notifications_sent",
     )
     verb = models.CharField(max_length=255)
+    # Distinct actors coalesced into this row ("X and 41 others liked
+    # your post"); `actor` is the most recent one. See buffer.py.
+    actor_count = models.PositiveIntegerField(default=1)
 
     # Generic target (Post, Comment, User, etc.)
     target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
@@ -27,6 +31,76 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["is_read", "-timestamp"]
+        indexes = [
+            # Serves the list endpoint's (is_read, -timestamp) order per
+            # recipient without a sort.
+            models.Index(fields=["recipient", "is_read", "-timestamp"], name="notif_recipient_read_ts_idx"),
+            # Small index over unread rows only, for the unread-count fallback.
+            models.Index(fields=["recipient"], condition=Q(is_read=False), name="notif_unread_idx"),
+            # Read rows by id, for the retention job's chunked scan.
+            models.Index(fields=["id", "timestamp"], condition=Q(is_read=True), name="notif_read_idx"),
+        ]
 
     def __str__(self):
-        return f"{self.actor} {self.verb} -> {self.recipient}"
\ No newline at end of file
+        return f"{self.actor} {self.verb} -> {self.recipient}"
+
+
+class NotificationActor(models.Model):
+    """
+    An actor coalesced into a notification, so one who repeats the event
+    is not counted again. A row per actor with a unique key, rather than
+    a list on the notification, lets a merge read and write only the
+    actors it brings, however many the notification already has.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="actors")
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["notification", "actor"], name="unique_notification_actor"),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} in notification {self.notification_id}"
+
+
+class ArchivedNotification(models.Model):
+    """
+    Cold copy of a read notification moved out of the hot table by the
+    retention job (see retention.py). Rows are appended in timestamp
+    order and purged by timestamp range, so the timestamp index doubles
+    as the partition key for compaction.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    verb = models.CharField(max_length=255)
+    actor_count = models.PositiveIntegerField(default=1)
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    is_read = models.BooleanField(default=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["recipient", "-timestamp"], name="archived_notif_recipient_idx"),
+            models.Index(fields=["timestamp"], name="archived_notif_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived notification {self.original_id}"
+
+
+class RetentionCheckpoint(models.Model):
+    """Progress of a retention run, so an interrupted run resumes where it stopped."""
+    name = models.CharField(max_length=100, unique=True)
+    cutoff = models.DateTimeField()
+    last_id = models.BigIntegerField(default=0)
+    processed = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
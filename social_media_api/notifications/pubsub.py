@@ -0,0 +1,138 @@
+"""
+Publish/subscribe for live notifications.
+
+Each worker process has one in-process `hub`. SSE streams subscribe to
+their recipient's channel on it; write_batch() publishes to the channels
+of the recipients it wrote for. How a publish reaches the hubs is up to
+NOTIFICATIONS_PUBSUB_BACKEND:
+
+  - LocalBackend delivers straight to this process's hub. Enough for a
+    single worker.
+  - RedisBackend PUBLISHes to Redis; each worker keeps one pattern
+    subscription (started with its first local subscriber) that feeds its
+    hub, so a notification written by any worker reaches streams on all
+    of them.
+
+Messages are small dicts and only wake subscribers up; streams re-read the
+notification rows themselves, so a lost message delays an event until the
+next one (or the next reconnect) rather than losing it.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notifications:"
+
+
+def channel_for(recipient_id):
+    return f"{CHANNEL_PREFIX}{recipient_id}"
+
+
+class Hub:
+    """Channel -> local asyncio queues, safe to publish into from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            path = getattr(settings, "NOTIFICATIONS_PUBSUB_BACKEND", "notifications.pubsub.LocalBackend")
+            self._backend = import_string(path)(self)
+        return self._backend
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+    def deliver(self, channel, message):
+        """Hand a message to this process's subscribers (called by backends)."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    @contextmanager
+    def subscribe(self, channel):
+        """Yield an asyncio.Queue receiving this channel's messages."""
+        self.backend.start()
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class LocalBackend:
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, channel, message):
+        self.hub.deliver(channel, message)
+
+
+class RedisBackend:
+    def __init__(self, hub, url=None):
+        import redis
+
+        self.hub = hub
+        self.redis = redis.Redis.from_url(url or settings.REDIS_URL)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="notifications-pubsub", daemon=True)
+                self._listener.start()
+
+    def publish(self, channel, message):
+        try:
+            self.redis.publish(channel, json.dumps(message))
+        except Exception:
+            # Streams catch up on their next wake-up or reconnect.
+            logger.warning("Could not publish to %s", channel, exc_info=True)
+
+    def _listen(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        try:
+            for item in pubsub.listen():
+                channel = item["channel"].decode() if isinstance(item["channel"], bytes) else item["channel"]
+                self.hub.deliver(channel, json.loads(item["data"]))
+        except Exception:
+            logger.warning("Notification pub/sub listener stopped; restarting on next subscribe.", exc_info=True)
+        finally:
+            pubsub.close()
+
+
+hub = Hub()
+
+
+def publish_notifications(recipient_ids):
+    for recipient_id in recipient_ids:
+        hub.publish(channel_for(recipient_id), {"recipient": recipient_id})
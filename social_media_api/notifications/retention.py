@@ -0,0 +1,130 @@
+"""
+Retention for the notifications table.
+
+Read notifications older than NOTIFICATIONS_RETENTION_DAYS are either
+copied into ArchivedNotification and deleted (policy "archive") or just
+deleted (policy "delete"). The work is done in chunks of
+NOTIFICATIONS_RETENTION_CHUNK_SIZE rows walked in primary-key order, each
+chunk in its own short transaction, so the hot table is never locked for
+long. After every chunk the last processed id is saved in a
+RetentionCheckpoint; a run that is interrupted picks up from there with
+the same cutoff the next time it is started.
+
+Archived copies keep `actor_count` but not the per-actor rows
+(NotificationActor), which are deleted with the notification: they only
+serve to coalesce new events into unread rows.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification, RetentionCheckpoint
+
+CHECKPOINT_NAME = "notifications"
+POLICIES = ("archive", "delete")
+
+ARCHIVED_FIELDS = [
+    "id",
+    "recipient_id",
+    "actor_id",
+    "verb",
+    "actor_count",
+    "target_content_type_id",
+    "target_object_id",
+    "is_read",
+    "timestamp",
+]
+
+
+def retention_days():
+    return getattr(settings, "NOTIFICATIONS_RETENTION_DAYS", 90)
+
+
+def retention_policy():
+    return getattr(settings, "NOTIFICATIONS_RETENTION_POLICY", "archive")
+
+
+def chunk_size():
+    return getattr(settings, "NOTIFICATIONS_RETENTION_CHUNK_SIZE", 1000)
+
+
+def start_or_resume(days=None, restart=False):
+    """The checkpoint for the current run, starting a new run if the last one finished."""
+    checkpoint = RetentionCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    if checkpoint and not checkpoint.completed and not restart:
+        return checkpoint
+
+    cutoff = timezone.now() - timedelta(days=retention_days() if days is None else days)
+    checkpoint, _ = RetentionCheckpoint.objects.update_or_create(
+        name=CHECKPOINT_NAME,
+        defaults={"cutoff": cutoff, "last_id": 0, "processed": 0, "completed": False},
+    )
+    return checkpoint
+
+
+def process_chunk(checkpoint, policy, size):
+    """Archive/delete one chunk after checkpoint.last_id. Returns rows moved."""
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown retention policy {policy!r}; expected one of {POLICIES}.")
+
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.filter(is_read=True, timestamp__lt=checkpoint.cutoff, id__gt=checkpoint.last_id)
+            .order_by("id")
+            .values(*ARCHIVED_FIELDS)[:size]
+        )
+        if not rows:
+            checkpoint.completed = True
+            checkpoint.save(update_fields=["completed", "updated_at"])
+            return 0
+
+        ids = [row["id"] for row in rows]
+        if policy == "archive":
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification(original_id=row.pop("id"), **row) for row in rows],
+                ignore_conflicts=True,
+            )
+        Notification.objects.filter(id__in=ids).delete()
+
+        checkpoint.last_id = ids[-1]
+        checkpoint.processed += len(ids)
+        checkpoint.save(update_fields=["last_id", "processed", "updated_at"])
+    return len(ids)
+
+
+def run(days=None, policy=None, size=None, max_chunks=None, pause=0.0, restart=False):
+    """
+    Process chunks until the run completes or `max_chunks` is reached.
+    `pause` seconds are slept between chunks to leave room for other writers.
+    """
+    checkpoint = start_or_resume(days=days, restart=restart)
+    policy = policy or retention_policy()
+    size = size or chunk_size()
+
+    chunks = 0
+    while not checkpoint.completed:
+        if max_chunks is not None and chunks >= max_chunks:
+            break
+        if process_chunk(checkpoint, policy, size):
+            chunks += 1
+            if pause:
+                time.sleep(pause)
+    return checkpoint
+
+
+def purge_archive(days, size=None):
+    """Compaction: drop archived rows older than `days`, one chunk per transaction."""
+    size = size or chunk_size()
+    cutoff = timezone.now() - timedelta(days=days)
+    purged = 0
+    while True:
+        ids = list(
+            ArchivedNotification.objects.filter(timestamp__lt=cutoff).order_by("timestamp").values_list("id", flat=True)[:size]
+        )
+        if not ids:
+            return purged
+        with transaction.atomic():
+            purged += ArchivedNotification.objects.filter(id__in=ids).delete()[0]
@@ -1,7 +1,22 @@
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 from .models import Notification
 
 
+def summarize_target(target):
+    """Small embeddable description of a notification target."""
+    if target is None:
+        return None
+    model = target._meta.model_name
+    if model == "post":
+        return {"id": target.pk, "title": target.title}
+    if model == "comment":
+        return {"id": target.pk, "post": target.post_id, "snippet": target.content[:80]}
+    if model == "user":
+        return {"id": target.pk, "username": target.username}
+    return {"id": target.pk}
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     actor_username = serializers.CharField(source="actor.username", read_only=True)
     recipient_username = serializers.CharField(source="recipient.username", read_only=True)
@@ -10,6 +25,15 @@ class NotificationSerializer(serializers.ModelSerializer):
     target_type = serializers.SerializerMethodField()
     target_id = serializers.IntegerField(source="target_object_id", read_only=True)
 
+    # Only included with ?expand=target; relies on the view prefetching
+    # targets so it costs no per-row queries.
+    target = serializers.SerializerMethodField()
+
+    # What the method fields read, so lists can be serialized from
+    # values() rows (see social_media_api/fast_serializers.py); the
+    # expanded target needs the instance.
+    method_field_columns = {"target_type": ["target_content_type_id"]}
+
     class Meta:
         model = Notification
         fields = [
@@ -18,13 +42,27 @@ class NotificationSerializer(serializers.ModelSerializer):
             "recipient_username",
             "actor",
             "actor_username",
+            "actor_count",
             "verb",
             "target_type",
             "target_id",
+            "target",
             "is_read",
             "timestamp",
         ]
-        read_only_fields = ["id", "recipient", "actor", "timestamp", "target_type", "target_id"]
+        read_only_fields = ["id", "recipient", "actor", "actor_count", "timestamp", "target_type", "target_id"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get("expand_target"):
+            self.fields.pop("target")
 
     def get_target_type(self, obj):
-        return obj.target_content_type.model if obj.target_content_type else None
\ No newline at end of file
+        # get_for_id() is served from ContentType's in-process cache, unlike
+        # obj.target_content_type which would be a query per row.
+        if obj.target_content_type_id is None:
+            return None
+        return ContentType.objects.get_for_id(obj.target_content_type_id).model
+
+    def get_target(self, obj):
+        return summarize_target(obj.target)
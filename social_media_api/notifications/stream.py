@@ -0,0 +1,119 @@
+"""
+Server-sent events stream of a user's notifications.
+
+A stream subscribes to the recipient's pub/sub channel (pubsub.py) and
+only queries the notifications table when woken by a publish, so an idle
+connected client costs no queries. Each event is one notification as
+NotificationSerializer renders it; its id encodes (timestamp, id), the
+order rows are sent in. A coalesced notification (see buffer.py) gets a
+new timestamp and is sent again with the same "id" field, so clients
+should replace items they already have.
+
+Reconnecting clients send the last event id (EventSource does this with
+the Last-Event-ID header) and get what they missed first. Without one the
+stream starts at the newest existing notification. Comments are sent as
+heartbeats every NOTIFICATIONS_SSE_HEARTBEAT seconds, and streams close
+after NOTIFICATIONS_SSE_MAX_SECONDS so clients reconnect to a fresh
+worker from time to time.
+
+Streams are long-lived, so serve them from the ASGI application.
+"""
+import asyncio
+import datetime
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+from .pubsub import channel_for, hub
+from .serializers import NotificationSerializer
+
+
+def heartbeat_interval():
+    return getattr(settings, "NOTIFICATIONS_SSE_HEARTBEAT", 15)
+
+
+def max_stream_seconds():
+    return getattr(settings, "NOTIFICATIONS_SSE_MAX_SECONDS", 300)
+
+
+def catch_up_limit():
+    return getattr(settings, "NOTIFICATIONS_SSE_CATCH_UP", 100)
+
+
+def event_id(timestamp, pk):
+    return f"{int(timestamp.timestamp() * 1_000_000)}-{pk}"
+
+
+def parse_event_id(value):
+    """(timestamp, id) from an event id, or None if it isn't one of ours."""
+    try:
+        micros, pk = value.split("-")
+        timestamp = datetime.datetime.fromtimestamp(int(micros) / 1_000_000, tz=datetime.timezone.utc)
+        return timestamp, int(pk)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def latest_key(recipient_id):
+    row = (
+        Notification.objects.filter(recipient_id=recipient_id)
+        .order_by("-timestamp", "-id")
+        .values_list("timestamp", "id")
+        .first()
+    )
+    return row or (timezone.now(), 0)
+
+
+def notifications_after(recipient_id, key, limit):
+    """Serialized notifications after `key` in (timestamp, id) order."""
+    timestamp, pk = key
+    rows = (
+        Notification.objects.filter(recipient_id=recipient_id)
+        .filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+        .select_related("actor", "recipient")
+        .order_by("timestamp", "id")[:limit]
+    )
+    return [((n.timestamp, n.pk), NotificationSerializer(n).data) for n in rows]
+
+
+def format_event(key, data):
+    return f"id: {event_id(*key)}\nevent: notification\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(recipient_id, last_event_id=None):
+    deadline = time.monotonic() + max_stream_seconds()
+    # Subscribe before reading so nothing written in between is missed.
+    with hub.subscribe(channel_for(recipient_id)) as queue:
+        key = parse_event_id(last_event_id) if last_event_id else None
+        # Resuming: send what was missed before waiting.
+        wake = key is not None
+        if key is None:
+            key = await sync_to_async(latest_key)(recipient_id)
+
+        yield "retry: 3000\n\n"
+        while True:
+            if wake:
+                # Drain pending wake-ups; one query covers them all.
+                while not queue.empty():
+                    queue.get_nowait()
+                while True:
+                    batch = await sync_to_async(notifications_after)(recipient_id, key, catch_up_limit())
+                    for key, data in batch:
+                        yield format_event(key, data)
+                    if len(batch) < catch_up_limit():
+                        break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(queue.get(), timeout=min(heartbeat_interval(), remaining))
+                wake = True
+            except asyncio.TimeoutError:
+                wake = False
+                yield ": heartbeat\n\n"
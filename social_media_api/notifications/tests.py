@@ -1,3 +1,289 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Comment, Post
+
+from .buffer import notification_buffer
+from .models import ArchivedNotification, Notification, RetentionCheckpoint
+from .pubsub import publish_notifications
+from .stream import event_id, event_stream
+from .utils import create_notification
+
+User = get_user_model()
+
+
+class NotificationBufferTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.fans = [User.objects.create_user(username=f"fan{i}", password="pass12345") for i in range(3)]
+        self.post = Post.objects.create(author=self.author, title="T", content="C")
+
+    def tearDown(self):
+        notification_buffer.flush()
+
+    def like(self, fan):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.get_or_create(user=fan)[0].key}")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/posts/{self.post.id}/like/")
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=60)
+    def test_likes_are_buffered_and_coalesced(self):
+        for fan in self.fans:
+            self.like(fan)
+        self.assertFalse(Notification.objects.exists())
+
+        notification_buffer.flush()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.target, self.post)
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=60, NOTIFICATIONS_BUFFER_SIZE=2)
+    def test_size_threshold_flushes(self):
+        other_post = Post.objects.create(author=self.author, title="T2", content="C")
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.author, self.fans[0], "liked your post", self.post)
+            create_notification(self.author, self.fans[0], "liked your post", other_post)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(len(notification_buffer), 0)
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_repeat_within_window_updates_unread_row(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+        Notification.objects.update(is_read=True)
+        self.like(self.fans[2])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_repeat_actor_across_flushes_counts_once(self):
+        self.like(self.fans[0])
+        self.client.post(f"/api/posts/{self.post.id}/unlike/")
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.actor, self.fans[1])
+        self.assertEqual(
+            set(notification.actors.values_list("actor_id", flat=True)), {self.fans[0].id, self.fans[1].id}
+        )
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_merges_only_read_the_batch_actors(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        with CaptureQueriesContext(connection) as queries:
+            self.like(self.fans[2])
+        [lookup] = [q["sql"] for q in queries if "notifications_notificationactor" in q["sql"] and "SELECT" in q["sql"]]
+        self.assertIn(f'"actor_id" IN ({self.fans[2].id})', lookup)
+        self.assertEqual(Notification.objects.get().actor_count, 3)
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_no_self_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.author, self.author, "liked your post", self.post)
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0, NOTIFICATIONS_UNREAD_CACHE="default")
+class UnreadCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="reader", password="pass12345")
+        self.actor = User.objects.create_user(username="actor", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def unread(self):
+        res = self.client.get("/api/notifications/unread-count/")
+        self.assertEqual(res.status_code, 200)
+        return res.data["unread_count"]
+
+    def test_counter_tracks_new_notifications_and_mark_all_read(self):
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="followed you")
+        self.assertEqual(self.unread(), 1)
+
+        posts = [Post.objects.create(author=self.user, title=f"T{i}", content="C") for i in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in posts:
+                create_notification(self.user, self.actor, "liked your post", post)
+        with self.assertNumQueries(0):  # token and count both come from cache
+            self.assertEqual(self.unread(), 3)
+
+        self.client.post("/api/notifications/mark-all-read/")
+        self.assertEqual(self.unread(), 0)
+
+    def test_cache_miss_recomputes_from_table(self):
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="followed you")
+        self.assertEqual(self.unread(), 1)
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="followed you again")
+        cache.clear()
+        self.assertEqual(self.unread(), 2)
+
+    @override_settings(NOTIFICATIONS_UNREAD_CACHE=None)
+    def test_without_shared_cache_counts_every_read(self):
+        self.assertEqual(self.unread(), 0)
+        # Written behind the writer's back, as another worker's cache would be.
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="followed you")
+        self.assertEqual(self.unread(), 1)
+        self.client.post("/api/notifications/mark-all-read/")
+        self.assertEqual(self.unread(), 0)
+
+
+class NotificationListQueryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pass12345")
+        self.actor = User.objects.create_user(username="actor", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+        posts = [Post.objects.create(author=self.user, title=f"post {i}", content="C") for i in range(20)]
+        comments = [Comment.objects.create(post=posts[0], author=self.actor, content=f"comment {i}") for i in range(20)]
+        targets = posts + comments + [self.actor] * 5 + [None] * 5
+        for target in targets:
+            Notification.objects.create(recipient=self.user, actor=self.actor, verb="did something", target=target)
+
+    def test_fifty_item_page_with_mixed_targets_has_fixed_query_count(self):
+        # token auth, the page, then one query each for posts, comments and users.
+        with self.assertNumQueries(5):
+            res = self.client.get("/api/notifications/", {"page_size": 50, "expand": "target"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["results"]), 50)
+
+        by_type = {}
+        for item in res.data["results"]:
+            by_type.setdefault(item["target_type"], item["target"])
+        self.assertEqual(set(by_type), {"post", "comment", "user", None})
+        self.assertIn("title", by_type["post"])
+        self.assertIn("snippet", by_type["comment"])
+        self.assertEqual(by_type["user"]["username"], "actor")
+        self.assertIsNone(by_type[None])
+
+    def test_async_view_matches_sync_view(self):
+        params = {"page_size": 50, "expand": "target"}
+        sync = self.client.get("/api/notifications/", params)
+        res = self.client.get("/api/async/notifications/", params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), sync.json())
+
+    def test_compiled_list_matches_model_serializer(self):
+        Notification.objects.filter(pk=Notification.objects.first().pk).update(is_read=True)
+        for params in ({"page_size": 50}, {"page_size": 7}, {"page_size": 50, "expand": "target"}):
+            with self.subTest(params=params):
+                res = self.client.get("/api/notifications/", params)
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    slow = self.client.get("/api/notifications/", params)
+                self.assertEqual(res.content, slow.content)
+
+    def test_target_is_omitted_unless_expanded(self):
+        res = self.client.get("/api/notifications/")
+        self.assertNotIn("target", res.data["results"][0])
+
+
+class RetentionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pass12345")
+        self.actor = User.objects.create_user(username="actor", password="pass12345")
+        old = timezone.now() - timedelta(days=120)
+        for i in range(5):
+            Notification.objects.create(recipient=self.user, actor=self.actor, verb=f"old read {i}", is_read=True)
+        Notification.objects.update(timestamp=old)
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="old unread", is_read=False)
+        Notification.objects.filter(verb="old unread").update(timestamp=old)
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb="recent read", is_read=True)
+
+    def test_archives_only_old_read_rows(self):
+        call_command("prune_notifications", "--days", "90", "--chunk-size", "2", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list("verb", flat=True)), ["old unread", "recent read"]
+        )
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
+        self.assertTrue(RetentionCheckpoint.objects.get().completed)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        call_command("prune_notifications", "--chunk-size", "2", "--max-chunks", "1", stdout=StringIO())
+        checkpoint = RetentionCheckpoint.objects.get()
+        self.assertFalse(checkpoint.completed)
+        self.assertEqual(checkpoint.processed, 2)
+
+        call_command("prune_notifications", "--chunk-size", "2", stdout=StringIO())
+        checkpoint.refresh_from_db()
+        self.assertTrue(checkpoint.completed)
+        self.assertEqual(checkpoint.processed, 5)
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
+
+    def test_delete_policy_skips_archive(self):
+        call_command("prune_notifications", "--policy", "delete", stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+
+class NotificationStreamTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pass12345")
+        self.actor = User.objects.create_user(username="actor", password="pass12345")
+        self.token = Token.objects.create(user=self.user).key
+
+    def notify(self, verb):
+        return Notification.objects.create(recipient=self.user, actor=self.actor, verb=verb)
+
+    @async_to_sync
+    async def collect(self, stream):
+        return [chunk async for chunk in stream]
+
+    @override_settings(NOTIFICATIONS_SSE_HEARTBEAT=0.01, NOTIFICATIONS_SSE_MAX_SECONDS=0.05)
+    def test_resume_sends_missed_notifications_then_heartbeats(self):
+        first, second, third = self.notify("one"), self.notify("two"), self.notify("three")
+        chunks = self.collect(event_stream(self.user.id, event_id(first.timestamp, first.pk)))
+
+        self.assertEqual(chunks[0], "retry: 3000\n\n")
+        events = [chunk for chunk in chunks if chunk.startswith("id:")]
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[0].startswith(f"id: {event_id(second.timestamp, second.pk)}\n"))
+        self.assertIn('"verb":"three"', events[1])
+        self.assertIn(": heartbeat\n\n", chunks)
+
+    @override_settings(NOTIFICATIONS_SSE_HEARTBEAT=5, NOTIFICATIONS_SSE_MAX_SECONDS=5)
+    def test_publish_wakes_stream(self):
+        self.notify("seen before connecting")
+
+        @async_to_sync
+        async def run():
+            stream = event_stream(self.user.id)
+            try:
+                await anext(stream)  # retry
+                await sync_to_async(self.notify)("new")
+                await sync_to_async(publish_notifications)([self.user.id])
+                return await anext(stream)
+            finally:
+                await stream.aclose()
+
+        event = run()
+        self.assertIn('"verb":"new"', event)
+        self.assertNotIn("seen before connecting", event)
+
+    @override_settings(NOTIFICATIONS_SSE_MAX_SECONDS=0)
+    async def test_endpoint_streams_for_authenticated_users(self):
+        res = await self.async_client.get("/api/notifications/stream/")
+        self.assertEqual(res.status_code, 401)
+
+        res = await self.async_client.get(
+            "/api/notifications/stream/", headers={"Authorization": f"Token {self.token}"}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        self.assertEqual(res["Cache-Control"], "no-cache")
+        self.assertEqual(b"".join([chunk async for chunk in res.streaming_content]), b"retry: 3000\n\n")
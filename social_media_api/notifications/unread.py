@@ -0,0 +1,61 @@
+"""
+Per-user unread notification counter in Django's cache framework.
+
+The badge endpoint reads the cached value; the buffered writer bumps it
+when it inserts new unread rows and MarkAllReadView resets it to 0. On a
+cache miss it is recomputed with a COUNT over the partial index on
+unread rows and cached again for NOTIFICATIONS_UNREAD_CACHE_TIMEOUT
+seconds, which also bounds any drift from racing updates.
+
+The counter lives in the NOTIFICATIONS_UNREAD_CACHE alias, which has to
+be shared by every worker (Redis): with per-process memory each worker
+would keep its own count, and one that missed a write or a mark-all-read
+would serve a stale badge until the entry expired. Without a shared
+cache (the setting is None) every read is the COUNT itself.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Notification
+
+
+def cache_timeout():
+    return getattr(settings, "NOTIFICATIONS_UNREAD_CACHE_TIMEOUT", 3600)
+
+
+def shared_cache():
+    alias = getattr(settings, "NOTIFICATIONS_UNREAD_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def cache_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user_id):
+    cache = shared_cache()
+    count = cache.get(cache_key(user_id)) if cache is not None else None
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        if cache is not None:
+            cache.set(cache_key(user_id), count, cache_timeout())
+    return count
+
+
+def increment_unread(counts):
+    """`counts` maps recipient id -> number of new unread notifications."""
+    cache = shared_cache()
+    if cache is None:
+        return
+    for user_id, n in counts.items():
+        try:
+            cache.incr(cache_key(user_id), n)
+        except ValueError:
+            # Not cached: the next read recomputes it from the table.
+            pass
+
+
+def reset_unread(user_id):
+    cache = shared_cache()
+    if cache is not None:
+        cache.set(cache_key(user_id), 0, cache_timeout())
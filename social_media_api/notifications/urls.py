@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import NotificationListView, MarkAllReadView
+from .views import NotificationListView, MarkAllReadView, UnreadCountView, AsyncNotificationListView, NotificationStreamView
 
 urlpatterns = [
     path("notifications/", NotificationListView.as_view(), name="notifications"),
+    path("notifications/unread-count/", UnreadCountView.as_view(), name="notifications-unread-count"),
     path("notifications/mark-all-read/", MarkAllReadView.as_view(), name="notifications-mark-all-read"),
+    # Async variant for ASGI deployments (see social_media_api/async_views.py).
+    path("async/notifications/", AsyncNotificationListView.as_view(), name="async-notifications"),
+    path("notifications/stream/", NotificationStreamView.as_view(), name="notifications-stream"),
 ]
\ No newline at end of file
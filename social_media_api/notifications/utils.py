@@ -1,32 +1,29 @@
-from django.conf import settings
-from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import transaction
 
+from .buffer import notification_buffer
 
-class Notification(models.Model):
-    recipient = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name="notifications",
-    )
-    actor = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name="notifications_sent",
-    )
-    verb = models.CharField(max_length=255)
 
-    # Generic target (Post, Comment, User, etc.)
-    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
-    target_object_id = models.PositiveIntegerField(null=True, blank=True)
-    target = GenericForeignKey("target_content_type", "target_object_id")
+def create_notification(recipient, actor, verb, target=None):
+    """
+    Queue a notification for `recipient`.
 
-    is_read = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    `recipient` and `actor` may be users or user ids. The event is handed
+    to the buffered writer once the current transaction commits, so
+    nothing is written for rolled-back actions and nothing is returned.
+    """
+    recipient_id = getattr(recipient, "pk", recipient)
+    actor_id = getattr(actor, "pk", actor)
 
-    class Meta:
-        ordering = ["is_read", "-timestamp"]
+    # No self-notifications (liking your own post, etc.)
+    if recipient_id == actor_id:
+        return
 
-    def __str__(self):
-        return f"{self.actor} {self.verb} -> {self.recipient}"
\ No newline at end of file
+    target_content_type_id = target_object_id = None
+    if target is not None:
+        target_content_type_id = ContentType.objects.get_for_model(target).pk
+        target_object_id = target.pk
+
+    transaction.on_commit(
+        lambda: notification_buffer.add(recipient_id, actor_id, verb, target_content_type_id, target_object_id)
+    )
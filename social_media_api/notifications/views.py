@@ -1,18 +1,47 @@
+from django.http import StreamingHttpResponse
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from social_media_api.async_views import AsyncAPIView
+from social_media_api.conditional import ConditionalGetMixin
+from social_media_api.pagination import KeysetPagination
 from .models import Notification
+from .stream import event_stream
 from .serializers import NotificationSerializer
+from .unread import reset_unread, unread_count
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ConditionalGetMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = NotificationSerializer
+    keyset_ordering = ("is_read", "-timestamp", "-id")
+    # Coalescing bumps timestamp and actor_count; mark-all-read flips is_read.
+    etag_fields = ("pk", "is_read", "timestamp", "actor_id", "actor_count", "target_object_id")
+    last_modified_field = "timestamp"
 
     def get_queryset(self):
-        # Unread first (model Meta ordering also helps)
-        return Notification.objects.filter(recipient=self.request.user).order_by("is_read", "-timestamp")
+        # Unread first (model Meta ordering also helps). Targets are
+        # resolved per page with one query per target model rather than
+        # one per notification.
+        return (
+            Notification.objects.filter(recipient=self.request.user)
+            .select_related("actor", "recipient")
+            .prefetch_related("target")
+            .order_by("is_read", "-timestamp")
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand_target"] = "target" in self.request.query_params.get("expand", "").split(",")
+        return context
+
+
+class UnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": unread_count(request.user.id)}, status=status.HTTP_200_OK)
 
 
 class MarkAllReadView(APIView):
@@ -20,4 +49,38 @@ class MarkAllReadView(APIView):
 
     def post(self, request):
         Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
-        return Response({"detail": "All notifications marked as read."}, status=status.HTTP_200_OK)
\ No newline at end of file
+        reset_unread(request.user.id)
+        return Response({"detail": "All notifications marked as read."}, status=status.HTTP_200_OK)
+
+
+class AsyncNotificationListView(AsyncAPIView):
+    """NotificationListView for ASGI deployments."""
+    keyset_ordering = NotificationListView.keyset_ordering
+
+    async def get(self, request):
+        # Same queryset as the sync view; `async for` runs it, including
+        # the target prefetch, in one trip to a worker thread.
+        notifications = (
+            Notification.objects.filter(recipient=request.user)
+            .select_related("actor", "recipient")
+            .prefetch_related("target")
+        )
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(notifications, request, view=self)
+        context = {
+            "request": request,
+            "expand_target": "target" in request.query_params.get("expand", "").split(","),
+        }
+        return paginator.get_paginated_response(NotificationSerializer(page, many=True, context=context).data)
+
+
+
+class NotificationStreamView(AsyncAPIView):
+    """Server-sent events of new notifications (see notifications/stream.py)."""
+
+    async def get(self, request):
+        last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+        response = StreamingHttpResponse(event_stream(request.user.id, last_event_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+        return response
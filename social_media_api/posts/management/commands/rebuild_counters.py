@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts import profiles
+from accounts.models import Follow
+from posts import ranking
+from posts.models import Comment, Like, Post
+
+
+def count_of(queryset, field):
+    """Correlated COUNT(*) of `queryset` rows whose `field` is the outer row's pk."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(n=Count("*"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized follower/following and like/comment counters from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows updated per transaction.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = self.rebuild(
+            User,
+            options["batch_size"],
+            followers_count=count_of(Follow.objects.all(), "followee"),
+            following_count=count_of(Follow.objects.all(), "follower"),
+        )
+        profiles.bump_generation()  # counters changed without post_save
+        posts = self.rebuild(
+            Post,
+            options["batch_size"],
+            likes_count=count_of(Like.objects.all(), "post"),
+            comments_count=count_of(Comment.objects.all(), "post"),
+        )
+        ranking.rebuild_scores(Post.objects.all(), options["batch_size"])  # scores follow the counters
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {users} users and {posts} posts."))
+
+    def rebuild(self, model, batch_size, **counters):
+        # One UPDATE ... SET col = (SELECT COUNT(*) ...) per pk range, so no
+        # single statement holds locks on the whole table.
+        updated = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                return updated
+            with transaction.atomic():
+                updated += model.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]).update(**counters)
+            last_pk = pks[-1]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute post engagement scores (top feed ranking) from the like/comment counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows updated per transaction.")
+
+    def handle(self, *args, **options):
+        updated = ranking.rebuild_scores(Post.objects.all(), options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt engagement scores for {updated} posts."))
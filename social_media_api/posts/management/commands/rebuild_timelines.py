@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized home timelines from the follow graph and existing posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only rebuild these user ids.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.all()
+        if options["user_ids"]:
+            users = users.filter(id__in=options["user_ids"])
+
+        total = 0
+        for user in users.iterator():
+            timeline.clear_timeline(user.pk)
+            for author_id in user.following.values_list("id", flat=True):
+                total += timeline.backfill_followee(user.pk, author_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} timeline entries."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for posts (see posts/search.py)."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = search.rebuild_index()
+        if not rebuilt:
+            self.stdout.write("No full-text backend for this database; search uses LIKE matching.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Indexed {Post.objects.count()} posts."))
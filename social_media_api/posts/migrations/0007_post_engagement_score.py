@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+def compute_scores(apps, schema_editor):
+    from posts.ranking import rebuild_scores
+
+    rebuild_scores(apps.get_model("posts", "Post").objects.all(), using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='engagement_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ranking
 
 
 class Post(models.Model):
@@ -9,8 +14,29 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters (see LikePostView / CommentViewSet and the
+    # rebuild_counters management command).
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Sort key of the top feed, moved with the counters (see posts/ranking.py).
+    engagement_score = models.FloatField(default=0)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            models.Index(fields=["author", "-created_at"], name="post_author_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} by {self.author}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # created_at is set by auto_now_add further down; the
+            # microseconds in between don't matter to the ranking.
+            self.engagement_score = ranking.score(self.likes_count, self.comments_count, timezone.now())
+        super().save(*args, **kwargs)
 
 
 class Comment(models.Model):
@@ -22,6 +48,80 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="comment_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Comment by {self.author} on Post {self.post_id}"
+
+
+class LikeManager(models.Manager):
+    def like(self, user_id, post_id):
+        """
+        Record a like and bump the post's counter in one transaction of two
+        statements, without reading the post or the like first.
+
+        Returns the post's author_id if a like was written, or None if the
+        post does not exist or `user_id` already liked it.
+        """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        if connection.vendor not in ("postgresql", "sqlite") or not connection.features.can_return_columns_from_insert:
+            return self._like_orm(db, user_id, post_id)
+
+        qn = connection.ops.quote_name
+        like_table, post_table = qn(self.model._meta.db_table), qn(Post._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            # INSERT ... SELECT FROM post doubles as the existence check;
+            # ON CONFLICT covers the (user, post) unique constraint.
+            cursor.execute(
+                f"INSERT INTO {like_table} (user_id, post_id, created_at) "
+                f"SELECT %s, id, %s FROM {post_table} WHERE id = %s "
+                f"ON CONFLICT DO NOTHING RETURNING id",
+                [user_id, now, post_id],
+            )
+            if cursor.fetchone() is None:
+                return None
+            score_sql, score_params = ranking.score_delta_sql(likes_delta=1)
+            cursor.execute(
+                f"UPDATE {post_table} SET likes_count = likes_count + 1, engagement_score = {score_sql} "
+                f"WHERE id = %s RETURNING author_id",
+                [*score_params, post_id],
+            )
+            return cursor.fetchone()[0]
+
+    def _like_orm(self, db, user_id, post_id):
+        # Backends without INSERT ... ON CONFLICT ... RETURNING.
+        author_id = Post.objects.using(db).filter(pk=post_id).values_list("author_id", flat=True).first()
+        if author_id is None:
+            return None
+        with transaction.atomic(using=db):
+            _, created = self.using(db).get_or_create(user_id=user_id, post_id=post_id)
+            if created:
+                Post.objects.using(db).filter(pk=post_id).update(
+                    likes_count=F("likes_count") + 1, engagement_score=ranking.score_delta(likes_delta=1)
+                )
+        return author_id if created else None
+
+    def unlike(self, user_id, post_id):
+        """DELETE the like and decrement the counter. Returns False if there was none."""
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            deleted, _ = self.using(db).filter(user_id=user_id, post_id=post_id).delete()
+            if deleted:
+                Post.objects.using(db).filter(pk=post_id).update(
+                    likes_count=F("likes_count") - deleted, engagement_score=ranking.score_delta(likes_delta=-deleted)
+                )
+        return bool(deleted)
+
+    # For async views; see FollowManager.afollow.
+    async def alike(self, user_id, post_id):
+        return await sync_to_async(self.like)(user_id, post_id)
+
+    async def aunlike(self, user_id, post_id):
+        return await sync_to_async(self.unlike)(user_id, post_id)
 
 
 class Like(models.Model):
@@ -29,9 +129,65 @@ class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="likes")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LikeManager()
+
     class Meta:
         unique_together = ("user", "post")  # prevent duplicate likes
         ordering = ["-created_at"]
+        indexes = [
+            # "Who liked this post" and "posts I liked", newest first.
+            models.Index(fields=["post", "-created_at"], name="like_post_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="like_user_created_idx"),
+        ]
 
     def __str__(self):
-        return f"{self.user} likes Post {self.post_id}"
\ No newline at end of file
+        return f"{self.user} likes Post {self.post_id}"
+
+class TimelineEntry(models.Model):
+    """
+    Materialized home-timeline row: `post` shows up in `owner`'s feed.
+
+    Rows are written when a post is created (fan-out-on-write) and
+    removed when the post is deleted (cascade) or `owner` unfollows the
+    author. `created_at` is copied from the post so the feed is a single
+    range scan on (owner, created_at).
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="timeline_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "post"], name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created_at"], name="timeline_owner_created_idx"),
+            models.Index(fields=["owner", "author"], name="timeline_owner_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of {self.owner_id}"
+
+
+class PostSearchIndex(models.Model):
+    """
+    The full-text index table maintained by posts/search.py: an FTS5
+    virtual table on SQLite, a tsvector table on PostgreSQL. Unmanaged;
+    mapped only so searches can join it to posts (post.search_index).
+    """
+    # "rowid" because that is the FTS5 table's key; the PostgreSQL table
+    # uses the same name so one mapping serves both.
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_index",
+    )
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_search"
@@ -0,0 +1,111 @@
+"""
+Engagement scores for the ranked ("top") feed.
+
+Each post stores
+
+    engagement_score = ln(1 + FEED_SCORE_LIKE_WEIGHT * likes_count
+                            + FEED_SCORE_COMMENT_WEIGHT * comments_count)
+                       + ln(2) * (created_at - SCORE_EPOCH) / FEED_SCORE_HALF_LIFE
+
+which orders posts exactly like engagement * 2 ** (-age / half_life) at
+any moment: "now" is the same for every post, so it drops out of the
+comparison. Scores therefore never need refreshing as posts age. They only
+change when engagement does, and the like/unlike and comment writes move
+the score in the same UPDATE that moves the counter (score_delta(), and
+score_delta_sql() for the raw INSERT ... ON CONFLICT path in
+LikeManager.like), by the difference of the two logarithms. No post is
+re-read and no other post is touched.
+
+`manage.py rebuild_scores` recomputes scores from the counters in pk
+batches: after changing the weights or half-life, after bulk loads that
+bypass Post.save(), and from rebuild_counters.
+
+The top feed ranks the reader's timeline entries from the last
+FEED_TOP_WINDOW_HOURS by score (see posts/timeline.py home_timeline()).
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Ln
+
+SCORE_EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def half_life():
+    return getattr(settings, "FEED_SCORE_HALF_LIFE", 24 * 3600)
+
+
+def like_weight():
+    return getattr(settings, "FEED_SCORE_LIKE_WEIGHT", 1.0)
+
+
+def comment_weight():
+    return getattr(settings, "FEED_SCORE_COMMENT_WEIGHT", 3.0)
+
+
+def top_window_hours():
+    return getattr(settings, "FEED_TOP_WINDOW_HOURS", 72)
+
+
+def score(likes_count, comments_count, created_at):
+    """The engagement_score of a post with these counters and creation time."""
+    engagement = 1 + like_weight() * likes_count + comment_weight() * comments_count
+    age = (created_at - SCORE_EPOCH).total_seconds()
+    return math.log(engagement) + math.log(2) * age / half_life()
+
+
+def _engagement(likes_delta, comments_delta):
+    return ExpressionWrapper(
+        Value(1.0)
+        + Value(like_weight()) * (F("likes_count") + likes_delta)
+        + Value(comment_weight()) * (F("comments_count") + comments_delta),
+        output_field=FloatField(),
+    )
+
+
+def score_delta(likes_delta=0, comments_delta=0):
+    """
+    The new engagement_score for an UPDATE that moves the counters by these
+    deltas, e.g. .update(likes_count=F("likes_count") + 1,
+    engagement_score=score_delta(likes_delta=1)). The right-hand side sees
+    the counters before the UPDATE.
+    """
+    return ExpressionWrapper(
+        F("engagement_score") + Ln(_engagement(likes_delta, comments_delta)) - Ln(_engagement(0, 0)),
+        output_field=FloatField(),
+    )
+
+
+def score_delta_sql(likes_delta=0, comments_delta=0):
+    """score_delta() as an SQL fragment and its params, for hand-written UPDATEs."""
+    engagement = "(1.0 + %s * (likes_count + %s) + %s * (comments_count + %s))"
+    params = [like_weight(), likes_delta, comment_weight(), comments_delta]
+    return f"engagement_score + LN{engagement} - LN{engagement}", params + [like_weight(), 0, comment_weight(), 0]
+
+
+def rebuild_scores(queryset, batch_size=5000, using=None):
+    """
+    Recompute engagement_score for the posts in `queryset`; returns how
+    many. Reads and writes go to `using` (the model's write database by
+    default), e.g. the database a migration is running on.
+    """
+    db = using or router.db_for_write(queryset.model)
+    queryset = queryset.using(db)
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "likes_count", "comments_count", "created_at")[:batch_size]
+        )
+        if not rows:
+            return updated
+        posts = [queryset.model(pk=pk, engagement_score=score(*counts)) for pk, *counts in rows]
+        with transaction.atomic(using=db):
+            queryset.model.objects.using(db).bulk_update(posts, ["engagement_score"])
+        updated += len(posts)
+        last_pk = rows[-1][0]
@@ -0,0 +1,183 @@
+"""
+Full-text search over posts.
+
+SearchFilter turns ?search= into `title LIKE '%term%' OR content LIKE
+'%term%'`, which scans every post. Posts are instead mirrored into a
+search index table that the database can look terms up in:
+
+  - SQLite: an FTS5 virtual table, ranked with bm25().
+  - PostgreSQL: a tsvector column with a GIN index, ranked with ts_rank().
+
+The backend is picked from the database vendor (POSTS_SEARCH_BACKEND =
+"like" forces plain SearchFilter). The index table is created by
+migration posts.0006, kept in sync by the post_save/post_delete receivers
+in posts/signals.py, and rebuilt with `manage.py reindex_posts` (needed
+after bulk_create, which sends no signals).
+
+Matches are ANDed terms; results carry a `search_rank` annotation
+(higher is better) and are ordered by it.
+"""
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import Post, PostSearchIndex
+
+POST_TABLE = Post._meta.db_table
+INDEX_TABLE = PostSearchIndex._meta.db_table
+
+
+class SQLiteFTS5Backend:
+    vendor = "sqlite"
+
+    def install(self, cursor):
+        # Not contentless: keeping the text lets rows be deleted by rowid
+        # (= post id) without knowing the old title/content.
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} "
+            f"USING fts5(title, content, tokenize='porter unicode61')"
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def index(self, cursor, post_ids):
+        placeholders = ", ".join(["%s"] * len(post_ids))
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})", post_ids)
+        cursor.execute(
+            f"INSERT INTO {INDEX_TABLE} (rowid, title, content) "
+            f"SELECT id, title, content FROM {POST_TABLE} WHERE id IN ({placeholders})",
+            post_ids,
+        )
+
+    def remove(self, cursor, post_ids):
+        placeholders = ", ".join(["%s"] * len(post_ids))
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})", post_ids)
+
+    def rebuild(self, cursor):
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+        cursor.execute(f"INSERT INTO {INDEX_TABLE} (rowid, title, content) SELECT id, title, content FROM {POST_TABLE}")
+
+    def search(self, queryset, text):
+        # Quote every term so user input can't use FTS5 query syntax.
+        query = " ".join('"%s"' % term.replace('"', '""') for term in text.split())
+        # bm25() only works on rows of the MATCH scan itself, so the index
+        # is joined in rather than queried per post. It is lower-is-better;
+        # negate it. Title matches weigh double.
+        return joined(queryset).filter(
+            RawSQL(f"{INDEX_TABLE} MATCH %s", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"-bm25({INDEX_TABLE}, 2.0, 1.0)", [], output_field=FloatField())
+        )
+
+
+class PostgresBackend:
+    vendor = "postgresql"
+    document = "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')"
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            f"rowid bigint PRIMARY KEY REFERENCES {POST_TABLE} (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            f"document tsvector NOT NULL)"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)")
+
+    def uninstall(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def index(self, cursor, post_ids):
+        cursor.execute(
+            f"INSERT INTO {INDEX_TABLE} (rowid, document) "
+            f"SELECT id, {self.document} FROM {POST_TABLE} WHERE id = ANY(%s) "
+            f"ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document",
+            [list(post_ids)],
+        )
+
+    def remove(self, cursor, post_ids):
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid = ANY(%s)", [list(post_ids)])
+
+    def rebuild(self, cursor):
+        cursor.execute(f"TRUNCATE {INDEX_TABLE}")
+        cursor.execute(f"INSERT INTO {INDEX_TABLE} (rowid, document) SELECT id, {self.document} FROM {POST_TABLE}")
+
+    def search(self, queryset, text):
+        return joined(queryset).filter(
+            RawSQL(f"{INDEX_TABLE}.document @@ plainto_tsquery('english', %s)", [text], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({INDEX_TABLE}.document, plainto_tsquery('english', %s))", [text], output_field=FloatField()
+            )
+        )
+
+
+def joined(queryset):
+    # INNER JOIN the index table (under its own name, which the raw SQL
+    # fragments above refer to).
+    return queryset.filter(search_index__isnull=False)
+
+
+BACKENDS = {backend.vendor: backend for backend in (SQLiteFTS5Backend(), PostgresBackend())}
+
+
+def backend_for(connection):
+    """The search backend for `connection`, or None to fall back to LIKE."""
+    if getattr(settings, "POSTS_SEARCH_BACKEND", "auto") == "like":
+        return None
+    return BACKENDS.get(connection.vendor)
+
+
+def _write_connection():
+    return connections[router.db_for_write(Post)]
+
+
+def index_posts(post_ids):
+    connection = _write_connection()
+    backend = backend_for(connection)
+    if backend is not None and post_ids:
+        with connection.cursor() as cursor:
+            backend.index(cursor, list(post_ids))
+
+
+def remove_posts(post_ids):
+    connection = _write_connection()
+    backend = backend_for(connection)
+    if backend is not None and post_ids:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, list(post_ids))
+
+
+def rebuild_index():
+    connection = _write_connection()
+    backend = backend_for(connection)
+    if backend is None:
+        return False
+    with connection.cursor() as cursor:
+        backend.rebuild(cursor)
+    return True
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= through the full-text index, ranked. Falls back to
+    SearchFilter's LIKE matching on databases without a backend.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = search_text(request)
+        backend = backend_for(connections[queryset.db])
+        if not text or backend is None:
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, text)
+
+
+def search_text(request):
+    return request.query_params.get(api_settings.SEARCH_PARAM, "").replace("\x00", "").strip()
+
+
+def is_ranked_search(request):
+    """True if FullTextSearchFilter will rank this request's results."""
+    return bool(search_text(request)) and backend_for(connections[router.db_for_read(Post)]) is not None
@@ -1,44 +1,125 @@
-from django.conf import settings
-from django.db import models
+from collections import defaultdict
 
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+
+from .models import Post, Comment, Like
 
-class Post(models.Model):
-    author = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name="posts",
-    )
-    title = models.CharField(max_length=255)
-    content = models.TextField()
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+class CommentSerializer(serializers.ModelSerializer):
+    author = serializers.ReadOnlyField(source="author.username")
 
     class Meta:
-        ordering = ["-created_at"]
+        model = Comment
+        fields = ["id", "post", "author", "content", "created_at", "updated_at"]
+        read_only_fields = ["id", "author", "created_at", "updated_at"]
 
-    def __str__(self):
-        return f"{self.title} by {self.author}"
 
+def liked_post_ids(context, post_ids):
+    """Ids among `post_ids` that the requesting user has liked, in one query."""
+    request = context.get("request")
+    if request is None or not request.user.is_authenticated:
+        return set()
+    return set(Like.objects.filter(user_id=request.user.id, post_id__in=post_ids).values_list("post_id", flat=True))
 
-class Comment(models.Model):
-    post = models.ForeignKey(
-        Post,
-        on_delete=models.CASCADE,
-        related_name="comments",
-    )
-    author = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name="comments",
+
+async def aliked_post_ids(user, post_ids):
+    """liked_post_ids() for async views, which pass the result in as context."""
+    if not user.is_authenticated:
+        return set()
+    likes = Like.objects.filter(user_id=user.id, post_id__in=post_ids).values_list("post_id", flat=True)
+    return {post_id async for post_id in likes}
+
+
+def latest_comments(post_ids, limit):
+    """
+    The newest `limit` comments of each post, oldest first, as
+    {post_id: [comment, ...]}. One query: ROW_NUMBER() partitioned by post.
+    """
+    comments = (
+        Comment.objects.filter(post_id__in=post_ids)
+        .annotate(
+            row=Window(RowNumber(), partition_by=F("post_id"), order_by=[F("created_at").desc(), F("id").desc()])
+        )
+        .filter(row__lte=limit)
+        .select_related("author")
+        .order_by("post_id", "created_at", "id")
     )
-    content = models.TextField()
+    by_post = defaultdict(list)
+    for comment in comments:
+        by_post[comment.post_id].append(comment)
+    return by_post
+
+
+class PostListSerializer(serializers.ListSerializer):
+    def prepare_page(self, posts):
+        # Look up has_liked (and embedded comments) for the whole page at
+        # once instead of per post. Also called by the compiled read path
+        # (social_media_api/fast_serializers.py) with values rows.
+        post_ids = [post.pk for post in posts]
+        if "liked_post_ids" not in self.context:
+            # Views that need these for their ETag (and async views) look
+            # them up themselves and pass them in.
+            self.child.context["liked_post_ids"] = liked_post_ids(self.context, post_ids)
+        if self.context.get("comments_limit") and "latest_comments" not in self.context:
+            self.child.context["latest_comments"] = latest_comments(post_ids, self.context["comments_limit"])
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        self.prepare_page(posts)
+        return super().to_representation(posts)
+
+
+class PostSerializer(serializers.ModelSerializer):
+    author = serializers.ReadOnlyField(source="author.username")
+    has_liked = serializers.SerializerMethodField()
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Only included with ?comments=N (see PostViewSet).
+    latest_comments = serializers.SerializerMethodField()
+
+    # What the method fields read, so lists can be serialized from
+    # values() rows (see social_media_api/fast_serializers.py).
+    method_field_columns = {"has_liked": ["pk"], "latest_comments": ["pk"]}
+
+    class Meta:
+        model = Post
+        list_serializer_class = PostListSerializer
+        fields = [
+            "id", "author", "title", "content", "likes_count", "comments_count", "has_liked", "latest_comments",
+            "created_at", "updated_at",
+        ]
+        read_only_fields = ["id", "author", "likes_count", "comments_count", "created_at", "updated_at"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get("comments_limit"):
+            self.fields.pop("latest_comments")
+
+    def get_has_liked(self, obj):
+        liked = self.context.get("liked_post_ids")
+        if liked is None:
+            liked = liked_post_ids(self.context, [obj.pk])
+        return obj.pk in liked
+
+    def get_latest_comments(self, obj):
+        comments = self.context.get("latest_comments")
+        if comments is None:
+            comments = latest_comments([obj.pk], self.context["comments_limit"])
+        return CommentSerializer(comments.get(obj.pk, []), many=True).data
+
+
+class LikerSerializer(serializers.ModelSerializer):
+    liked_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
-        ordering = ["created_at"]
+        model = get_user_model()
+        fields = ["id", "username", "liked_at"]
+
+
+class LikedPostSerializer(PostSerializer):
+    liked_at = serializers.DateTimeField(read_only=True)
 
-    def __str__(self):
-        return f"Comment by {self.author} on Post {self.post_id}"
\ No newline at end of file
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ["liked_at"]
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Follow
+from accounts.signals import user_followed, user_unfollowed, users_followed, users_unfollowed
+
+from . import search, timeline
+from .models import Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: timeline.fan_out_post(instance))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    # Same transaction as the write, so a rollback leaves the index alone.
+    search.index_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(user_followed, sender=Follow)
+def backfill_on_follow(sender, follower_id, followee_id, **kwargs):
+    timeline.backfill_followee(follower_id, followee_id)
+
+
+@receiver(user_unfollowed, sender=Follow)
+def trim_on_unfollow(sender, follower_id, followee_id, **kwargs):
+    timeline.remove_followee(follower_id, followee_id)
+
+
+@receiver(users_followed, sender=Follow)
+def backfill_on_bulk_follow(sender, follower_id, followee_ids, **kwargs):
+    timeline.backfill_followees(follower_id, followee_ids)
+
+
+@receiver(users_unfollowed, sender=Follow)
+def trim_on_bulk_unfollow(sender, follower_id, followee_ids, **kwargs):
+    timeline.remove_followees(follower_id, followee_ids)
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_timeline_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Covers edges written through the related managers
+    # (user.following.add(), user.followers.remove(), ...). Their
+    # counters and cached profiles are kept by
+    # accounts.models.sync_counts_on_m2m_change.
+    # reverse=False: instance.following changed, pk_set are followees.
+    # reverse=True: instance.followers changed, pk_set are followers.
+    if action == "post_add":
+        for pk in pk_set:
+            owner_id, author_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+            timeline.backfill_followee(owner_id, author_id)
+    elif action == "post_remove":
+        for pk in pk_set:
+            owner_id, author_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+            timeline.remove_followee(owner_id, author_id)
+    elif action == "pre_clear":
+        if reverse:
+            timeline.remove_author(instance.pk)
+        else:
+            timeline.clear_timeline(instance.pk)
@@ -1,9 +1,44 @@
+import decimal
+import itertools
+import json
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import Serializer
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model
 
-from .models import Post
+from . import ranking
+from .models import Comment, Like, Post, TimelineEntry
+from .serializers import CommentSerializer, LikedPostSerializer, LikerSerializer, PostSerializer
+from .views import FeedView
+from accounts.serializers import UserSerializer
+from accounts.authentication import warm_token_cache
+from accounts.models import Follow
+from notifications.models import Notification
+from social_media_api.db_router import (
+    ReplicaRouter, ReplicaRoutingMiddleware, pin_key, replica_health, replica_reads,
+)
+from social_media_api.fast_serializers import CompiledSerializer, compile_serializer
+from social_media_api.profiling import QueryBudgetExceeded, QueryProfileMiddleware, RequestProfile
+from social_media_api.renderers import FastJSONParser, FastJSONRenderer
 
 User = get_user_model()
 
@@ -29,4 +64,697 @@ class PostCommentTests(APITestCase):
         post = Post.objects.create(author=self.user1, title="T", content="C")
         self.auth(self.token2.key)
         res = self.client.patch(f"/api/posts/{post.id}/", {"content": "hacked"}, format="json")
-        self.assertEqual(res.status_code, 403)
\ No newline at end of file
+        self.assertEqual(res.status_code, 403)
+
+class FeedTimelineTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pass12345")
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.other = User.objects.create_user(username="other", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.reader).key}")
+
+    def create_post(self, author, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, title=title, content="C")
+
+    def feed_titles(self):
+        res = self.client.get("/api/feed/")
+        self.assertEqual(res.status_code, 200)
+        return [p["title"] for p in res.data["results"]]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.reader.following.add(self.author)
+        self.create_post(self.author, "first")
+        self.create_post(self.other, "not followed")
+
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 1)
+        self.assertEqual(self.feed_titles(), ["first"])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        self.create_post(self.author, "older")
+        self.reader.following.add(self.author)
+        self.assertEqual(self.feed_titles(), ["older"])
+
+        self.reader.following.remove(self.author)
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_deleted_post_leaves_timeline(self):
+        self.reader.following.add(self.author)
+        post = self.create_post(self.author, "gone")
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(FEED_CELEBRITY_FOLLOWER_THRESHOLD=2)
+    def test_celebrity_posts_are_merged_at_read_time(self):
+        self.reader.following.add(self.author)
+        self.other.following.add(self.author)
+        User.objects.filter(pk=self.author.pk).update(followers_count=2)
+        self.create_post(self.author, "celebrity")
+
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ["celebrity"])
+
+
+class TopFeedTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pass12345")
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.reader).key}")
+        Follow.objects.follow(self.reader.id, self.author.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a, self.b, self.c = [
+                Post.objects.create(author=self.author, title=title, content="C") for title in ("a", "b", "c")
+            ]
+        for i in range(4):
+            fan = User.objects.create_user(username=f"fan{i}", password="pass12345")
+            Like.objects.like(fan.id, self.b.id)
+        self.client.post("/api/comments/", {"post": self.a.id, "content": "hi"}, format="json")
+
+    def titles(self, **params):
+        res = self.client.get("/api/feed/", params)
+        self.assertEqual(res.status_code, 200)
+        return [p["title"] for p in res.data["results"]]
+
+    def test_scores_move_with_likes_and_comments(self):
+        Like.objects.unlike(User.objects.get(username="fan0").id, self.b.id)
+        for post in Post.objects.all():
+            self.assertAlmostEqual(
+                post.engagement_score, ranking.score(post.likes_count, post.comments_count, post.created_at), places=6
+            )
+
+    def test_engagement_halves_every_half_life(self):
+        now = timezone.now()
+        older = now - timedelta(seconds=ranking.half_life())
+        self.assertAlmostEqual(ranking.score(1, 0, now), ranking.score(3, 0, older))
+
+    def test_top_feed_ranks_recent_entries_by_score(self):
+        self.assertEqual(self.titles(), ["c", "b", "a"])
+        self.assertEqual(self.titles(order="top"), ["b", "a", "c"])
+        self.assertEqual(self.titles(order="top", page_size=1), ["b"])
+        next_page = self.client.get("/api/feed/", {"order": "top", "page_size": 2}).data["next"]
+        self.assertEqual([p["title"] for p in self.client.get(next_page).data["results"]], ["c"])
+
+        TimelineEntry.objects.filter(post=self.b).update(created_at=timezone.now() - timedelta(days=4))
+        self.assertEqual(self.titles(order="top"), ["a", "c"])
+
+    def test_top_feed_pages_through_one_snapshot(self):
+        first = self.client.get("/api/feed/", {"order": "top", "page_size": 1}).data
+        self.assertEqual([p["title"] for p in first["results"]], ["b"])
+        async_first = self.client.get("/api/async/feed/", {"order": "top", "page_size": 1}).json()
+        self.assertEqual(
+            (async_first["results"][0]["title"], async_first["next"].replace("/async", "")), ("b", first["next"])
+        )
+
+        # "c" overtakes "b" between pages; the session keeps its ranking.
+        for i in range(8):
+            fan = User.objects.create_user(username=f"late{i}", password="pass12345")
+            Like.objects.like(fan.id, self.c.id)
+        second = self.client.get(first["next"]).data
+        self.assertEqual([p["title"] for p in second["results"]], ["a"])
+        self.assertEqual([p["title"] for p in self.client.get(second["next"]).data["results"]], ["c"])
+        self.assertEqual(
+            [p["title"] for p in self.client.get(second["previous"]).data["results"]], ["b"]
+        )
+
+        # A new session (no snapshot) ranks again.
+        self.assertEqual(self.titles(order="top"), ["c", "b", "a"])
+
+    def test_top_feed_pages_fetch_only_their_posts(self):
+        first = self.client.get("/api/feed/", {"order": "top", "page_size": 1}).data
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first["next"])
+        [page] = [q["sql"] for q in queries if 'FROM "posts_post"' in q["sql"]]
+        self.assertIn(f'"posts_post"."id" IN ({self.a.id})', page)
+        self.assertNotIn("CASE", page)
+
+    def test_unknown_order_is_400(self):
+        res = self.client.get("/api/feed/", {"order": "hot"})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("order", res.json())
+        async_res = self.client.get("/api/async/feed/", {"order": "hot"})
+        self.assertEqual((async_res.status_code, async_res.json()), (400, res.json()))
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="pass12345")
+        for i in range(25):
+            Post.objects.create(author=self.user, title=f"post {i}", content="C")
+
+    def walk(self, url):
+        titles = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertNotIn("count", res.data)
+            titles += [p["title"] for p in res.data["results"]]
+            url = res.data["next"]
+        return titles
+
+    def test_pages_cover_every_post_once_newest_first(self):
+        titles = self.walk("/api/posts/")
+        self.assertEqual(titles, [f"post {i}" for i in reversed(range(25))])
+
+    def test_new_posts_do_not_shift_later_pages(self):
+        first = self.client.get("/api/posts/")
+        Post.objects.create(author=self.user, title="late arrival", content="C")
+        second = self.client.get(first.data["next"])
+        self.assertEqual(second.data["results"][0]["title"], "post 14")
+
+    def test_previous_link_returns_to_earlier_page(self):
+        first = self.client.get("/api/posts/")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_invalid_cursor_is_404(self):
+        res = self.client.get("/api/posts/", {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 404)
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.fan = User.objects.create_user(username="fan", password="pass12345")
+        self.post = Post.objects.create(author=self.author, title="T", content="C")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.fan).key}")
+
+    def test_like_and_unlike_update_likes_count(self):
+        self.client.post(f"/api/posts/{self.post.id}/like/")
+        self.client.post(f"/api/posts/{self.post.id}/like/")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.post(f"/api/posts/{self.post.id}/unlike/")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_like_writes_without_reading_first(self):
+        warm_token_cache(Token.objects.get(user=self.fan))
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(f"/api/posts/{self.post.id}/like/")
+
+        self.assertEqual(res.status_code, 201)
+        sql = [q["sql"].split()[0].upper() for q in ctx.captured_queries]
+        self.assertEqual([s for s in sql if s in ("SELECT", "INSERT", "UPDATE", "DELETE")][:2], ["INSERT", "UPDATE"])
+        self.assertNotIn("SELECT", sql[: sql.index("UPDATE") + 1])
+        self.assertTrue(Notification.objects.filter(recipient=self.author, actor=self.fan).exists())
+
+    def test_like_and_unlike_missing_post_is_404(self):
+        self.assertEqual(self.client.post("/api/posts/9999/like/").status_code, 404)
+        self.assertEqual(self.client.post("/api/posts/9999/unlike/").status_code, 404)
+
+    def test_comment_create_and_delete_update_comments_count(self):
+        res = self.client.post("/api/comments/", {"post": self.post.id, "content": "hi"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        self.client.delete(f"/api/comments/{res.data['id']}/")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_rebuild_counters_repairs_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Comment.objects.create(post=self.post, author=self.fan, content="hi")
+        self.fan.following.add(self.author)
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.fan.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertEqual((self.author.followers_count, self.author.following_count), (1, 0))
+        self.assertEqual((self.fan.followers_count, self.fan.following_count), (0, 1))
+
+
+class LikeListingTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.fans = [User.objects.create_user(username=f"fan{i}", password="pass12345") for i in range(3)]
+        self.posts = [Post.objects.create(author=self.author, title=f"p{i}", content="C") for i in range(3)]
+        for fan in self.fans:
+            Like.objects.like(fan.id, self.posts[0].id)
+        for post in self.posts[1:]:
+            Like.objects.like(self.fans[0].id, post.id)
+
+    def test_likers_newest_first(self):
+        res = self.client.get(f"/api/posts/{self.posts[0].id}/likes/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([u["username"] for u in res.data["results"]], ["fan2", "fan1", "fan0"])
+        self.assertEqual(self.client.get("/api/posts/9999/likes/").status_code, 404)
+
+    def test_liked_posts_paginate_newest_first(self):
+        url = f"/api/users/{self.fans[0].id}/liked-posts/?page_size=2"
+        first = self.client.get(url).data
+        second = self.client.get(first["next"]).data
+        titles = [p["title"] for p in first["results"] + second["results"]]
+        self.assertEqual(titles, ["p2", "p1", "p0"])
+        self.assertIsNone(second["next"])
+
+    def test_has_liked_is_one_query_per_page(self):
+        token = Token.objects.create(user=self.fans[1])
+        warm_token_cache(token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        # Page of posts + one has_liked lookup.
+        with self.assertNumQueries(2):
+            res = self.client.get("/api/posts/")
+        liked = {p["title"]: p["has_liked"] for p in res.data["results"]}
+        self.assertEqual(liked, {"p0": True, "p1": False, "p2": False})
+
+        self.client.credentials()
+        res = self.client.get("/api/posts/")
+        self.assertFalse(any(p["has_liked"] for p in res.data["results"]))
+
+
+class EmbeddedCommentsTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.posts = [Post.objects.create(author=self.author, title=f"p{i}", content="C") for i in range(10)]
+        for i, post in enumerate(self.posts):
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.author, content=f"c{n}") for n in range(i * 3)
+            )
+
+    def test_latest_comments_cost_a_fixed_number_of_queries(self):
+        # Posts page + one windowed comments query.
+        with self.assertNumQueries(2):
+            res = self.client.get("/api/posts/?comments=2")
+        for post in res.data["results"]:
+            expected = min(2, int(post["title"][1:]) * 3)
+            self.assertEqual(len(post["latest_comments"]), expected)
+        busiest = next(p for p in res.data["results"] if p["title"] == "p9")
+        self.assertEqual([c["content"] for c in busiest["latest_comments"]], ["c25", "c26"])
+
+    def test_comments_are_omitted_by_default(self):
+        res = self.client.get("/api/posts/")
+        self.assertNotIn("latest_comments", res.data["results"][0])
+
+
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.a = Post.objects.create(author=self.author, title="Running shoes", content="A review of trail runners")
+        self.b = Post.objects.create(author=self.author, title="Breakfast", content="Eggs, then a long run")
+        self.c = Post.objects.create(author=self.author, title="Gardening", content="Tomatoes and basil")
+
+    def search(self, text):
+        return [p["title"] for p in self.client.get("/api/posts/", {"search": text}).data["results"]]
+
+    def test_ranked_stemmed_matches(self):
+        # "run" matches "Running" and "run"; the title hit ranks first.
+        self.assertEqual(self.search("run"), ["Running shoes", "Breakfast"])
+        self.assertEqual(self.search("tomato basil"), ["Gardening"])
+        self.assertEqual(self.search('"unbalanced OR ('), [])
+
+    def test_ranked_results_paginate(self):
+        page = self.client.get("/api/posts/", {"search": "run", "page_size": 1}).data
+        titles = [p["title"] for p in page["results"]]
+        page = self.client.get(page["next"]).data
+        titles += [p["title"] for p in page["results"]]
+        self.assertEqual(titles, ["Running shoes", "Breakfast"])
+        self.assertIsNone(page["next"])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.c.title = "Running late"
+        self.c.save()
+        self.assertIn("Running late", self.search("running"))
+
+        self.a.delete()
+        self.assertNotIn("Running shoes", self.search("running"))
+
+    def test_reindex_picks_up_bulk_created_posts(self):
+        Post.objects.bulk_create([Post(author=self.author, title="Quietly imported", content="x")])
+        self.assertEqual(self.search("imported"), [])
+
+        call_command("reindex_posts", stdout=StringIO())
+        self.assertEqual(self.search("imported"), ["Quietly imported"])
+
+    @override_settings(POSTS_SEARCH_BACKEND="like")
+    def test_like_fallback(self):
+        self.assertEqual(set(self.search("Garden")), {"Gardening"})
+
+
+@override_settings(DATABASE_REPLICAS=["default", "replica_missing"], DATABASE_REPLICA_MAX_LAG=5)
+@override_settings(DATABASE_PIN_CACHE="default")
+class ReplicaRoutingTests(APITestCase):
+    # The primary doubles as a replica here; with real replicas configured
+    # (DATABASE_REPLICA_URLS) the test databases mirror the primary anyway.
+    def setUp(self):
+        replica_health.reset()
+        cache.clear()
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(replica_reads.get())
+            return HttpResponse(status=201 if request.method == "POST" else 200)
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def test_unreachable_and_lagging_replicas_are_dropped(self):
+        with self.assertLogs("social_media_api.db_router", "WARNING"):
+            self.assertEqual(replica_health.check(), ["default"])
+            with override_settings(DATABASE_REPLICA_MAX_LAG=-1):
+                self.assertEqual(replica_health.check(), [])
+
+    def test_only_safe_requests_read_from_replicas(self):
+        self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.middleware(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token b"))
+        self.assertEqual(self.seen, [True, False])
+        self.assertFalse(replica_reads.get())
+        self.assertEqual(ReplicaRouter().db_for_read(Post), "default")
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self.middleware(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token b"))
+        self.assertEqual(self.seen, [False, False, True])
+
+        cache.clear()  # pin expired
+        self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.assertEqual(self.seen[-1], True)
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "worker_a": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "pins"},
+        "worker_b": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "pins"},
+    })
+    def test_pins_reach_other_workers_through_a_shared_cache(self):
+        # Two cache instances over one store stand in for two workers on Redis.
+        with override_settings(DATABASE_PIN_CACHE="worker_a"):
+            self.middleware(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        with override_settings(DATABASE_PIN_CACHE="worker_b"):
+            self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.assertEqual(self.seen, [False, False])
+
+    @override_settings(DATABASE_PIN_CACHE=None)
+    def test_without_a_shared_cache_only_anonymous_reads_use_replicas(self):
+        self.middleware(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        self.middleware(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token b"))
+        self.middleware(self.factory.get("/api/posts/"))
+        self.assertEqual(self.seen, [False, False, True])
+        self.assertIsNone(cache.get(pin_key(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token a"))))
+
+    def test_async_chain_stays_async(self):
+        async def view(request):
+            self.seen.append(replica_reads.get())
+            return HttpResponse(status=201 if request.method == "POST" else 200)
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(self.factory.post("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        async_to_sync(middleware)(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token a"))
+        async_to_sync(middleware)(self.factory.get("/api/posts/", HTTP_AUTHORIZATION="Token b"))
+        self.assertEqual(self.seen, [False, False, True])
+
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pass12345")
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.reader).key}")
+        Follow.objects.follow(self.reader.id, self.author.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [Post.objects.create(author=self.author, title=f"p{i}", content="C") for i in range(5)]
+        Like.objects.like(self.reader.id, self.posts[0].id)
+
+    def test_feed_matches_sync_feed(self):
+        sync = self.client.get("/api/feed/", {"page_size": 2}).json()
+        res = self.client.get("/api/async/feed/", {"page_size": 2})
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual(data["results"], sync["results"])
+        self.assertEqual(
+            self.client.get(data["next"]).json()["results"],
+            self.client.get(sync["next"]).json()["results"],
+        )
+
+    @override_settings(NOTIFICATIONS_FLUSH_INTERVAL=0)
+    def test_like_and_unlike(self):
+        post = self.posts[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(f"/api/async/posts/{post.id}/like/")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.client.post(f"/api/async/posts/{post.id}/like/").json(), {"detail": "Already liked."})
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 1)
+        self.assertTrue(Notification.objects.filter(recipient=self.author, actor=self.reader).exists())
+
+        self.assertEqual(self.client.post(f"/api/async/posts/{post.id}/unlike/").status_code, 200)
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+        self.assertEqual(self.client.post("/api/async/posts/9999/like/").status_code, 404)
+        self.assertEqual(self.client.post("/api/async/posts/9999/unlike/").status_code, 404)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pass12345")
+        self.author = User.objects.create_user(username="author", password="pass12345")
+        self.other = User.objects.create_user(username="other", password="pass12345")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.reader).key}")
+        Follow.objects.follow(self.reader.id, self.author.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(author=self.author, title="T", content="C")
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_post_is_304_without_serializing(self):
+        url = f"/api/posts/{self.post.id}/"
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("Last-Modified", res)
+        self.assertIn("private", res["Cache-Control"])
+
+        with patch.object(PostSerializer, "to_representation") as to_representation:
+            res = self.revalidate(url, res["ETag"])
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+        to_representation.assert_not_called()
+
+    def test_counter_and_like_changes_invalidate(self):
+        url = f"/api/posts/{self.post.id}/"
+        etag = self.client.get(url)["ETag"]
+
+        Like.objects.like(self.other.id, self.post.id)
+        res = self.revalidate(url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["likes_count"], 1)
+
+        # likes_count ends up the same, but the reader's has_liked doesn't.
+        etag = res["ETag"]
+        Like.objects.unlike(self.other.id, self.post.id)
+        Like.objects.like(self.reader.id, self.post.id)
+        res = self.revalidate(url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.data["has_liked"])
+
+    def test_feed_revalidates_per_page_and_reader(self):
+        res = self.client.get("/api/feed/")
+        self.assertEqual(res.status_code, 200)
+        etag = res["ETag"]
+        self.assertEqual(self.revalidate("/api/feed/", etag).status_code, 304)
+        self.assertEqual(self.client.get("/api/async/feed/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, title="New", content="C")
+        self.assertEqual(self.revalidate("/api/feed/", etag).status_code, 200)
+
+        async_etag = self.client.get("/api/async/feed/")["ETag"]
+        self.assertEqual(self.client.get("/api/async/feed/", HTTP_IF_NONE_MATCH=async_etag).status_code, 304)
+
+        # Another reader never gets a 304 for this reader's ETag.
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.other).key}")
+        self.assertEqual(self.revalidate(f"/api/posts/{self.post.id}/", etag).status_code, 200)
+
+    def test_comment_edit_invalidates_post_list_with_embedded_comments(self):
+        comment = Comment.objects.create(post=self.post, author=self.other, content="first")
+        url = "/api/posts/?comments=3"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        Comment.objects.filter(pk=comment.pk).update(content="edited", updated_at=comment.updated_at + timedelta(seconds=1))
+        res = self.revalidate(url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["results"][0]["latest_comments"][0]["content"], "edited")
+
+
+class FastJSONTests(APITestCase):
+    def test_renders_the_same_bytes_as_drf(self):
+        data = {
+            "aware": datetime(2024, 5, 1, 12, 30, 0, 123456, tzinfo=dt_timezone.utc),
+            "naive": datetime(2024, 5, 1, 12, 30),
+            "price": decimal.Decimal("19.90"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "text": "caf\u00e9 \u2028",
+            "big": 2**70,
+            1: [timedelta(seconds=90), None],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b'"2024-05-01T12:30:00.123456Z"', FastJSONRenderer().render(data))
+
+    def test_api_responses_and_requests_go_through_it(self):
+        user = User.objects.create_user(username="u1", password="pass12345")
+        Post.objects.create(author=user, title="T", content="C")
+        res = self.client.get("/api/posts/")
+        self.assertIsInstance(res.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(res.json()["results"][0]["title"], "T")
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        res = self.client.post("/api/posts/", b'{"title": "J", "content": "\xc3\xa9"}', content_type="application/json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["content"], "\u00e9")
+
+    def test_parse_errors_are_400(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": '))
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"n": 1.5}')), {"n": 1.5})
+
+
+class FastSerializerParityTests(APITestCase):
+    """The compiled read path must render exactly what the ModelSerializers do."""
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="pass12345")
+        self.authors = [User.objects.create_user(username=name, password="pass12345") for name in ("ana", "bj\u00f6rn")]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.reader).key}")
+        Follow.objects.follow(self.reader.id, self.authors[0].id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(author=self.authors[i % 2], title=f"Post {i} \u2603", content="quick brown fox " * i)
+                for i in range(12)
+            ]
+        for post in self.posts[::3]:
+            Like.objects.like(self.reader.id, post.id)
+        Like.objects.like(self.authors[1].id, self.posts[0].id)
+        for i in range(4):
+            Comment.objects.create(post=self.posts[-1], author=self.authors[i % 2], content=f"comment {i}")
+
+    def assertSameResponses(self, url, params=None):
+        represent = CompiledSerializer.represent
+        with patch.object(CompiledSerializer, "represent", autospec=True, side_effect=represent) as fast_path:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        fast_path.assert_called_once()
+        with override_settings(FAST_LIST_SERIALIZERS=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(res.content, slow.content)
+        return res.json()
+
+    def test_list_endpoints(self):
+        cases = [
+            ("/api/posts/", {"page_size": 5}),
+            ("/api/posts/", {"comments": 3}),
+            ("/api/posts/", {"search": "fox"}),
+            ("/api/comments/", None),
+            ("/api/feed/", None),
+            ("/api/async/feed/", None),
+            (f"/api/posts/{self.posts[0].id}/likes/", None),
+            (f"/api/users/{self.reader.id}/liked-posts/", None),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                data = self.assertSameResponses(url, params)
+                self.assertTrue(data["results"])
+
+    def test_following_next_links(self):
+        data = self.assertSameResponses("/api/posts/", {"page_size": 5})
+        while data["next"]:
+            data = self.assertSameResponses(data["next"])
+
+    def test_compiled_serializers_match_model_serializers(self):
+        request = RequestFactory().get("/")
+        request.user = self.reader
+        context = {"request": request}
+        cases = [
+            (PostSerializer, Post.objects.all()),
+            (CommentSerializer, Comment.objects.all()),
+            (LikerSerializer, User.objects.filter(likes__post=self.posts[0]).annotate(liked_at=F("likes__created_at"))),
+            (LikedPostSerializer, Post.objects.filter(likes__user=self.reader).annotate(liked_at=F("likes__created_at"))),
+        ]
+        for (serializer_class, queryset), tz in itertools.product(cases, ["UTC", "Asia/Kolkata"]):
+            with self.subTest(serializer=serializer_class.__name__, tz=tz), timezone.override(tz):
+                queryset = queryset.order_by("id")
+                serializer = serializer_class(many=True, context=dict(context))
+                compiled = compile_serializer(serializer.child)
+                self.assertIsNotNone(compiled)
+                fast = compiled.represent(serializer, list(compiled.values(queryset, ["pk"])))
+                self.assertEqual(fast, serializer_class(queryset, many=True, context=dict(context)).data)
+
+    def test_instance_only_fields_are_not_compiled(self):
+        # profile_picture is a FileField, which needs the instance.
+        self.assertIsNone(compile_serializer(UserSerializer()))
+
+
+
+class QueryProfileTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="pass12345")
+        for i in range(3):
+            Post.objects.create(author=self.user, title=f"post {i}", content="C")
+
+    @override_settings(QUERY_PROFILE_SERVER_TIMING=True)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs("social_media_api.profiling", "INFO") as logs:
+            res = self.client.get("/api/posts/")
+        self.assertRegex(res["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, ')
+        summary = json.loads(logs.records[0].getMessage().removeprefix("request "))
+        self.assertEqual((summary["path"], summary["view"], summary["status"]), ("/api/posts/", "PostViewSet", 200))
+        self.assertGreater(summary["queries"], 0)
+        self.assertGreater(summary["serialize_ms"], 0)
+
+    def test_repeated_queries_share_a_fingerprint(self):
+        profile = RequestProfile()
+        profile.add_query('SELECT * FROM "posts_post" WHERE "id" IN (%s, %s)', 0.001)
+        profile.add_query('SELECT  * FROM "posts_post"\n WHERE "id" IN (%s)', 0.001)
+        profile.add_query('SELECT * FROM "accounts_user"', 0.001)
+        [duplicate] = profile.duplicates()
+        self.assertEqual(duplicate["count"], 2)
+        self.assertEqual(duplicate["sql"], 'SELECT * FROM "posts_post" WHERE "id" IN (...)')
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_over_budget_requests_fail_tests(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.assertEqual(self.client.get("/api/feed/").status_code, 200)
+        with patch.object(FeedView, "query_budget", 1), self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/api/feed/")
+        with override_settings(QUERY_BUDGET=0), self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/api/posts/")
+
+    def test_async_requests_are_profiled_without_a_thread(self):
+        async def view(request):
+            await Post.objects.acount()
+            return HttpResponse()
+
+        middleware = QueryProfileMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_view))
+        request = RequestFactory().get("/api/posts/")
+        with self.assertLogs("social_media_api.profiling", "INFO") as logs:
+            async_to_sync(middleware)(request)
+        summary = json.loads(logs.records[0].getMessage().removeprefix("request "))
+        self.assertEqual(summary["queries"], 1)
+
+    def test_rendering_is_timed_without_patching_libraries(self):
+        template = engines["django"].from_string("{% for row in rows %}{{ row }}{% endfor %}")
+
+        def get_response(request):
+            # What the handler does with a view's TemplateResponse.
+            response = middleware.process_template_response(request, TemplateResponse(request, template, {
+                "rows": range(20000),
+            }))
+            return response.render()
+
+        middleware = QueryProfileMiddleware(get_response)
+        with self.assertLogs("social_media_api.profiling", "INFO") as logs:
+            middleware(RequestFactory().get("/"))
+        summary = json.loads(logs.records[0].getMessage().removeprefix("request "))
+        self.assertGreater(summary["template_ms"], 0)
+        self.assertEqual(summary["serialize_ms"], 0)
+        self.assertEqual(Serializer.__dict__["data"].fget.__qualname__, "Serializer.data")
@@ -0,0 +1,231 @@
+"""
+Materialized home timelines (fan-out-on-write).
+
+When a post is created it is copied into a TimelineEntry row for every
+follower of its author, so reading a feed is a single range scan on
+(owner, created_at) instead of an IN-subquery over everyone the reader
+follows.
+
+Authors with a very large follower count ("celebrities") are not fanned
+out: writing one row per follower would make every post of theirs cost
+millions of INSERTs. Their posts are merged into the feed at read time
+instead. The cut-off is FEED_CELEBRITY_FOLLOWER_THRESHOLD (None turns the
+hybrid mode off and always fans out).
+
+The ranked ("top") feed is cut from a per-session snapshot: the first
+page ranks the window once and caches the ordered post ids, and every
+page slices that list by position and fetches only its own posts. Scores keep moving while a
+client pages, so paging on the live score would skip or repeat posts.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import Follow
+
+from . import ranking
+from .models import Post, TimelineEntry
+
+
+def celebrity_threshold():
+    return getattr(settings, "FEED_CELEBRITY_FOLLOWER_THRESHOLD", 10_000)
+
+
+def fanout_batch_size():
+    return getattr(settings, "FEED_FANOUT_BATCH_SIZE", 1_000)
+
+
+def backfill_limit():
+    return getattr(settings, "FEED_BACKFILL_LIMIT", 200)
+
+
+def top_snapshot_size():
+    return getattr(settings, "FEED_TOP_SNAPSHOT_SIZE", 500)
+
+
+def top_snapshot_seconds():
+    return getattr(settings, "FEED_TOP_SNAPSHOT_SECONDS", 900)
+
+
+def is_celebrity(author_id):
+    threshold = celebrity_threshold()
+    if threshold is None:
+        return False
+    User = get_user_model()
+    return User.objects.filter(pk=author_id, followers_count__gte=threshold).exists()
+
+
+def celebrity_followee_ids(user):
+    """Ids of the accounts `user` follows that are read-merged instead of fanned out."""
+    threshold = celebrity_threshold()
+    if threshold is None:
+        return []
+    return list(user.following.filter(followers_count__gte=threshold).values_list("id", flat=True))
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=fanout_batch_size(), ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Write `post` into the timeline of every follower of its author."""
+    if is_celebrity(post.author_id):
+        return 0
+
+    follower_ids = (
+        Follow.objects.filter(followee_id=post.author_id)
+        .values_list("follower_id", flat=True)
+        .iterator(chunk_size=fanout_batch_size())
+    )
+
+    batch = []
+    written = 0
+    for follower_id in follower_ids:
+        batch.append(
+            TimelineEntry(owner_id=follower_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+        )
+        if len(batch) >= fanout_batch_size():
+            _bulk_insert(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+        written += len(batch)
+    return written
+
+
+def backfill_followee(owner_id, author_id):
+    """Copy the author's most recent posts into a new follower's timeline."""
+    if is_celebrity(author_id):
+        return 0
+
+    recent = Post.objects.filter(author_id=author_id).order_by("-created_at").values_list("id", "created_at")
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, created_at in recent[: backfill_limit()]
+    ]
+    _bulk_insert(entries)
+    return len(entries)
+
+
+def backfill_followees(owner_id, author_ids):
+    """
+    Bulk follow: copy the newest posts across all of `author_ids` into the
+    owner's timeline with one query, skipping celebrities.
+    """
+    author_ids = list(author_ids)
+    threshold = celebrity_threshold()
+    if threshold is not None:
+        User = get_user_model()
+        celebrities = User.objects.filter(pk__in=author_ids, followers_count__gte=threshold)
+        skip = set(celebrities.values_list("id", flat=True))
+        author_ids = [a for a in author_ids if a not in skip]
+    if not author_ids:
+        return 0
+
+    recent = (
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by("-created_at")
+        .values_list("id", "author_id", "created_at")[: backfill_limit()]
+    )
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in recent
+    ]
+    _bulk_insert(entries)
+    return len(entries)
+
+
+def remove_followee(owner_id, author_id):
+    """Trim the author's posts out of `owner_id`'s timeline after an unfollow."""
+    deleted, _ = TimelineEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+    return deleted
+
+
+def remove_followees(owner_id, author_ids):
+    deleted, _ = TimelineEntry.objects.filter(owner_id=owner_id, author_id__in=list(author_ids)).delete()
+    return deleted
+
+
+def clear_timeline(owner_id):
+    deleted, _ = TimelineEntry.objects.filter(owner_id=owner_id).delete()
+    return deleted
+
+
+def remove_author(author_id):
+    deleted, _ = TimelineEntry.objects.filter(author_id=author_id).delete()
+    return deleted
+
+
+def home_timeline(user, order="recent"):
+    """
+    Posts in `user`'s home feed, newest first.
+
+    The common case is a join against the materialized timeline. When the
+    user follows celebrity accounts their posts are OR-ed in by author.
+    Either way rows carry a `feed_at` sort key for keyset pagination.
+
+    order="top" keeps the entries from the last FEED_TOP_WINDOW_HOURS,
+    found with a range scan of the same (owner, created_at) index, and
+    orders them by the posts' precomputed engagement_score
+    (posts/ranking.py). No index serves that order: the window's rows are
+    sorted, which is why the feed endpoints only run it once per
+    top_snapshot() rather than page it.
+    """
+    ordering = ("-engagement_score", "-id") if order == "top" else ("-feed_at", "-id")
+    since = timezone.now() - timedelta(hours=ranking.top_window_hours()) if order == "top" else None
+
+    celebrity_ids = celebrity_followee_ids(user)
+    if not celebrity_ids:
+        entries = Q(timeline_entries__owner=user)
+        if since is not None:
+            entries &= Q(timeline_entries__created_at__gte=since)
+        return (
+            Post.objects.filter(entries)
+            .annotate(feed_at=F("timeline_entries__created_at"))
+            .select_related("author")
+            .order_by(*ordering)
+        )
+
+    materialized = TimelineEntry.objects.filter(owner=user)
+    celebrity_posts = Q(author_id__in=celebrity_ids)
+    if since is not None:
+        materialized = materialized.filter(created_at__gte=since)
+        celebrity_posts &= Q(created_at__gte=since)
+    return (
+        Post.objects.filter(Q(id__in=materialized.values("post_id")) | celebrity_posts)
+        .annotate(feed_at=F("created_at"))
+        .select_related("author")
+        .order_by(*ordering)
+    )
+
+
+def _snapshot_key(user_id, token):
+    return f"feed:top:{user_id}:{token}"
+
+
+def top_snapshot(user, token=None):
+    """
+    (token, post ids): `user`'s top feed ranked once, at most
+    FEED_TOP_SNAPSHOT_SIZE posts, cached for FEED_TOP_SNAPSHOT_SECONDS.
+
+    An unknown or expired token ranks the window again. The token is a
+    hash of the ranking, so an unchanged ranking keeps its token (and the
+    pages their ETags). Snapshots live in the default cache; with a
+    per-process cache a page served by another worker re-ranks, which
+    can skip or repeat posts like paging on the live score would.
+    """
+    if token:
+        post_ids = cache.get(_snapshot_key(user.pk, token))
+        if post_ids is not None:
+            return token, post_ids
+    post_ids = list(home_timeline(user, "top").values_list("id", flat=True)[: top_snapshot_size()])
+    token = hashlib.sha256(",".join(map(str, post_ids)).encode()).hexdigest()[:16]
+    cache.set(_snapshot_key(user.pk, token), post_ids, top_snapshot_seconds())
+    return token, post_ids
+
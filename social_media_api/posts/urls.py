@@ -1,6 +1,17 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, FeedView, LikePostView, UnlikePostView
+from .views import (
+    PostViewSet,
+    CommentViewSet,
+    FeedView,
+    LikePostView,
+    UnlikePostView,
+    PostLikersView,
+    LikedPostsView,
+    AsyncFeedView,
+    AsyncLikePostView,
+    AsyncUnlikePostView,
+)
 
 router = DefaultRouter()
 router.register(r"posts", PostViewSet, basename="posts")
@@ -10,5 +21,11 @@ urlpatterns = [
     path("feed/", FeedView.as_view(), name="feed"),
     path("posts/<int:pk>/like/", LikePostView.as_view(), name="post-like"),
     path("posts/<int:pk>/unlike/", UnlikePostView.as_view(), name="post-unlike"),
+    path("posts/<int:pk>/likes/", PostLikersView.as_view(), name="post-likers"),
+    path("users/<int:user_id>/liked-posts/", LikedPostsView.as_view(), name="user-liked-posts"),
+    # Async variants for ASGI deployments (see social_media_api/async_views.py).
+    path("async/feed/", AsyncFeedView.as_view(), name="async-feed"),
+    path("async/posts/<int:pk>/like/", AsyncLikePostView.as_view(), name="async-post-like"),
+    path("async/posts/<int:pk>/unlike/", AsyncUnlikePostView.as_view(), name="async-post-unlike"),
 ]
 urlpatterns += router.urls
\ No newline at end of file
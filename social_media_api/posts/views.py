@@ -1,62 +1,240 @@
-from rest_framework import permissions,generics,status
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from rest_framework import permissions,generics,status,viewsets
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
 from .models import Post, Comment,Like
-from notifications.models import Notification
-from .serializers import PostSerializer
+from notifications.utils import create_notification
+from .serializers import (
+    PostSerializer, CommentSerializer, LikerSerializer, LikedPostSerializer, aliked_post_ids, latest_comments,
+    liked_post_ids,
+)
+from . import ranking
+from .search import FullTextSearchFilter, is_ranked_search
+from .timeline import home_timeline, top_snapshot
+from social_media_api.async_views import AsyncAPIView
+from social_media_api.conditional import ConditionalGetMixin, conditional_response, fingerprint, newest
+from social_media_api.fast_serializers import serialize_rows, values_queryset
+from social_media_api.pagination import KeysetPagination
 
 # Keep these literal strings around if your checker is picky:
 Post.objects.all()
 Comment.objects.all()
 
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
+    # Cursor pages keyed on (created_at, id); no COUNT(*) or OFFSET.
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 50
 
 
+class TopFeedPagination(StandardResultsSetPagination):
+    """
+    Pages of the top feed are slices of one ranking snapshot (see
+    posts/timeline.py): the cursor is a position in its list of post ids,
+    only the page's ids are fetched, and the links name the snapshot.
+    """
+    snapshot_query_param = "snapshot"
+    ordering = ("position",)
+
+    def __init__(self, snapshot, post_ids):
+        self.snapshot = snapshot
+        self.post_ids = post_ids
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        position = self.cursor["v"][0] if self.cursor else -1
+        if self.cursor and (not isinstance(position, int) or position < 0):
+            raise NotFound(self.invalid_cursor_message)
+        if self.cursor and self.cursor["r"]:
+            self.start, self.end = max(0, position - self.page_size), max(0, position)
+        else:
+            self.start, self.end = position + 1, position + 1 + self.page_size
+        self.end = min(self.end, len(self.post_ids))
+        self.positions = {pk: i for i, pk in enumerate(self.post_ids[self.start:self.end], self.start)}
+        return queryset.filter(id__in=self.positions)
+
+    def _set_page(self, rows):
+        # Posts deleted since the snapshot are simply missing.
+        self.page = sorted(rows, key=lambda row: self.positions[row.pk])
+        self.has_previous = self.start > 0
+        self.has_next = self.end < len(self.post_ids)
+        return self.page
+
+    def get_next_link(self):
+        return self.encode_cursor([self.end - 1], reverse=False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self.encode_cursor([self.start], reverse=True) if self.has_previous else None
+
+    def encode_cursor(self, values, reverse):
+        url = super().encode_cursor(values, reverse)
+        return replace_query_param(url, self.snapshot_query_param, self.snapshot)
+
+
+class IsOwnerOrReadOnly(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return obj.author_id == request.user.id
+
+
+class PostValidatorsMixin(ConditionalGetMixin):
+    # has_liked is looked up once per page for both the ETag and the
+    # serializer; author renames are not covered.
+    etag_fields = ("pk", "author_id", "updated_at", "likes_count", "comments_count")
+
+    def get_validator_context(self, rows):
+        return post_page_context(self.get_serializer_context(), rows)
+
+
+def post_page_context(context, posts):
+    post_ids = [post.pk for post in posts]
+    extra = {"liked_post_ids": liked_post_ids(context, post_ids)}
+    if context.get("comments_limit"):
+        extra["latest_comments"] = latest_comments(post_ids, context["comments_limit"])
+    return extra
+
+
+class PostViewSet(PostValidatorsMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related("author").all()
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = StandardResultsSetPagination
+    # Full-text index where the database has one, LIKE otherwise
+    # (see posts/search.py); search_fields drive the LIKE fallback.
+    filter_backends = [FullTextSearchFilter]
+    search_fields = ["title", "content"]
+    max_embedded_comments = 10
+
+    @property
+    def keyset_ordering(self):
+        # Ranked search results page by relevance, then recency.
+        if is_ranked_search(self.request):
+            return ("-search_rank", "-id")
+        return None
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
+    def get_serializer_context(self):
+        # ?comments=N embeds each post's latest N comments.
+        context = super().get_serializer_context()
+        try:
+            limit = int(self.request.query_params.get("comments", 0))
+        except ValueError:
+            limit = 0
+        context["comments_limit"] = max(0, min(limit, self.max_embedded_comments))
+        return context
+
+
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related("author").all()
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = StandardResultsSetPagination
+    keyset_ordering = ("created_at", "id")
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        comment = serializer.save(author=self.request.user)
+        Post.objects.filter(pk=comment.post_id).update(
+            comments_count=F("comments_count") + 1, engagement_score=ranking.score_delta(comments_delta=1)
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        post_id = instance.post_id
+        instance.delete()
+        Post.objects.filter(pk=post_id).update(
+            comments_count=F("comments_count") - 1, engagement_score=ranking.score_delta(comments_delta=-1)
+        )
+
+
 class FeedView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 10  # see social_media_api/profiling.py
+    # ?order=top ranks the recent part of the timeline by engagement
+    # (posts/ranking.py) and pages by position in a snapshot of that
+    # ranking (TopFeedPagination), so it has no keyset; the default is
+    # newest first.
+    keyset_orderings = {"recent": ("-feed_at", "-id"), "top": ()}
 
     def get(self, request):
-        # 👇 EXACT string the checker wants:
-        following_users = request.user.following.all()
+        order = feed_order(request)
+        self.keyset_ordering = self.keyset_orderings[order]
+        context = {"request": request}
+        serializer = PostSerializer(many=True, context=context)
+        feed_posts, paginator = feed_source(request, order)
+        feed_posts, compiled = feed_rows(serializer, feed_posts, self.keyset_ordering)
 
-        # 👇 EXACT string the checker wants:
-        feed_posts = Post.objects.filter(author__in=following_users).order_by("-created_at")
+        page = paginator.paginate_queryset(feed_posts, request, view=self)
+        context["liked_post_ids"] = liked_post_ids(context, [p.pk for p in page])
+        return feed_response(request, paginator, page, serializer, compiled)
 
-        paginator = StandardResultsSetPagination()
-        page = paginator.paginate_queryset(feed_posts, request)
-        serializer = PostSerializer(page, many=True, context={"request": request})
-        return paginator.get_paginated_response(serializer.data)
 
+def feed_order(request):
+    order = request.query_params.get("order", "recent")
+    if order not in FeedView.keyset_orderings:
+        raise ValidationError({"order": f"Expected one of: {', '.join(FeedView.keyset_orderings)}."})
+    return order
 
-from rest_framework import permissions, status
-from rest_framework.response import Response
-from rest_framework.views import APIView
 
-from .models import Post, Like
-from notifications.utils import create_notification
+def feed_source(request, order):
+    """(queryset, paginator) for the home feed in `order`."""
+    if order != "top":
+        return home_timeline(request.user, order), StandardResultsSetPagination()
+    snapshot, post_ids = top_snapshot(request.user, request.query_params.get(TopFeedPagination.snapshot_query_param))
+    return Post.objects.select_related("author"), TopFeedPagination(snapshot, post_ids)
+
+
+def feed_rows(serializer, feed_posts, ordering):
+    # Values rows for the compiled serializer (social_media_api/fast_serializers.py).
+    columns = [field.lstrip("-") for field in ordering] + list(PostValidatorsMixin.etag_fields)
+    return values_queryset(serializer, feed_posts, columns)
+
+
+def feed_response(request, paginator, page, serializer, compiled):
+    # Conditional like PostViewSet's list (see social_media_api/conditional.py).
+    parts = [
+        fingerprint(page, PostValidatorsMixin.etag_fields),
+        fingerprint(serializer.context["liked_post_ids"]),
+        (paginator.get_next_link(), paginator.get_previous_link()),
+    ]
+
+    def render():
+        return paginator.get_paginated_response(serialize_rows(serializer, page, compiled))
+
+    return conditional_response(request, parts, newest(page, "updated_at"), render)
 
 
 class LikePostView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        # 👇 EXACT string checker wants
-        post = generics.get_object_or_404(Post, pk=pk)
-
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        if not created:
+        # INSERT ... ON CONFLICT + counter UPDATE; the post is only read
+        # when nothing was inserted, to tell a 404 from a repeat like.
+        author_id = Like.objects.like(request.user.id, pk)
+        if author_id is None:
+            generics.get_object_or_404(Post.objects.only("id"), pk=pk)
             return Response({"detail": "Already liked."}, status=status.HTTP_200_OK)
 
+        # Unsaved stand-in: the notification only needs the target's pk.
+        post = Post(pk=pk, author_id=author_id)
         # 👇 EXACT string checker wants
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
+        if post.author_id != request.user.id:
+            # Buffered and coalesced (see notifications/buffer.py) rather
+            # than Notification.objects.create per like.
+            create_notification(
+                recipient=post.author_id,
                 actor=request.user,
                 verb="liked your post",
                 target=post,
@@ -69,11 +247,92 @@ class UnlikePostView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        # consistent pattern
-        post = generics.get_object_or_404(Post, pk=pk)
-
-        deleted, _ = Like.objects.filter(user=request.user, post=post).delete()
-        if deleted == 0:
+        if not Like.objects.unlike(request.user.id, pk):
+            generics.get_object_or_404(Post.objects.only("id"), pk=pk)
             return Response({"detail": "You haven't liked this post."}, status=status.HTTP_200_OK)
 
-        return Response({"detail": "Post unliked."}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"detail": "Post unliked."}, status=status.HTTP_200_OK)
+
+
+class PostLikersView(ConditionalGetMixin, generics.ListAPIView):
+    """Users who liked a post, most recent like first."""
+    serializer_class = LikerSerializer
+    pagination_class = StandardResultsSetPagination
+    query_budget = 10
+    keyset_ordering = ("-liked_at", "-id")
+    etag_fields = ("pk", "username", "liked_at")
+    last_modified_field = "liked_at"
+
+    def get_queryset(self):
+        # Filter and order on the like row so the (post, -created_at)
+        # index drives the scan; users are joined by primary key.
+        post = generics.get_object_or_404(Post.objects.only("id"), pk=self.kwargs["pk"])
+        return get_user_model().objects.filter(likes__post=post).annotate(liked_at=F("likes__created_at"))
+
+
+class LikedPostsView(PostValidatorsMixin, generics.ListAPIView):
+    """Posts a user has liked, most recent like first."""
+    serializer_class = LikedPostSerializer
+    pagination_class = StandardResultsSetPagination
+    query_budget = 10
+    keyset_ordering = ("-liked_at", "-id")
+    etag_fields = PostValidatorsMixin.etag_fields + ("liked_at",)
+
+    def get_queryset(self):
+        user = generics.get_object_or_404(get_user_model().objects.only("id"), pk=self.kwargs["user_id"])
+        return (
+            Post.objects.filter(likes__user=user)
+            .annotate(liked_at=F("likes__created_at"))
+            .select_related("author")
+        )
+
+
+
+# --- Async variants for ASGI deployments (see social_media_api/async_views.py) ---
+
+
+class AsyncFeedView(AsyncAPIView):
+    query_budget = FeedView.query_budget
+
+    async def get(self, request):
+        order = feed_order(request)
+        self.keyset_ordering = FeedView.keyset_orderings[order]
+        context = {"request": request}
+        serializer = PostSerializer(many=True, context=context)
+        feed_posts, paginator = await sync_to_async(feed_source)(request, order)
+        feed_posts, compiled = feed_rows(serializer, feed_posts, self.keyset_ordering)
+
+        page = await paginator.apaginate_queryset(feed_posts, request, view=self)
+        context["liked_post_ids"] = await aliked_post_ids(request.user, [p.pk for p in page])
+        return feed_response(request, paginator, page, serializer, compiled)
+
+
+def notify_like(post_id, author_id, user):
+    create_notification(
+        recipient=author_id,
+        actor=user,
+        verb="liked your post",
+        target=Post(pk=post_id, author_id=author_id),
+    )
+
+
+class AsyncLikePostView(AsyncAPIView):
+    async def post(self, request, pk):
+        author_id = await Like.objects.alike(request.user.id, pk)
+        if author_id is None:
+            if not await Post.objects.filter(pk=pk).aexists():
+                raise NotFound()
+            return Response({"detail": "Already liked."}, status=status.HTTP_200_OK)
+
+        if author_id != request.user.id:
+            await sync_to_async(notify_like)(pk, author_id, request.user)
+        return Response({"detail": "Post liked."}, status=status.HTTP_201_CREATED)
+
+
+class AsyncUnlikePostView(AsyncAPIView):
+    async def post(self, request, pk):
+        if not await Like.objects.aunlike(request.user.id, pk):
+            if not await Post.objects.filter(pk=pk).aexists():
+                raise NotFound()
+            return Response({"detail": "You haven't liked this post."}, status=status.HTTP_200_OK)
+        return Response({"detail": "Post unliked."}, status=status.HTTP_200_OK)
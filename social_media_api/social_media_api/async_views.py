@@ -0,0 +1,97 @@
+"""
+A small async counterpart of DRF's APIView.
+
+DRF views are synchronous, so under ASGI every request to one occupies a
+worker thread while it waits on the database. AsyncAPIView handlers are
+coroutines that use Django's async ORM (aget, afirst, `async for`), and
+authentication goes through an authenticator's `aauthenticate()` when it
+has one (see accounts.authentication.CachedTokenAuthentication).
+
+Handlers take the DRF Request (for query_params, pagination links and
+request.user) and return a DRF Response, which is rendered with the first
+DEFAULT_RENDERER_CLASSES entry (other HttpResponses, e.g. streams, pass
+through as is). Only what the hot endpoints need is supported:
+authentication, an authenticated-only switch and exception handling,
+which goes through DRF's EXCEPTION_HANDLER like APIView's, so errors
+have the same shape as on the sync endpoints. Under WSGI these views
+still work, one event loop per request.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class AsyncAPIView(View):
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    # AllowAny / IsAuthenticated are the only policies these views need.
+    require_authentication = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token auth only; like APIView, session CSRF would be the
+        # authenticator's job.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.http_method_not_allowed(request, *args, **kwargs)
+
+        # As in APIView, the DRF Request replaces the Django one.
+        self.request = drf_request = Request(request, authenticators=[])
+        try:
+            drf_request.user, drf_request.auth = await self.authenticate(drf_request)
+            if self.require_authentication and not drf_request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            response = await handler(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.render(response)
+
+    async def authenticate(self, request):
+        for authenticator in (cls() for cls in self.authentication_classes):
+            if hasattr(authenticator, "aauthenticate"):
+                result = await authenticator.aauthenticate(request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                self.authenticator = authenticator
+                return result
+        self.authenticator = None
+        return (api_settings.UNAUTHENTICATED_USER(), None)
+
+    def handle_exception(self, exc):
+        """APIView.handle_exception(): EXCEPTION_HANDLER builds the response, anything else is re-raised."""
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # 401 with a challenge when token auth is in use, 403 otherwise.
+            authenticator = self.authentication_classes[0]() if self.authentication_classes else None
+            header = authenticator.authenticate_header(None) if authenticator else None
+            if header:
+                exc.auth_header = header
+            else:
+                exc.status_code = 403
+        context = {"view": self, "args": self.args, "kwargs": self.kwargs, "request": self.request}
+        response = api_settings.EXCEPTION_HANDLER(exc, context)
+        if response is None:
+            raise exc
+        response.exception = True
+        return response
+
+    def render(self, response):
+        if not isinstance(response, Response):
+            return response  # e.g. a StreamingHttpResponse
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        rendered = HttpResponse(
+            renderer.render(response.data),
+            status=response.status_code,
+            content_type=f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type,
+        )
+        for name, value in response.items():
+            if name.lower() != "content-type":
+                rendered[name] = value
+        return rendered
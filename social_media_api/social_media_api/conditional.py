@@ -0,0 +1,142 @@
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+Views fetch the rows they would serialize anyway (one page, or one
+object) together with the per-request lookups the representation depends
+on (which posts the reader has liked, embedded comments), then hash the
+fields that can change: `updated_at`, the denormalized counters, ids.
+When the client's If-None-Match matches, a 304 goes back before any
+serializer runs, and the lookups computed for the hash are handed to the
+serializer instead of being queried again when it doesn't.
+
+The ETag also covers the reader, the negotiated media type, the URL and
+the page's next/previous links, so a 304 never crosses those.
+Last-Modified is the newest row's `updated_at` (or the view's
+`last_modified_field`). It is informational only: counters and likes
+change without touching `updated_at`, so If-Modified-Since is not used
+to answer 304s.
+"""
+import datetime
+import hashlib
+
+from django.db.models import Model
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .fast_serializers import row_columns, serialize_rows, values_queryset
+
+
+def fingerprint(value, fields=("pk", "updated_at")):
+    """A repr-able summary of `value`; model instances reduce to `fields`."""
+    if isinstance(value, Model) or hasattr(value, "_fields"):  # instances and values_list(named=True) rows
+        return tuple(getattr(value, field, None) for field in fields)
+    if isinstance(value, dict):
+        return sorted((key, fingerprint(item)) for key, item in value.items())
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, (list, tuple)):
+        return [fingerprint(item, fields) for item in value]
+    return value
+
+
+def make_etag(request, parts):
+    user = getattr(request, "user", None)
+    key = repr((
+        getattr(user, "pk", None),
+        getattr(request, "accepted_media_type", None),
+        request.build_absolute_uri(),
+        parts,
+    ))
+    return f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def newest(rows, field):
+    if field is None:
+        return None
+    values = [value for value in (getattr(row, field, None) for row in rows) if isinstance(value, datetime.datetime)]
+    return max(values) if values else None
+
+
+def is_not_modified(request, etag):
+    if request.method not in ("GET", "HEAD"):
+        return False
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): GZip middleware weakens ETags.
+    return etag in (tag.removeprefix("W/") for tag in parse_etags(header))
+
+
+def conditional_response(request, parts, last_modified, render):
+    """
+    Answer 304 if the client has the ETag of `parts`, else `render()`.
+    Either way the response carries the validators.
+    """
+    etag = make_etag(request, parts)
+    if is_not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = render()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Representations are per reader: has_liked, profile, notifications.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for a generic view's list() and retrieve().
+
+    `etag_fields` are the row attributes the representation depends on.
+    get_validator_context() returns extra serializer context (per-request
+    lookups) that is hashed as well. Rows may be model instances or named
+    values rows (fast_serializers.py), so both only read attributes.
+    """
+    etag_fields = ("pk", "updated_at")
+    last_modified_field = "updated_at"
+
+    def get_validator_context(self, rows):
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        # Rows come from values() through the compiled serializer where
+        # possible (see social_media_api/fast_serializers.py).
+        context = self.get_serializer_context()
+        serializer = self.get_serializer(many=True, context=context)
+        queryset, compiled = values_queryset(serializer, self.filter_queryset(self.get_queryset()), row_columns(self))
+
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        extra = self.get_validator_context(rows)
+        parts = [fingerprint(rows, self.etag_fields), fingerprint(extra)]
+        if page is not None:
+            parts.append((self.paginator.get_next_link(), self.paginator.get_previous_link()))
+
+        def render():
+            context.update(extra)
+            data = serialize_rows(serializer, rows, compiled)
+            if page is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+
+        return conditional_response(request, parts, newest(rows, self.last_modified_field), render)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        extra = self.get_validator_context([instance])
+        parts = [fingerprint(instance, self.etag_fields), fingerprint(extra)]
+
+        def render():
+            serializer = self.get_serializer(instance, context={**self.get_serializer_context(), **extra})
+            return Response(serializer.data)
+
+        return conditional_response(request, parts, newest([instance], self.last_modified_field), render)
@@ -0,0 +1,212 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS (comma-separated) adds replica_0, replica_1, ...
+next to `default`. ReplicaRoutingMiddleware lets reads made while
+serving GET/HEAD/OPTIONS go to a replica; everything else (writes,
+unsafe requests, management commands, signal handlers outside a request)
+stays on the primary.
+
+Read-your-writes: after a successful unsafe request the client (its
+Authorization header, session or address) is pinned to the primary for
+DATABASE_PIN_SECONDS, so it doesn't read a replica that hasn't caught up
+with its own write. Pins live in the DATABASE_PIN_CACHE alias, which has
+to be shared by every worker (Redis), since the read may land on another
+worker than the write. Without a shared cache (the setting is None) there
+are no pins: requests that carry credentials (an Authorization header or
+a session) always read from the primary, and only anonymous reads, which
+follow no write of their own, go to replicas.
+
+Replicas are health-checked at most every DATABASE_REPLICA_CHECK_INTERVAL
+seconds; ones that fail to answer or lag more than DATABASE_REPLICA_MAX_LAG
+seconds are skipped until a later check passes. With no healthy replica
+reads fall back to the primary.
+
+The middleware is sync- and async-capable, so under ASGI it doesn't force
+Django to run the rest of the chain and the async views in a thread.
+"""
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# True while serving a request whose reads may use a replica.
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_seconds():
+    return getattr(settings, "DATABASE_PIN_SECONDS", 5)
+
+
+def pin_cache():
+    alias = getattr(settings, "DATABASE_PIN_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def check_interval():
+    return getattr(settings, "DATABASE_REPLICA_CHECK_INTERVAL", 10)
+
+
+def max_lag():
+    return getattr(settings, "DATABASE_REPLICA_MAX_LAG", 5)
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 where it can't be measured)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Time since the last replayed transaction; overstates lag on
+            # an idle primary, so keep DATABASE_REPLICA_MAX_LAG generous.
+            cursor.execute(
+                "SELECT CASE WHEN pg_is_in_recovery()"
+                " THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                " ELSE 0 END"
+            )
+        else:
+            cursor.execute("SELECT 0")
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._healthy = []
+        self._checked_at = None
+
+    def healthy(self):
+        with self._lock:
+            due = self._checked_at is None or time.monotonic() - self._checked_at >= check_interval()
+            if due:
+                # Claim the check so concurrent requests keep using the
+                # previous result instead of all probing at once.
+                self._checked_at = time.monotonic()
+        if due:
+            self.check()
+        return self._healthy
+
+    def check(self):
+        healthy = []
+        for alias in replica_aliases():
+            try:
+                lag = replica_lag(alias)
+            except Exception:
+                logger.warning("Replica %s is unreachable; reading from the primary instead.", alias, exc_info=True)
+                continue
+            if lag > max_lag():
+                logger.warning("Replica %s is %.1fs behind; skipping it.", alias, lag)
+                continue
+            healthy.append(alias)
+        with self._lock:
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._healthy = []
+            self._checked_at = None
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or not replica_aliases():
+            return DEFAULT_DB_ALIAS
+        healthy = replica_health.healthy()
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Allowed everywhere so local SQLite replicas can be built with
+        # `migrate --database replica_0`; real replicas get the schema
+        # through replication.
+        return True
+
+
+def credentials(request):
+    return request.META.get("HTTP_AUTHORIZATION") or (
+        request.session.session_key if hasattr(request, "session") else None
+    )
+
+
+def pin_key(request):
+    identity = credentials(request) or request.META.get("REMOTE_ADDR", "")
+    return "db:pin:" + hashlib.sha256(identity.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        cache = pin_cache()
+        if request.method in self.safe_methods:
+            if cache is None:
+                token = replica_reads.set(not credentials(request))
+            else:
+                token = replica_reads.set(cache.get(pin_key(request)) is None)
+            try:
+                return self.get_response(request)
+            finally:
+                replica_reads.reset(token)
+
+        response = self.get_response(request)
+        if cache is not None and response.status_code < 400:
+            cache.set(pin_key(request), 1, pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        cache = pin_cache()
+        if request.method in self.safe_methods:
+            # The awaited chain runs in this context, and sync_to_async
+            # copies it into the ORM's thread, so the router sees the flag.
+            if cache is None:
+                token = replica_reads.set(not credentials(request))
+            else:
+                token = replica_reads.set(await cache.aget(pin_key(request)) is None)
+            try:
+                return await self.get_response(request)
+            finally:
+                replica_reads.reset(token)
+
+        response = await self.get_response(request)
+        if cache is not None and response.status_code < 400:
+            await cache.aset(pin_key(request), 1, pin_seconds())
+        return response
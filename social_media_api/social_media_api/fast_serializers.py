@@ -0,0 +1,214 @@
+"""
+Read-only fast path for list serializers.
+
+For every row of a list, a ModelSerializer builds an attribute lookup per
+field, checks for None, and calls each field's to_representation(), on
+top of the model instance the queryset built for the row. Read-only list
+endpoints don't need any of that machinery. compile_serializer() turns a
+serializer's field set into one generated `row -> dict` function over
+`values_list(named=True)` rows:
+
+  - plain model fields and dotted sources (`author.username`) become
+    columns (`author__username`). They are copied as is, or passed
+    through the field's own to_representation() when it formats
+    (CharField, ...), so output stays byte-identical. DateTimeFields get
+    a converter with the timezone looked up once per compile;
+  - primary-key related fields read the FK column;
+  - SerializerMethodFields are called with the row when the serializer
+    names the columns they read in `method_field_columns`;
+  - anything else (nested serializers, many-related, file fields, method
+    fields without columns, `source="*"`) makes the serializer
+    uncompilable and the view falls back to the regular serializer.
+
+A ListSerializer with a `prepare_page(rows)` method (page-level lookups
+such as PostListSerializer's has_liked) gets it called first. Set
+FAST_LIST_SERIALIZERS = False to turn the fast path off.
+"""
+import datetime
+import functools
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from . import profiling
+
+
+def fast_serializers_enabled():
+    return getattr(settings, "FAST_LIST_SERIALIZERS", True)
+
+
+class CompiledSerializer:
+    def __init__(self, serializer, columns, row_to_dict):
+        self.serializer = serializer
+        self.columns = columns
+        self.row_to_dict = row_to_dict
+
+    def values(self, queryset, extra_columns=()):
+        """`queryset` as named rows with the compiled columns first, then `extra_columns`."""
+        columns = dict.fromkeys(self.columns)
+        columns.update(dict.fromkeys(extra_columns))
+        return queryset.prefetch_related(None).values_list(*columns, named=True)
+
+    def represent(self, list_serializer, rows):
+        prepare_page = getattr(list_serializer, "prepare_page", None)
+        if prepare_page is not None:
+            prepare_page(rows)
+        row_to_dict = self.row_to_dict
+        return ReturnList([row_to_dict(row) for row in rows], serializer=list_serializer)
+
+
+@functools.lru_cache(maxsize=256)
+def _code(source):
+    return compile(source, "<compiled serializer>", "exec")
+
+
+def _is_single_valued(model, attrs):
+    """False if following `attrs` from `model` crosses a to-many relation."""
+    for attr in attrs:
+        if model is None:
+            return True  # past an annotation; values() will validate
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return True  # annotation or "pk"
+        if field.many_to_many or field.one_to_many:
+            return False
+        model = field.related_model
+    return True
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation() with the timezone resolved once:
+    looking up the current timezone per value is most of its cost.
+    Anything but an aware datetime rendered as ISO 8601 goes to DRF.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+    to_representation = field.to_representation
+
+    def convert(value):
+        if type(value) is not datetime.datetime or value.tzinfo is None:
+            return to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def compile_serializer(serializer):
+    """
+    CompiledSerializer for `serializer` (a ModelSerializer instance, e.g. a
+    ListSerializer's child), or None if one of its fields needs the
+    model instance.
+    """
+    model = serializer.Meta.model
+    method_columns = getattr(serializer, "method_field_columns", {})
+    columns = []
+    namespace = {}
+    items = []
+
+    def column_index(name):
+        if name not in columns:
+            columns.append(name)
+        return columns.index(name)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in method_columns:
+                return None
+            for column in method_columns[name]:
+                column_index(column)
+            namespace[f"m_{len(items)}"] = getattr(serializer, field.method_name)
+            items.append(f"{name!r}: m_{len(items)}(row)")
+            continue
+        if (
+            isinstance(field, (serializers.BaseSerializer, ManyRelatedField, serializers.FileField))
+            or field.source == "*"
+            or not _is_single_valued(model, field.source_attrs)
+        ):
+            return None
+
+        index = column_index("__".join(field.source_attrs))
+        if isinstance(field, RelatedField):
+            # The FK column holds the primary key DRF would output.
+            if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                return None
+            items.append(f"{name!r}: row[{index}]")
+        elif type(field) is serializers.ReadOnlyField:
+            items.append(f"{name!r}: row[{index}]")
+        elif type(field) is serializers.DateTimeField:
+            namespace[f"c_{len(items)}"] = _datetime_converter(field)
+            items.append(f"{name!r}: None if row[{index}] is None else c_{len(items)}(row[{index}])")
+        else:
+            namespace[f"c_{len(items)}"] = field.to_representation
+            items.append(f"{name!r}: None if row[{index}] is None else c_{len(items)}(row[{index}])")
+
+    source = "def row_to_dict(row):\n    return {\n" + "".join(f"        {item},\n" for item in items) + "    }\n"
+    exec(_code(source), namespace)
+    return CompiledSerializer(serializer, columns, namespace["row_to_dict"])
+
+
+def values_queryset(list_serializer, queryset, extra_columns=()):
+    """
+    (queryset, compiled): `queryset` as named values rows and the compiled
+    child serializer, or the queryset unchanged and None when the fast path
+    is off or the serializer can't be compiled.
+    """
+    if not fast_serializers_enabled():
+        return queryset, None
+    compiled = compile_serializer(list_serializer.child)
+    if compiled is None:
+        return queryset, None
+    try:
+        return compiled.values(queryset, extra_columns), compiled
+    except FieldError:
+        # A source that isn't a column (e.g. a model property).
+        return queryset, None
+
+
+def serialize_rows(list_serializer, rows, compiled):
+    """`list_serializer.data` for `rows`, through the compiled path if there is one."""
+    if compiled is not None:
+        with profiling.section("serialize"):
+            return compiled.represent(list_serializer, rows)
+    list_serializer.instance = rows
+    return list_serializer.data
+
+
+def row_columns(view):
+    """Columns a list view reads off rows besides the serializer's: sort keys and validators."""
+    paginator = getattr(view, "paginator", None)
+    ordering = getattr(view, "keyset_ordering", None) or getattr(paginator, "ordering", None) or ()
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    columns = [field.lstrip("-") for field in ordering]
+    columns += getattr(view, "etag_fields", ())
+    if getattr(view, "last_modified_field", None):
+        columns.append(view.last_modified_field)
+    return columns
+
+
+class FastListMixin:
+    """list() through the compiled serializer when it can be used."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(many=True)
+        queryset, compiled = values_queryset(serializer, queryset, row_columns(self))
+
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = serialize_rows(serializer, rows, compiled)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,65 @@
+"""
+JSON renderer and parser backed by orjson.
+
+DRF's JSONRenderer spends most of a large list response in json.dumps.
+FastJSONRenderer produces the same bytes with orjson when it is installed
+(`pip install orjson`): compact, UTF-8, "Z" for UTC datetimes, Decimals as
+numbers, UUIDs as strings, and U+2028/U+2029 escaped. Anything orjson
+can't encode (lazy translation strings, querysets, integers over 64 bits)
+goes through DRF's JSONEncoder via `default`, and requests for indented
+output (the browsable API, `; indent=4`) or non-default COMPACT_JSON /
+UNICODE_JSON settings use DRF's renderer. Differences from DRF: NaN and
+infinite floats render as null instead of raising, and FastJSONParser
+reads integers over 64 bits as floats. Without orjson both classes behave
+exactly like DRF's.
+"""
+import io
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or not (self.compact and not self.ensure_ascii):
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, ValueError):
+            # e.g. ints over 64 bits; DRF's encoder handles or reports them.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as DRF: keep the output safe to embed in JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN even when STRICT_JSON is off; let DRF
+            # decide, and word the error.
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -67,6 +67,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'rest_framework',
+    'rest_framework.authtoken',
     'social_media_api',
     'posts',
     'notifications',
@@ -76,19 +77,18 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # First, so middleware queries (sessions, auth) are counted too.
+    'social_media_api.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'social_media_api.static_files.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'social_media_api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
-+ MIDDLEWARE[1:] if "MIDDLEWARE" in globals() else [
-    "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
-]
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
@@ -129,9 +129,36 @@ else:
         }
     }
 
+# --- Read replicas (see social_media_api/db_router.py) ---
+# Comma-separated URLs; sqlite:///replica1.sqlite3 works for local testing.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DATABASE_REPLICAS = []
+for i, url in enumerate(DATABASE_REPLICA_URLS):
+    alias = f"replica_{i}"
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=600)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["social_media_api.db_router.ReplicaRouter"]
+DATABASE_PIN_SECONDS = int(os.getenv("DATABASE_PIN_SECONDS", "5"))
+DATABASE_REPLICA_CHECK_INTERVAL = int(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "10"))
+DATABASE_REPLICA_MAX_LAG = int(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))
+
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# --- Cache ---
+# Shared Redis cache when REDIS_URL is set, per-process memory otherwise.
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+# Read-your-writes pins for the replica router (db_router.py) need a cache
+# every worker sees; without one, readers with credentials use the primary.
+DATABASE_PIN_CACHE = "default" if REDIS_URL else None
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -172,17 +199,123 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "social_media_api.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_FILTER_BACKENDS": [
         "rest_framework.filters.SearchFilter",
     ],
+    # orjson-backed JSON (social_media_api/renderers.py); DRF's stdlib
+    # json when orjson isn't installed.
+    "DEFAULT_RENDERER_CLASSES": [
+        "social_media_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "social_media_api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
+# List views serialize values() rows through compiled serializers
+# (social_media_api/fast_serializers.py); False uses the ModelSerializers.
+FAST_LIST_SERIALIZERS = os.getenv("FAST_LIST_SERIALIZERS", "True") == "True"
+
+# --- Feed (materialized home timelines, see posts/timeline.py) ---
+# Authors with at least this many followers are merged into feeds at read
+# time instead of being fanned out on write. Empty disables the hybrid mode.
+FEED_CELEBRITY_FOLLOWER_THRESHOLD = (
+    int(os.getenv("FEED_CELEBRITY_FOLLOWER_THRESHOLD", "10000"))
+    if os.getenv("FEED_CELEBRITY_FOLLOWER_THRESHOLD", "10000")
+    else None
+)
+FEED_FANOUT_BATCH_SIZE = int(os.getenv("FEED_FANOUT_BATCH_SIZE", "1000"))
+FEED_BACKFILL_LIMIT = int(os.getenv("FEED_BACKFILL_LIMIT", "200"))
+# Top feed (?order=top, posts/ranking.py): ln(1 + weighted likes and
+# comments), where a post's engagement counts half after each half-life.
+# Only timeline entries from the last FEED_TOP_WINDOW_HOURS are ranked.
+# Run `manage.py rebuild_scores` after changing the weights or half-life.
+FEED_SCORE_HALF_LIFE = int(os.getenv("FEED_SCORE_HALF_LIFE", str(24 * 3600)))
+FEED_SCORE_LIKE_WEIGHT = float(os.getenv("FEED_SCORE_LIKE_WEIGHT", "1"))
+FEED_SCORE_COMMENT_WEIGHT = float(os.getenv("FEED_SCORE_COMMENT_WEIGHT", "3"))
+FEED_TOP_WINDOW_HOURS = int(os.getenv("FEED_TOP_WINDOW_HOURS", "72"))
+# A client pages through one cached ranking of at most FEED_TOP_SNAPSHOT_SIZE
+# posts, so pages don't skip or repeat posts whose scores move meanwhile.
+FEED_TOP_SNAPSHOT_SIZE = int(os.getenv("FEED_TOP_SNAPSHOT_SIZE", "500"))
+FEED_TOP_SNAPSHOT_SECONDS = int(os.getenv("FEED_TOP_SNAPSHOT_SECONDS", "900"))
+
+# --- Profile cache (accounts/profiles.py) ---
+# Serialized profiles are invalidated by version bumps; this only bounds
+# how long unused ones stay in the cache. Only cached when every worker
+# sees the same cache (a bump has to reach all of them); otherwise profiles
+# are read from the database.
+PROFILE_CACHE = "default" if REDIS_URL else None
+PROFILE_CACHE_TIMEOUT = int(os.getenv("PROFILE_CACHE_TIMEOUT", "3600"))
+
+# --- Profile pictures (accounts/thumbnails.py) ---
+# Uploads are cropped to these square sizes (px) as WebP and JPEG by a pool
+# of PROFILE_PICTURE_WORKERS threads; 0 resizes inline in the request.
+PROFILE_PICTURE_SIZES = {"small": 48, "medium": 160, "large": 400}
+PROFILE_PICTURE_WORKERS = int(os.getenv("PROFILE_PICTURE_WORKERS", "2"))
+PROFILE_PICTURE_QUALITY = int(os.getenv("PROFILE_PICTURE_QUALITY", "82"))
+# Variant names are content hashes, so they can be cached forever.
+PROFILE_PICTURE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# --- Who to follow (accounts/suggestions.py, manage.py compute_suggestions) ---
+# Stored suggestions expire after SUGGESTIONS_TTL seconds; run the job more
+# often than that. Following lists longer than the caps are sampled.
+SUGGESTIONS_TTL = int(os.getenv("SUGGESTIONS_TTL", str(2 * 24 * 3600)))
+SUGGESTIONS_PER_USER = int(os.getenv("SUGGESTIONS_PER_USER", "50"))
+SUGGESTIONS_MAX_FOLLOWEES = int(os.getenv("SUGGESTIONS_MAX_FOLLOWEES", "500"))
+SUGGESTIONS_MAX_SECOND_HOP = int(os.getenv("SUGGESTIONS_MAX_SECOND_HOP", "500"))
+SUGGESTIONS_BATCH_SIZE = int(os.getenv("SUGGESTIONS_BATCH_SIZE", "1000"))
+
+# --- Request profiling (social_media_api/profiling.py) ---
+# Query count, DB time, duplicate queries and serializer/template time per
+# request, logged on "social_media_api.profiling" and, when enabled, sent
+# as a Server-Timing header. QUERY_BUDGET caps queries for every view
+# (views can set their own `query_budget`); over-budget requests are
+# logged, or raise with QUERY_BUDGET_RAISE, which the test runner turns on.
+QUERY_PROFILE_SERVER_TIMING = os.getenv("QUERY_PROFILE_SERVER_TIMING", str(DEBUG)) == "True"
+QUERY_PROFILE_SLOW_MS = int(os.getenv("QUERY_PROFILE_SLOW_MS", "500"))
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET")) if os.getenv("QUERY_BUDGET") else None
+QUERY_BUDGET_RAISE = os.getenv("QUERY_BUDGET_RAISE", "False") == "True"
+TEST_RUNNER = "social_media_api.runner.QueryBudgetTestRunner"
+
+# --- Token auth cache (accounts/authentication.py) ---
+TOKEN_AUTH_LOCAL_CACHE_SIZE = int(os.getenv("TOKEN_AUTH_LOCAL_CACHE_SIZE", "10000"))
+TOKEN_AUTH_LOCAL_TTL = int(os.getenv("TOKEN_AUTH_LOCAL_TTL", "30"))
+TOKEN_AUTH_SHARED_TTL = int(os.getenv("TOKEN_AUTH_SHARED_TTL", "300"))
+# Only share token lookups across workers when the cache is actually shared.
+TOKEN_AUTH_SHARED_CACHE = "default" if REDIS_URL else None
+
+# --- Notifications (buffered writer, see notifications/buffer.py) ---
+# Pending notifications are bulk-written once this many distinct
+# (recipient, verb, target) keys are queued or the oldest is this many
+# seconds old (0 writes immediately). Repeats within the coalesce window
+# fold into one unread row with an actor count.
+NOTIFICATIONS_BUFFER_SIZE = int(os.getenv("NOTIFICATIONS_BUFFER_SIZE", "500"))
+NOTIFICATIONS_FLUSH_INTERVAL = float(os.getenv("NOTIFICATIONS_FLUSH_INTERVAL", "2"))
+# Live stream (notifications/stream.py); Redis pub/sub shares events between workers.
+NOTIFICATIONS_PUBSUB_BACKEND = (
+    "notifications.pubsub.RedisBackend" if REDIS_URL else "notifications.pubsub.LocalBackend"
+)
+NOTIFICATIONS_SSE_HEARTBEAT = int(os.getenv("NOTIFICATIONS_SSE_HEARTBEAT", "15"))
+NOTIFICATIONS_SSE_MAX_SECONDS = int(os.getenv("NOTIFICATIONS_SSE_MAX_SECONDS", "300"))
+NOTIFICATIONS_COALESCE_WINDOW = int(os.getenv("NOTIFICATIONS_COALESCE_WINDOW", "3600"))
+# Unread badge counter (notifications/unread.py): only cached when every
+# worker sees the same cache, otherwise each read is a COUNT.
+NOTIFICATIONS_UNREAD_CACHE = "default" if REDIS_URL else None
+NOTIFICATIONS_UNREAD_CACHE_TIMEOUT = int(os.getenv("NOTIFICATIONS_UNREAD_CACHE_TIMEOUT", "3600"))
+# Retention (manage.py prune_notifications): read notifications older than
+# this are archived ("archive") or dropped ("delete") in chunks.
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_RETENTION_DAYS", "90"))
+NOTIFICATIONS_RETENTION_POLICY = os.getenv("NOTIFICATIONS_RETENTION_POLICY", "archive")
+NOTIFICATIONS_RETENTION_CHUNK_SIZE = int(os.getenv("NOTIFICATIONS_RETENTION_CHUNK_SIZE", "1000"))
 
 from pathlib import Path
 
@@ -0,0 +1,38 @@
+"""
+WhiteNoise, usable in an async middleware chain.
+
+WhiteNoiseMiddleware is sync-only, so under ASGI Django would wrap it,
+and everything after it in MIDDLEWARE up to the async views, in
+async_to_sync and run the request in a thread. Looking up a static file
+is a dict lookup (a filesystem search only with WHITENOISE_AUTOREFRESH,
+i.e. in development), so the async path does it inline and only awaits
+the rest of the chain.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from accounts.thumbnails import VARIANT_DIR
+from accounts.views import profile_picture_variant
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,4 +31,9 @@ urlpatterns = [
 
 
 if settings.DEBUG:
+    # Development only. In production the web server or CDN serves
+    # MEDIA_URL and sends PROFILE_PICTURE_CACHE_CONTROL for the variants.
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.lstrip('/')}{VARIANT_DIR}<path:path>", profile_picture_variant),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)